@@ -2,6 +2,13 @@
 ASGI config for app project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are resolved with ``app.asgi_urls`` so the busiest read paths are
+served by native async views.
+
+In production run it with the uvicorn workers configured in
+``app/asgi_server.py``:
+
+    gunicorn app.asgi:application -c python:app.asgi_server
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -9,8 +16,69 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers import asgi
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+
+class ASGIRequest(asgi.ASGIRequest):
+    """Request resolved with the ASGI URL configuration"""
+    urlconf = 'app.asgi_urls'
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """Handler creating requests resolved with the ASGI URL configuration"""
+    request_class = ASGIRequest
+
+    async def send_response(self, response, send):
+        """Encode and send a response out over ASGI
+
+        Django 3.2 iterates streaming responses on the event loop, where
+        the database can not be queried, so their parts are read in the
+        thread the sync views run in instead.
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = []
+        for header, value in response.items():
+            if isinstance(header, str):
+                header = header.encode('ascii')
+            if isinstance(value, str):
+                value = value.encode('latin1')
+            headers.append((bytes(header), bytes(value)))
+        for cookie in response.cookies.values():
+            value = cookie.output(header='').encode('ascii').strip()
+            headers.append((b'Set-Cookie', value))
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+
+        parts = iter(response)
+        read_part = sync_to_async(next, thread_sensitive=True)
+        while True:
+            part = await read_part(parts, None)
+            if part is None:
+                break
+            for chunk, _ in self.chunk_bytes(part):
+                await send({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+django.setup(set_prefix=False)
+application = ASGIHandler()
+
+# Load the API schema now instead of on its first request, Django must be
+# set up before importing it
+from core import schema  # noqa: E402
+
+schema.warm()
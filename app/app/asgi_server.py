@@ -0,0 +1,125 @@
+"""
+Gunicorn configuration for serving app.asgi in production
+
+Each uvicorn worker serves the async read views on its event loop, but
+Django 3.2 runs every sync view, the DRF ones and the exports included,
+in a single thread per worker. A worker thus handles one such request
+at a time, and a slow one holds up the others, like a gunicorn sync
+worker. Workers are sized the same way, 2 per CPU plus one, capped by
+the memory available to the container.
+
+    python manage.py serve
+
+or, without waiting for the database and migrating first:
+
+    gunicorn app.asgi:application -c python:app.asgi_server
+
+The app is loaded once in the master before the workers are forked, so
+they share its memory copy-on-write. SIGHUP replaces the workers
+gracefully; new code needs a restart of the master.
+
+Every value can be overridden with the environment variables below.
+"""
+import math
+import os
+
+
+def _read(path):
+    """Return the stripped content of a file, None when unreadable"""
+    try:
+        with open(path, encoding='ascii') as file:
+            return file.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus():
+    """Return the CPUs this process may use, cgroup quotas included"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2, then v1
+    quota = (_read('/sys/fs/cgroup/cpu.max') or '').split()
+    if len(quota) != 2:
+        quota = [
+            _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us'),
+            _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us'),
+        ]
+    try:
+        limit = int(quota[0]) / int(quota[1])
+    except (TypeError, ValueError, ZeroDivisionError):
+        return cpus
+    if limit <= 0:
+        return cpus
+    return max(1, min(cpus, math.ceil(limit)))
+
+
+def available_memory():
+    """Return the bytes of memory this process may use, cgroup included"""
+    try:
+        memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, OSError, ValueError):
+        memory = None
+
+    # cgroup v2, then v1, which reports a huge number without a limit
+    for path in (
+        '/sys/fs/cgroup/memory.max',
+        '/sys/fs/cgroup/memory/memory.limit_in_bytes',
+    ):
+        try:
+            limit = int(_read(path))
+        except (TypeError, ValueError):
+            continue
+        if memory is None or limit < memory:
+            memory = limit
+        break
+
+    return memory
+
+
+def default_workers(cpus=None, memory=None):
+    """Return 2 workers per CPU plus one, as many as the memory can hold"""
+    cpus = cpus or available_cpus()
+    memory = memory if memory is not None else available_memory()
+    workers = cpus * 2 + 1
+    if memory:
+        worker_memory = int(os.environ.get('ASGI_WORKER_MEMORY_MB', 256))
+        workers = min(workers, memory // (worker_memory * 1024 * 1024))
+    return max(1, workers)
+
+
+bind = os.environ.get('ASGI_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('ASGI_WORKERS', 0)) or default_workers()
+preload_app = True
+# Seconds a worker may stay silent before it is restarted
+timeout = int(os.environ.get('ASGI_TIMEOUT', 30))
+# Seconds to finish in-flight requests on shutdown or reload
+graceful_timeout = int(os.environ.get('ASGI_GRACEFUL_TIMEOUT', 30))
+# Seconds to wait for the next request on a keep-alive connection
+keepalive = int(os.environ.get('ASGI_KEEPALIVE', 5))
+# Requests after which a worker is replaced, bounding slow memory growth,
+# with a random jitter so workers are not all replaced at once. 0 never
+# replaces them.
+max_requests = int(os.environ.get('ASGI_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get(
+    'ASGI_MAX_REQUESTS_JITTER',
+    max_requests // 10
+))
+accesslog = '-'
+
+
+def pre_fork(server, worker):
+    """Close the database connections of the master before forking
+
+    A worker must not share the sockets of the master, or of the
+    workers forked before it.
+    """
+    from django.db import connections
+
+    from core.db import pool
+
+    connections.close_all()
+    pool.close_all()
@@ -0,0 +1,44 @@
+"""
+URL configuration used when serving through ASGI
+
+The busiest read paths are served by native async views, every other
+request goes through the same views as app.urls. The async paths keep
+the namespaces and names of the sync ones, so reverse() and the metric
+labels are the same whichever server handles a request.
+"""
+from django.urls import include, path
+
+from app.urls import urlpatterns as sync_urlpatterns
+from meal import async_views as meal_async_views
+from meal import urls as meal_urls
+from user import async_views as user_async_views
+from user import urls as user_urls
+
+
+meal_urlpatterns = [
+    path(
+        'meal-question/',
+        meal_async_views.meal_question_list,
+        name='mealquestion-list'
+    ),
+    path(
+        'meal-user/',
+        meal_async_views.meal_user_list,
+        name='mealuser-list'
+    ),
+] + meal_urls.urlpatterns
+
+user_urlpatterns = [
+    path('me/', user_async_views.me, name='me'),
+] + user_urls.urlpatterns
+
+urlpatterns = [
+    path('api/user/', include((user_urlpatterns, user_urls.app_name))),
+    path('api/meal/', include((meal_urlpatterns, meal_urls.app_name))),
+] + [
+    pattern for pattern in sync_urlpatterns
+    if getattr(pattern, 'namespace', None) not in (
+        user_urls.app_name,
+        meal_urls.app_name,
+    )
+]
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -47,11 +48,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,13 +83,70 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# CONN_MAX_AGE keeps connections open between requests and HEALTH_CHECKS
+# replaces the ones the server dropped. The optional pool shares at most
+# DB_POOL_MAX_SIZE connections between the threads of a process; use it
+# with DB_CONN_MAX_AGE=0 so connections go back to the pool after requests.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'HEALTH_CHECKS': os.environ.get('DB_HEALTH_CHECKS', '1') == '1',
+        'POOL': {
+            'ENABLED': os.environ.get('DB_POOL', '0') == '1',
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 5)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+            'HEALTH_CHECK_INTERVAL': int(os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 30)),
+        },
+    }
+}
+
+# Read replicas
+# Comma separated hosts of streaming replicas of the database, sharing its
+# other settings. GET requests read from a replica that answers and is at
+# most DB_REPLICA_MAX_LAG seconds behind, checked every
+# DB_REPLICA_CHECK_INTERVAL seconds, connecting for at most
+# DB_REPLICA_CONNECT_TIMEOUT seconds. A client's reads stay on the primary
+# for DB_REPLICA_STICKY_SECONDS after it sent a write, which needs a cache
+# shared by the processes (system check core.E001).
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'POOL': dict(DATABASES['default']['POOL']),
+        'OPTIONS': {
+            **DATABASES['default'].get('OPTIONS', {}),
+            'connect_timeout': int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', 2)),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.router.ReplicaRouter']
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', 5))
+DB_REPLICA_CHECK_INTERVAL = float(os.environ.get('DB_REPLICA_CHECK_INTERVAL', 10))
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -136,6 +196,122 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
 
+# Token authentication cache
+# Number of tokens kept per process and seconds before an entry expires
+
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', 10000))
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 60))
+
+# Request metrics
+# Directory where every worker process writes its metrics for /metrics to
+# add up, empty to report the serving process only. Clear it on startup.
+# Seconds between two writes of a worker's metrics
+
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+# /metrics is served to staff users, and to scrapers connecting from one of
+# the comma separated METRICS_ALLOWED_IPS or sending METRICS_TOKEN as a
+# bearer token
+
+METRICS_ALLOWED_IPS = [
+    address.strip()
+    for address in os.environ.get('METRICS_ALLOWED_IPS', '').split(',')
+    if address.strip()
+]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Idempotency keys
+# Seconds the response of a create retried with the same Idempotency-Key
+# is replayed, and number of responses purge_idempotency_keys keeps
+
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+IDEMPOTENCY_KEY_MAX_ENTRIES = int(os.environ.get('IDEMPOTENCY_KEY_MAX_ENTRIES', 1000000))
+
+# Partitions
+# Months ahead of the current one whose core_mealuser partitions
+# run_worker keeps created
+
+MEALUSER_PARTITION_MONTHS_AHEAD = int(os.environ.get('MEALUSER_PARTITION_MONTHS_AHEAD', 3))
+
+# Admin
+# Tables estimated to hold more rows than this get estimated changelist
+# counts instead of COUNT(*)
+
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 100000))
+
+# API schema
+# Version of the deployed code, the schema is regenerated when it changes.
+# When empty, a hash of the sources is used instead.
+# Directory keeping the generated schema between restarts
+
+APP_VERSION = os.environ.get('APP_VERSION', '')
+API_SCHEMA_CACHE_DIR = os.environ.get(
+    'API_SCHEMA_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'app-api-schema')
+)
+
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON is rendered and parsed with orjson when it is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+
+# Meal API
+
+# Maximum number of answers accepted by one bulk submission request
+MEAL_USER_BULK_MAX_ITEMS = int(os.environ.get('MEAL_USER_BULK_MAX_ITEMS', 200))
+
+# Default and maximum number of answers per page of answer history
+MEAL_PAGE_SIZE = int(os.environ.get('MEAL_PAGE_SIZE', 100))
+MEAL_PAGE_MAX_SIZE = int(os.environ.get('MEAL_PAGE_MAX_SIZE', 1000))
+
+# Number of days summarized when /api/meal/summary/ gets no start date
+MEAL_SUMMARY_DEFAULT_DAYS = int(os.environ.get('MEAL_SUMMARY_DEFAULT_DAYS', 30))
+
+# Number of answers fetched per round trip when streaming an export
+MEAL_EXPORT_CHUNK_SIZE = int(os.environ.get('MEAL_EXPORT_CHUNK_SIZE', 2000))
+
+# Seconds a serialized question/vegetable catalog version stays cached
+MEAL_CATALOG_CACHE_TIMEOUT = int(os.environ.get('MEAL_CATALOG_CACHE_TIMEOUT', 60 * 60 * 24))
+# Seconds a process keeps the catalog version read from the database, so
+# the changes made by other processes are served after at most that long
+MEAL_CATALOG_VERSION_TTL = float(os.environ.get('MEAL_CATALOG_VERSION_TTL', 2))
+
+# Days of answers the vegetable recommendations take into account
+MEAL_RECOMMENDATION_DAYS = int(os.environ.get('MEAL_RECOMMENDATION_DAYS', 14))
+
+# Default and maximum number of recommended vegetables per request
+MEAL_RECOMMENDATION_LIMIT = int(os.environ.get('MEAL_RECOMMENDATION_LIMIT', 10))
+MEAL_RECOMMENDATION_MAX_LIMIT = int(os.environ.get('MEAL_RECOMMENDATION_MAX_LIMIT', 100))
+
+# Seconds a user's cached intake and recommendations are kept
+MEAL_RECOMMENDATION_CACHE_TIMEOUT = int(os.environ.get('MEAL_RECOMMENDATION_CACHE_TIMEOUT', 60 * 60))
+
+# Background jobs
+# Attempts of a failing job, seconds before its first retry, doubled at
+# each attempt up to JOB_RETRY_MAX_BACKOFF, seconds without a heartbeat
+# after which a running job whose worker died is queued again, or failed
+# when out of attempts, and days finished jobs are kept
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BACKOFF = int(os.environ.get('JOB_RETRY_BACKOFF', 10))
+JOB_RETRY_MAX_BACKOFF = int(os.environ.get('JOB_RETRY_MAX_BACKOFF', 60 * 60))
+JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 60 * 30))
+JOB_KEEP_DAYS = int(os.environ.get('JOB_KEEP_DAYS', 7))
+
+# Delta sync
+# Most changed rows per stream and page, seconds a change waits at
+# least before it is synced, a margin for clock differences between the
+# app servers and the database, and days deletions are kept before
+# clients must sync again from scratch
+MEAL_SYNC_PAGE_SIZE = int(os.environ.get('MEAL_SYNC_PAGE_SIZE', 1000))
+MEAL_SYNC_SETTLE_SECONDS = int(os.environ.get('MEAL_SYNC_SETTLE_SECONDS', 5))
+MEAL_SYNC_TOMBSTONE_DAYS = int(os.environ.get('MEAL_SYNC_TOMBSTONE_DAYS', 30))
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# Load the API schema now instead of on its first request, Django must be
+# set up before importing it
+from core import schema  # noqa: E402
+
+schema.warm()
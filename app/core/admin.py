@@ -1,20 +1,119 @@
 """
 Django admin customization
 """
+import datetime
+
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
-from core import models
+from core import exports, models
+
+
+def estimated_table_rows(model, using):
+    """Return the row count of a table estimated by PostgreSQL statistics
+
+    The rows of a partitioned table are counted in its partitions, the
+    statistics of the partitioned table itself summing them already.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT coalesce(sum(greatest(reltuples, 0)), 0)::bigint
+            FROM pg_class
+            WHERE relkind = 'r' AND (oid = %s::regclass OR oid IN (
+                SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass
+            ))
+            """,
+            [model._meta.db_table] * 2
+        )
+        return cursor.fetchone()[0]
+
+
+def estimated_query_rows(queryset):
+    """Return the row count of a query estimated by the planner"""
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        return int(cursor.fetchone()[0][0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating the count of tables too big to count
+
+    Tables estimated under ADMIN_EXACT_COUNT_LIMIT rows are counted
+    exactly. Bigger ones use the table statistics, or the query plan
+    when the changelist is filtered.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        table_rows = estimated_table_rows(queryset.model, queryset.db)
+        if table_rows < settings.ADMIN_EXACT_COUNT_LIMIT:
+            return super().count
+        if not queryset.query.where:
+            return table_rows
+        return estimated_query_rows(queryset)
+
+
+class IndexedDatesQuerySet(QuerySet):
+    """QuerySet listing date_hierarchy periods from an index
+
+    The periods between the first and last dates are listed without
+    scanning the rows between them, so some may have no rows.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None,
+                  is_dst=None):
+        dates = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if dates['first'] is None:
+            return []
+
+        first = timezone.localtime(dates['first'], tzinfo)
+        last = timezone.localtime(dates['last'], tzinfo)
+        current = first.replace(hour=0, minute=0, second=0, microsecond=0)
+        if kind in ('month', 'year'):
+            current = current.replace(day=1)
+        if kind == 'year':
+            current = current.replace(month=1)
+
+        periods = []
+        while current <= last:
+            periods.append(current)
+            if kind == 'day':
+                current = timezone.make_aware(
+                    current.replace(tzinfo=None) + datetime.timedelta(days=1),
+                    current.tzinfo
+                )
+            elif kind == 'month':
+                years, month_index = divmod(current.month, 12)
+                current = current.replace(
+                    year=current.year + years,
+                    month=month_index + 1
+                )
+            else:
+                current = current.replace(year=current.year + 1)
+
+        return periods if order == 'ASC' else periods[::-1]
 
 
 class UserAdmin(BaseUserAdmin):
     """Define the admin pages for users"""
     ordering = ['id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_display = ['email', 'first_name', 'last_name', 'gender']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('first_name', 'last_name', 'gender')}),
+        (_('Household'), {'fields': ('home',)}),
         (
             _('Permissions'),
             {
@@ -29,6 +128,7 @@ class UserAdmin(BaseUserAdmin):
         (_('Important dates'), {'fields': ('last_login',)})
     )
     readonly_fields = ['last_login']
+    autocomplete_fields = ['home']
     add_fieldsets = (
         (None, {
             'classes': ('wide',),
@@ -47,7 +147,108 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+
+class HomeAdmin(admin.ModelAdmin):
+    """Define the admin pages for households"""
+    list_display = ['id', 'name', 'created_at']
+    search_fields = ['name']
+    ordering = ['id']
+
+
+class MealQuestionAdmin(admin.ModelAdmin):
+    """Define the admin pages for meal questions"""
+    list_display = ['id', 'question', 'created_at']
+    search_fields = ['question']
+
+
+class MealVegetableAdmin(admin.ModelAdmin):
+    """Define the admin pages for vegetables"""
+    list_display = ['id', 'vegetable', 'color', 'varieties']
+    search_fields = ['vegetable']
+
+
+class MealUserAdmin(admin.ModelAdmin):
+    """Define the admin pages for meal answers
+
+    Built for a table of millions of rows: related objects are joined,
+    foreign keys are edited without loading every choice, counts are
+    estimated and dates are browsed through the created_at index.
+    """
+    actions = ['export_csv', 'export_ndjson']
+    list_display = [
+        'id',
+        'user',
+        'meal_question',
+        'vegetable_question',
+        'answer_type',
+        'answer_choice',
+        'answer_int',
+        'answer_bool',
+        'created_at',
+    ]
+    list_select_related = ['user', 'meal_question', 'vegetable_question']
+    list_filter = [('created_at', admin.DateFieldListFilter), 'answer_choice']
+    date_hierarchy = 'created_at'
+    ordering = ['-created_at', '-id']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['meal_question', 'vegetable_question']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        """Use the queryset listing dates from the created_at index"""
+        queryset = super().get_queryset(request)
+        return IndexedDatesQuerySet(
+            model=queryset.model,
+            query=queryset.query,
+            using=queryset.db
+        )
+
+    def export_answers(self, queryset, export_format):
+        """Stream the selected answers of every user"""
+        return exports.export_response(
+            queryset.order_by('id'),
+            ['user', *exports.ANSWER_FIELDS],
+            export_format,
+            'meal-answers-all'
+        )
+
+    @admin.action(description=_('Export selected answers as CSV'))
+    def export_csv(self, request, queryset):
+        return self.export_answers(queryset, 'csv')
+
+    @admin.action(description=_('Export selected answers as NDJSON'))
+    def export_ndjson(self, request, queryset):
+        return self.export_answers(queryset, 'ndjson')
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Define the admin pages for background jobs"""
+    list_display = [
+        'id',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished_at',
+    ]
+    list_filter = ['status', 'name']
+    search_fields = ['name']
+    ordering = ['-id']
+    readonly_fields = [
+        'attempts',
+        'locked_at',
+        'locked_by',
+        'last_error',
+        'created_at',
+        'finished_at',
+    ]
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.MealQuestion)
-admin.site.register(models.MealVegetable)
-admin.site.register(models.MealUser)
+admin.site.register(models.Home, HomeAdmin)
+admin.site.register(models.MealQuestion, MealQuestionAdmin)
+admin.site.register(models.MealVegetable, MealVegetableAdmin)
+admin.site.register(models.MealUser, MealUserAdmin)
+admin.site.register(models.Job, JobAdmin)
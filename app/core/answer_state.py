@@ -0,0 +1,239 @@
+"""
+Maintenance of the MealAnswerState table of every user's latest answers
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from core.models import MealAnswerState, MealUser
+
+
+ANSWER_FIELDS = [
+    'id',
+    'user_id',
+    'meal_question_id',
+    'vegetable_question_id',
+    'created_at',
+    'is_allergy',
+    'is_unnecessary',
+    'answer_type',
+    'answer_choice',
+    'answer_int',
+    'answer_bool',
+]
+# State fields copied from the answer as they are
+VALUE_FIELDS = [
+    'is_allergy',
+    'is_unnecessary',
+    'answer_type',
+    'answer_choice',
+    'answer_int',
+    'answer_bool',
+]
+STATE_FIELDS = ['answer_id', 'answered_at', *VALUE_FIELDS]
+
+
+def state_key(user_id, meal_question_id, vegetable_question_id):
+    """Return the key identifying a state row"""
+    return (user_id, meal_question_id, vegetable_question_id)
+
+
+def answer_key(answer):
+    """Return the state key of an answer given as a dict of ANSWER_FIELDS"""
+    return state_key(
+        answer['user_id'],
+        answer['meal_question_id'],
+        answer['vegetable_question_id']
+    )
+
+
+def answer_values(meal_user):
+    """Return the fields of a MealUser the state depends on"""
+    return {field: getattr(meal_user, field) for field in ANSWER_FIELDS}
+
+
+def newer(answer, state):
+    """Return whether an answer is at least as recent as a state row"""
+    return (answer['created_at'], answer['id']) >= \
+        (state.answered_at, state.answer_id)
+
+
+def _state_values(answer):
+    """Return the state fields of an answer"""
+    return {
+        'answer_id': answer['id'],
+        'answered_at': answer['created_at'],
+        **{field: answer[field] for field in VALUE_FIELDS},
+    }
+
+
+def _locked_states(user_ids):
+    """Return the state rows of users by key, locked for update"""
+    return {
+        state_key(
+            row.user_id,
+            row.meal_question_id,
+            row.vegetable_question_id
+        ): row
+        for row in MealAnswerState.objects.select_for_update().filter(
+            user_id__in=user_ids
+        )
+    }
+
+
+def _apply(answers, replace=False):
+    """Make the newest of answers the state, the caller holds a transaction
+
+    With replace, the answers are the state even when an older one than
+    the current state, whose answer was deleted.
+    """
+    latest = {}
+    for answer in answers:
+        key = answer_key(answer)
+        if key not in latest or (answer['created_at'], answer['id']) >= (
+            latest[key]['created_at'],
+            latest[key]['id']
+        ):
+            latest[key] = answer
+
+    existing = _locked_states({key[0] for key in latest})
+    to_update = []
+    to_create = []
+    for key, answer in latest.items():
+        row = existing.get(key)
+        if row is None:
+            user_id, meal_question_id, vegetable_question_id = key
+            to_create.append(MealAnswerState(
+                user_id=user_id,
+                meal_question_id=meal_question_id,
+                vegetable_question_id=vegetable_question_id,
+                **_state_values(answer)
+            ))
+        elif replace or newer(answer, row):
+            for field, value in _state_values(answer).items():
+                setattr(row, field, value)
+            to_update.append(row)
+
+    if to_update:
+        MealAnswerState.objects.bulk_update(to_update, STATE_FIELDS)
+    if to_create:
+        MealAnswerState.objects.bulk_create(to_create)
+
+
+def _atomic_retry(function, *args):
+    """Run function in a transaction, once more if a row was created first
+
+    A concurrent writer creating one of the state rows makes the insert
+    fail, but the row then exists and can be locked and updated.
+    """
+    try:
+        with transaction.atomic():
+            function(*args)
+    except IntegrityError:
+        with transaction.atomic():
+            function(*args)
+
+
+def apply_answers(answers):
+    """Make saved answers the state when they are the latest
+
+    Answers are dicts of ANSWER_FIELDS. Two queries whatever their
+    number: one locking the users' state rows, one writing them.
+    """
+    answers = list(answers)
+    if answers:
+        _atomic_retry(_apply, answers)
+
+
+def record_answers(meal_users):
+    """Make newly saved answers the state"""
+    apply_answers(answer_values(meal_user) for meal_user in meal_users)
+
+
+def _key_filter(keys):
+    """Return the filter of the answers or state rows of keys"""
+    condition = Q()
+    for user_id, meal_question_id, vegetable_question_id in keys:
+        condition |= Q(
+            user_id=user_id,
+            meal_question_id=meal_question_id,
+            vegetable_question_id=vegetable_question_id
+        )
+    return condition
+
+
+def _refresh(keys):
+    """Recompute the state of keys from the answer history"""
+    existing = _locked_states({key[0] for key in keys})
+    latest = MealUser.objects.filter(_key_filter(keys)).order_by(
+        'user_id',
+        'meal_question_id',
+        'vegetable_question_id',
+        '-created_at',
+        '-id'
+    ).distinct(
+        'user_id',
+        'meal_question_id',
+        'vegetable_question_id'
+    ).values(*ANSWER_FIELDS)
+    answers = {answer_key(answer): answer for answer in latest}
+
+    stale = [
+        existing[key].id for key in keys
+        if key in existing and key not in answers
+    ]
+    if stale:
+        MealAnswerState.objects.filter(id__in=stale).delete()
+    if answers:
+        _apply(answers.values(), replace=True)
+
+
+def forget_answers(answers):
+    """Update the state after answers were deleted or moved to a new key
+
+    Only the keys whose state is one of the answers are recomputed, from
+    the answers left in the history.
+    """
+    keys = {answer_key(answer) for answer in answers}
+    current = {
+        state_key(*row) for row in MealAnswerState.objects.filter(
+            _key_filter(keys),
+            answer_id__in={answer['id'] for answer in answers}
+        ).values_list('user_id', 'meal_question_id', 'vegetable_question_id')
+    }
+    if current:
+        _atomic_retry(_refresh, current)
+
+
+def rebuild(batch_size=1000):
+    """Recompute the whole state from MealUser and return its size"""
+    rows = MealUser.objects.order_by(
+        'user_id',
+        'meal_question_id',
+        'vegetable_question_id',
+        '-created_at',
+        '-id'
+    ).distinct(
+        'user_id',
+        'meal_question_id',
+        'vegetable_question_id'
+    ).values(*ANSWER_FIELDS)
+
+    total = 0
+    with transaction.atomic():
+        MealAnswerState.objects.all().delete()
+        batch = []
+        for answer in rows.iterator(chunk_size=batch_size):
+            batch.append(MealAnswerState(
+                user_id=answer['user_id'],
+                meal_question_id=answer['meal_question_id'],
+                vegetable_question_id=answer['vegetable_question_id'],
+                **_state_values(answer)
+            ))
+            if len(batch) >= batch_size:
+                MealAnswerState.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        MealAnswerState.objects.bulk_create(batch)
+        total += len(batch)
+
+    return total
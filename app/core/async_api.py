@@ -0,0 +1,68 @@
+"""
+Helpers for native async API views served through ASGI
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from rest_framework import exceptions
+
+from core.authentication import CachedTokenAuthentication
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def error_response(exc):
+    """Return the JSON response DRF would render for an API exception"""
+    response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+    if isinstance(exc, exceptions.NotAuthenticated) or \
+            isinstance(exc, exceptions.AuthenticationFailed):
+        response['WWW-Authenticate'] = CachedTokenAuthentication.keyword
+
+    return response
+
+
+async def authenticate(request):
+    """Return the (user, token) of a request or None when anonymous
+
+    Even cached tokens are resolved in a worker thread, since checking
+    their generation is a call to the shared cache.
+    """
+    authentication = CachedTokenAuthentication()
+    return await sync_to_async(authentication.authenticate)(request)
+
+
+def async_read_view(fallback):
+    """Serve authenticated reads with an async view
+
+    Other methods are handed to the fallback sync view so a path keeps
+    behaving like its DRF view.
+    """
+    fallback = sync_to_async(fallback)
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def view(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return await fallback(request, *args, **kwargs)
+
+            try:
+                user_auth = await authenticate(request)
+                if user_auth is None:
+                    raise exceptions.NotAuthenticated()
+            except exceptions.APIException as exc:
+                return error_response(exc)
+
+            request.user, request.auth = user_auth
+            try:
+                return await handler(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return error_response(exc)
+
+        # Token authenticated like the DRF views, which are exempt too
+        view.csrf_exempt = True
+        return view
+
+    return decorator
@@ -0,0 +1,190 @@
+"""
+Authentication classes for the APIs
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rest_framework.authentication import TokenAuthentication
+
+
+Snapshot = namedtuple('Snapshot', ['model', 'db', 'values'])
+Entry = namedtuple(
+    'Entry',
+    ['expires_at', 'user_id', 'user', 'token', 'generation']
+)
+
+GENERATION_KEY = 'auth:token:{key}:generation'
+
+
+def get_generation(key):
+    """Return the generation of a token in the shared cache"""
+    return cache.get(GENERATION_KEY.format(key=key))
+
+
+def bump_generations(keys):
+    """Make every process drop its cached entries of tokens
+
+    A generation outlives the entries cached before it changed, so a
+    new random value, or its expiry, always differs from theirs.
+    """
+    cache.set_many(
+        {GENERATION_KEY.format(key=key): uuid.uuid4().hex for key in keys},
+        settings.AUTH_TOKEN_CACHE_TTL
+    )
+
+
+def take_snapshot(instance):
+    """Return the field values needed to rebuild a model instance"""
+    values = tuple(
+        getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields
+    )
+    return Snapshot(type(instance), instance._state.db, values)
+
+
+def restore_snapshot(snapshot):
+    """Build a new model instance from a snapshot without a query"""
+    field_names = [
+        field.attname for field in snapshot.model._meta.concrete_fields
+    ]
+    return snapshot.model.from_db(snapshot.db, field_names, snapshot.values)
+
+
+class TokenCache:
+    """Thread safe LRU map from token keys to user snapshots with a TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the (user, token) cached for a key or None
+
+        An entry whose token generation changed in the shared cache,
+        because another process changed its user or token, is dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+
+        if entry is not None and entry.generation != get_generation(key):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._remove(key)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+
+        return restore_snapshot(entry.user), restore_snapshot(entry.token)
+
+    def set(self, key, user, token, generation=None):
+        """Cache the user and token a key resolves to
+
+        generation is the one of the token read before them.
+        """
+        entry = Entry(
+            time.monotonic() + self.ttl,
+            user.pk,
+            take_snapshot(user),
+            take_snapshot(token),
+            generation
+        )
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(entry.user_id, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop a single token"""
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        """Drop every token of a user"""
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        """Drop every token and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return the size and hit/miss counters of the cache"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+    def _remove(self, key):
+        """Remove a key, the lock must be held"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        keys = self._keys_by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry.user_id]
+
+
+token_cache = TokenCache(
+    max_size=settings.AUTH_TOKEN_CACHE_SIZE,
+    ttl=settings.AUTH_TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication resolving known tokens without a query
+
+    Entries are dropped when the token is deleted or the user is saved.
+    Other processes see the change through the token generation in the
+    shared cache, and every entry expires after AUTH_TOKEN_CACHE_TTL
+    seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        """Return the cached user and token or look them up"""
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Read before the user, so a change committed in between is
+        # seen as a new generation on the next request
+        generation = get_generation(key)
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, user, token, generation)
+
+        return user, token
@@ -0,0 +1,446 @@
+"""
+Latency and query budget benchmark for the user and meal APIs
+"""
+import contextlib
+import itertools
+import random
+import time
+import uuid
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment
+)
+from django.urls import URLPattern, URLResolver, reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import answer_state, summary
+from core.authentication import token_cache
+from core.models import Home, MealQuestion, MealUser, MealVegetable
+from meal import catalog, fast_serializers
+from meal.serializers import MealUserSerializer
+
+
+PASSWORD = 'Benchmark123'
+HOME_SIZE = 4
+# Transaction bookkeeping, only logged when nested in an atomic block
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+URLCONFS = ['user.urls', 'meal.urls']
+
+Dataset = namedtuple('Dataset', [
+    'prefix',
+    'user',
+    'token',
+    'question_ids',
+    'vegetable_ids',
+    'question_id',
+    'vegetable_id',
+    'answer_id',
+])
+
+# detail names the Dataset attribute holding the pk of a detail route and
+# budget is the most SQL queries a warm request may run. The catalog
+# endpoints count the version read every MEAL_CATALOG_VERSION_TTL seconds.
+Endpoint = namedtuple('Endpoint', [
+    'method',
+    'url_name',
+    'detail',
+    'payload',
+    'status',
+    'budget',
+])
+
+
+def answer_payload(dataset, iteration):
+    """Return an answer to one of the catalog questions"""
+    question_ids = dataset.question_ids
+    return {
+        'meal_question': question_ids[iteration % len(question_ids)],
+        'answer_type': 'int',
+        'answer_int': iteration,
+    }
+
+
+def bulk_payload(dataset, iteration):
+    """Return an answer to every question of the catalog"""
+    question_ids = dataset.question_ids[:settings.MEAL_USER_BULK_MAX_ITEMS]
+    return [
+        {
+            'meal_question': question_id,
+            'answer_type': 'choice',
+            'answer_choice': 'normal',
+        }
+        for question_id in question_ids
+    ]
+
+
+def create_user_payload(dataset, iteration):
+    """Return a new user"""
+    return {
+        'email': f'{dataset.prefix}-new{iteration}@example.com',
+        'password': PASSWORD,
+        'first_name': 'Bench',
+        'last_name': 'Mark',
+        'gender': 'other',
+    }
+
+
+def token_payload(dataset, iteration):
+    """Return the credentials of the benchmark user"""
+    return {'email': dataset.user.email, 'password': PASSWORD}
+
+
+ENDPOINTS = [
+    Endpoint('post', 'user:create', None, create_user_payload, 201, 2),
+    Endpoint('post', 'user:token', None, token_payload, 200, 2),
+    Endpoint('get', 'user:me', None, None, 200, 0),
+    Endpoint(
+        'patch',
+        'user:me',
+        None,
+        lambda dataset, iteration: {'first_name': f'Bench{iteration}'},
+        200,
+        3
+    ),
+    Endpoint('get', 'meal:api-root', None, None, 200, 0),
+    Endpoint('get', 'meal:summary', None, None, 200, 1),
+    Endpoint('get', 'meal:home-summary', None, None, 200, 2),
+    Endpoint('get', 'meal:recommendations', None, None, 200, 1),
+    Endpoint('get', 'meal:sync', None, None, 200, 5),
+    Endpoint('get', 'meal:pending', None, None, 200, 2),
+    Endpoint('get', 'meal:current-answers', None, None, 200, 1),
+    Endpoint('get', 'meal:mealquestion-list', None, None, 200, 1),
+    Endpoint('get', 'meal:mealquestion-detail', 'question_id', None, 200, 1),
+    Endpoint('get', 'meal:mealvegetable-list', None, None, 200, 1),
+    Endpoint(
+        'get',
+        'meal:mealvegetable-detail',
+        'vegetable_id',
+        None,
+        200,
+        1
+    ),
+    Endpoint('get', 'meal:mealuser-list', None, None, 200, 1),
+    Endpoint('post', 'meal:mealuser-list', None, answer_payload, 201, 6),
+    Endpoint('get', 'meal:mealuser-detail', 'answer_id', None, 200, 1),
+    Endpoint(
+        'patch',
+        'meal:mealuser-detail',
+        'answer_id',
+        lambda dataset, iteration: {'answer_bool': bool(iteration % 2)},
+        200,
+        8
+    ),
+    Endpoint('post', 'meal:mealuser-bulk', None, bulk_payload, 201, 6),
+    Endpoint('get', 'meal:mealuser-export', None, None, 200, 1),
+]
+
+
+def url_names(urlconfs=URLCONFS):
+    """Return the namespaced names of every route of the URL modules"""
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                yield from walk(
+                    pattern.url_patterns,
+                    pattern.namespace or namespace
+                )
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield f'{namespace}:{pattern.name}'
+
+    names = set()
+    for urlconf in urlconfs:
+        module = __import__(urlconf, fromlist=['urlpatterns'])
+        names.update(walk(module.urlpatterns, module.app_name))
+
+    return names
+
+
+@contextlib.contextmanager
+def database(keepdb=False):
+    """Run the block against a throwaway test database"""
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(
+        verbosity=0,
+        autoclobber=True,
+        keepdb=keepdb
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name,
+            verbosity=0,
+            keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def seed(users, answers, questions, vegetables, batch_size=1000, days=90,
+         random_seed=0):
+    """Create the users, catalog and answer history to benchmark against
+
+    Users share homes of HOME_SIZE members. Answers are spread over the
+    last days days and the summary rollup is rebuilt from them. The
+    latest answer of each user is to a vegetable, which the benchmarked
+    answers to questions never replace as the user's answer state.
+    Return the Dataset of the first user.
+    """
+    rng = random.Random(random_seed)
+    prefix = uuid.uuid4().hex[:8]
+    password = make_password(PASSWORD)
+
+    question_objs = MealQuestion.objects.bulk_create(
+        MealQuestion(question=f'{prefix} question {index}')
+        for index in range(questions)
+    )
+    vegetable_objs = MealVegetable.objects.bulk_create(
+        MealVegetable(
+            vegetable=f'{prefix} vegetable {index}',
+            color=rng.choice(['red', 'green', 'yellow', 'white']),
+            varieties=str(rng.randint(1, 20))
+        )
+        for index in range(vegetables)
+    )
+    home_objs = Home.objects.bulk_create(
+        Home(name=f'{prefix} home {index}')
+        for index in range(-(-users // HOME_SIZE))
+    )
+    user_objs = get_user_model().objects.bulk_create(
+        (
+            get_user_model()(
+                email=f'{prefix}-user{index}@example.com',
+                password=password,
+                first_name='Bench',
+                last_name=str(index),
+                gender='other',
+                home=home_objs[index // HOME_SIZE]
+            )
+            for index in range(users)
+        ),
+        batch_size=batch_size
+    )
+
+    question_ids = [question.id for question in question_objs]
+    vegetable_ids = [vegetable.id for vegetable in vegetable_objs]
+    history = (
+        random_answer(
+            rng,
+            user.id,
+            question_ids,
+            vegetable_ids,
+            vegetable=index == answers - 1
+        )
+        for user in user_objs
+        for index in range(answers)
+    )
+    while True:
+        batch = list(itertools.islice(history, batch_size))
+        if not batch:
+            break
+        MealUser.objects.bulk_create(batch)
+
+    # created_at is auto_now_add, so spread the history afterwards. A
+    # user's later answers stay newer, so the answer state of every run
+    # is the same.
+    with connection.cursor() as cursor:
+        table = connection.ops.quote_name(MealUser._meta.db_table)
+        cursor.execute(
+            f'UPDATE {table} answer SET created_at = created_at '
+            f'- ((SELECT max(id) FROM {table} WHERE user_id = answer.user_id)'
+            " - id) * %s / %s * interval '1 day' WHERE user_id = ANY(%s)",
+            [days, max(answers, 1), [user.id for user in user_objs]]
+        )
+    summary.rebuild(batch_size=batch_size)
+    answer_state.rebuild(batch_size=batch_size)
+    catalog.invalidate()
+    token_cache.clear()
+
+    user = user_objs[0]
+    answer = MealUser.objects.filter(user=user).order_by('-id').first()
+    return Dataset(
+        prefix=prefix,
+        user=user,
+        token=Token.objects.create(user=user),
+        question_ids=question_ids,
+        vegetable_ids=vegetable_ids,
+        question_id=question_ids[0] if question_ids else None,
+        vegetable_id=vegetable_ids[0] if vegetable_ids else None,
+        answer_id=answer.id if answer else None,
+    )
+
+
+def random_answer(rng, user_id, question_ids, vegetable_ids,
+                  vegetable=False):
+    """Return an unsaved answer to a random question or vegetable
+
+    With vegetable, the answer is to a vegetable when there are some.
+    """
+    answer = MealUser(user_id=user_id)
+    if vegetable_ids and (
+        vegetable or not question_ids or rng.random() < 0.3
+    ):
+        answer.vegetable_question_id = rng.choice(vegetable_ids)
+        answer.answer_type = 'bool'
+        answer.answer_bool = rng.random() < 0.5
+    elif rng.random() < 0.5:
+        answer.meal_question_id = rng.choice(question_ids)
+        answer.answer_type = 'choice'
+        answer.answer_choice = rng.choice(MealUser.HOW_MANY_CHOICES)[0]
+    else:
+        answer.meal_question_id = rng.choice(question_ids)
+        answer.answer_type = 'int'
+        answer.answer_int = rng.randint(0, 10)
+
+    return answer
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of sorted values"""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(index)]
+
+
+def measure(client, endpoint, dataset, iteration):
+    """Send one request and return its status, query count and seconds"""
+    if endpoint.detail:
+        url = reverse(
+            endpoint.url_name,
+            args=[getattr(dataset, endpoint.detail)]
+        )
+    else:
+        url = reverse(endpoint.url_name)
+    send = getattr(client, endpoint.method)
+
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        if endpoint.payload is None:
+            response = send(url)
+        else:
+            response = send(
+                url,
+                endpoint.payload(dataset, iteration),
+                format='json'
+            )
+        if response.streaming:
+            b''.join(response.streaming_content)
+        elapsed = time.perf_counter() - started
+
+    statements = [
+        query for query in queries
+        if not query['sql'].startswith(SAVEPOINT_PREFIXES)
+    ]
+    return response.status_code, len(statements), elapsed
+
+
+def run(dataset, endpoints=ENDPOINTS, iterations=20, warmup=2):
+    """Benchmark every endpoint and return one result per endpoint
+
+    Warm-up requests fill the token and catalog caches and are not
+    measured.
+    """
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {dataset.token.key}')
+    iteration = itertools.count()
+
+    results = []
+    for endpoint in endpoints:
+        for _ in range(warmup):
+            measure(client, endpoint, dataset, next(iteration))
+
+        statuses = set()
+        query_counts = []
+        timings = []
+        for _ in range(iterations):
+            status, queries, elapsed = measure(
+                client,
+                endpoint,
+                dataset,
+                next(iteration)
+            )
+            statuses.add(status)
+            query_counts.append(queries)
+            timings.append(elapsed * 1000)
+
+        timings.sort()
+        results.append({
+            'endpoint': f'{endpoint.method.upper()} {endpoint.url_name}',
+            'statuses': sorted(statuses),
+            'expected_status': endpoint.status,
+            'queries': max(query_counts),
+            'budget': endpoint.budget,
+            'latency_ms': {
+                'min': round(timings[0], 3),
+                'p50': round(percentile(timings, 50), 3),
+                'p90': round(percentile(timings, 90), 3),
+                'p99': round(percentile(timings, 99), 3),
+                'max': round(timings[-1], 3),
+                'mean': round(sum(timings) / len(timings), 3),
+            },
+        })
+
+    return results
+
+
+def compare_serializers(user, repeat=5):
+    """Time serializing the answer history of a user both ways
+
+    Each way fetches and serializes the whole history; the best of
+    repeat runs is kept.
+    """
+    queryset = MealUser.objects.filter(
+        user=user
+    ).order_by('-created_at', '-id')
+    fast = fast_serializers.meal_user
+
+    def model_serializer():
+        return MealUserSerializer(queryset.all(), many=True).data
+
+    def values_serializer():
+        return fast.list_representation(fast.values(queryset.all()))
+
+    timings = {}
+    for serialize in (model_serializer, values_serializer):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            serialize()
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        timings[serialize.__name__] = round(best, 3)
+
+    return {
+        'rows': queryset.count(),
+        'best_ms': timings,
+        'speedup': round(
+            timings['model_serializer'] / timings['values_serializer'],
+            2
+        ),
+    }
+
+
+def failures(results):
+    """Return a message for every result over budget or with a bad status"""
+    messages = []
+    for result in results:
+        if result['statuses'] != [result['expected_status']]:
+            messages.append(
+                f"{result['endpoint']} answered {result['statuses']}, "
+                f"expected {result['expected_status']}"
+            )
+        if result['queries'] > result['budget']:
+            messages.append(
+                f"{result['endpoint']} ran {result['queries']} queries, "
+                f"budget is {result['budget']}"
+            )
+
+    return messages
@@ -0,0 +1,40 @@
+"""
+System checks for the settings the app relies on
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+# Cache backends whose entries are seen by their own process only
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+SHARED_CACHE_HINT = (
+    'Set CACHE_BACKEND and CACHE_LOCATION to a cache shared by the '
+    'processes, like memcached or '
+    'django.core.cache.backends.db.DatabaseCache.'
+)
+
+
+def cache_is_shared(alias='default'):
+    """Return whether every process sees the entries of a cache"""
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """Require a shared cache for the read replicas
+
+    A client that wrote is marked in the cache so its reads stay on the
+    primary, which every process must see.
+    """
+    if not settings.DATABASE_REPLICAS or cache_is_shared():
+        return []
+
+    return [Error(
+        'DB_REPLICA_HOSTS needs a cache shared by the processes.',
+        hint=SHARED_CACHE_HINT,
+        id='core.E001',
+    )]
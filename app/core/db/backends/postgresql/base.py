@@ -0,0 +1,92 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling
+"""
+import functools
+
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base, creation
+
+from core.db.pool import close_pool, get_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Test database creation closing pooled connections before a drop"""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pool(self.connection.alias, self.connection.settings_dict)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL connection that can be reused safely
+
+    With HEALTH_CHECKS, a persistent connection is checked before the
+    first query of each request and replaced when the server dropped it.
+    With POOL.ENABLED, connections are taken from and given back to an
+    in-process pool instead of being opened and closed.
+    """
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        """Return the connection pool of this database, if enabled"""
+        if self.alias == NO_DB_ALIAS:
+            return None
+        return get_pool(self.alias, self.settings_dict)
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('HEALTH_CHECKS', False)
+
+    def get_new_connection(self, conn_params):
+        """Take a connection from the pool when there is one"""
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+
+        connection = pool.acquire(
+            functools.partial(super().get_new_connection, conn_params)
+        )
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level',
+            connection.isolation_level
+        )
+        return connection
+
+    def connect(self):
+        """Connect, a new connection needs no health check"""
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        """Give the connection back to the pool when there is one"""
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            pool.release(self.connection, discard=self.errors_occurred)
+
+    def close_if_unusable_or_obsolete(self):
+        """Ask for a new health check at each request boundary"""
+        if self.connection is not None:
+            self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
+
+    def close_if_health_check_failed(self):
+        """Close a reused connection that no longer works"""
+        if self.connection is None or not self.health_check_enabled or \
+                self.health_check_done or self.in_atomic_block:
+            return
+
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
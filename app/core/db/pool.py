@@ -0,0 +1,277 @@
+"""
+In-process pool of database connections
+"""
+import logging
+import os
+import threading
+import time
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available before the pool timeout"""
+
+
+class ConnectionPool:
+    """Bounded, thread safe pool of DB-API connections
+
+    Connections idle for more than health_check_interval seconds are
+    checked before being handed out, and connections older than
+    max_lifetime seconds are closed instead of being reused.
+    """
+
+    def __init__(self, max_size, timeout, max_lifetime,
+                 health_check_interval):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self._condition = threading.Condition()
+        # Idle connections as (connection, created_at, released_at)
+        self._idle = []
+        self._created_at = {}
+        self._size = 0
+        self._pid = os.getpid()
+        self._counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'acquired': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'timeouts': 0,
+        }
+
+    def acquire(self, connect):
+        """Return an idle connection or one made by calling connect"""
+        started = time.monotonic()
+        waited = False
+        while True:
+            with self._condition:
+                self._check_fork()
+                entry = None
+                while self._idle and entry is None:
+                    entry = self._idle.pop()
+                    if self._expired(entry[1]):
+                        self._discard(entry[0])
+                        entry = None
+
+                if entry is None and self._size >= self.max_size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        raise PoolTimeout(
+                            'No database connection available within '
+                            f'{self.timeout} seconds'
+                        )
+                    waited = True
+                    self._condition.wait(remaining)
+                    continue
+
+                if entry is None:
+                    self._size += 1
+
+            if entry is None:
+                connection = self._connect(connect)
+            else:
+                connection = entry[0]
+                if not self._healthy(entry):
+                    with self._condition:
+                        self._discard(connection)
+                    continue
+
+            with self._condition:
+                self._counters['acquired'] += 1
+                if waited:
+                    self._counters['waits'] += 1
+                    self._counters['wait_seconds'] += (
+                        time.monotonic() - started
+                    )
+
+            return connection
+
+    def release(self, connection, discard=False):
+        """Give a connection back to the pool"""
+        if not discard and not connection.closed:
+            try:
+                status = connection.get_transaction_status()
+                if status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except OperationalError:
+                discard = True
+
+        with self._condition:
+            self._check_fork()
+            created = self._created_at.get(connection)
+            if created is None:
+                # Handed out before close_all(), no longer part of the pool
+                self._close(connection)
+                return
+
+            created_at, pid = created
+            if pid != os.getpid():
+                # Inherited from the parent process, see _check_fork()
+                del self._created_at[connection]
+                _inherited.append(connection)
+                return
+
+            if discard or connection.closed or self._expired(created_at):
+                self._discard(connection)
+            else:
+                self._idle.append((connection, created_at, time.monotonic()))
+            self._condition.notify()
+
+    def close_all(self):
+        """Close idle connections and forget the ones in use
+
+        Call it before forking so children do not share sockets.
+        """
+        with self._condition:
+            for connection, _, _ in self._idle:
+                self._close(connection)
+            self._idle = []
+            self._created_at = {}
+            self._size = 0
+            self._condition.notify_all()
+
+    def stats(self):
+        """Return the state and counters of the pool"""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                **self._counters,
+            }
+
+    def _connect(self, connect):
+        """Open a new connection for a reserved slot"""
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self._created_at[connection] = (time.monotonic(), os.getpid())
+            self._counters['connections_created'] += 1
+        return connection
+
+    def _healthy(self, entry):
+        """Check a connection that has been idle for a while still works"""
+        connection, _, released_at = entry
+        if time.monotonic() - released_at < self.health_check_interval:
+            return True
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except OperationalError:
+            logger.warning('Discarding broken pooled database connection')
+            return False
+        return True
+
+    def _expired(self, created_at):
+        """Return whether a connection outlived max_lifetime"""
+        return bool(self.max_lifetime) and \
+            time.monotonic() - created_at >= self.max_lifetime
+
+    def _discard(self, connection):
+        """Close a pooled connection and free its slot, lock held"""
+        self._created_at.pop(connection, None)
+        self._size -= 1
+        self._close(connection)
+        self._condition.notify()
+
+    def _close(self, connection):
+        """Close a connection ignoring errors"""
+        self._counters['connections_closed'] += 1
+        try:
+            connection.close()
+        except OperationalError:
+            pass
+
+    def _check_fork(self):
+        """Start from an empty pool in a forked child, lock held"""
+        if self._pid != os.getpid():
+            # The sockets belong to the parent and closing them, even by
+            # garbage collection, would end the parent's sessions
+            for entry in self._idle:
+                del self._created_at[entry[0]]
+                _inherited.append(entry[0])
+            self._idle = []
+            self._size = 0
+            self._pid = os.getpid()
+
+
+_pools = {}
+_inherited = []
+_pools_lock = threading.Lock()
+
+
+def _pool_key(alias, settings_dict):
+    """Return the key of the pool of a database"""
+    return (
+        alias,
+        settings_dict.get('HOST'),
+        settings_dict.get('PORT'),
+        settings_dict.get('NAME'),
+        settings_dict.get('USER'),
+    )
+
+
+def get_pool(alias, settings_dict):
+    """Return the pool of a database alias, or None when disabled"""
+    options = settings_dict.get('POOL') or {}
+    if not options.get('ENABLED'):
+        return None
+
+    key = _pool_key(alias, settings_dict)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 5),
+                max_lifetime=options.get('MAX_LIFETIME', 1800),
+                health_check_interval=options.get(
+                    'HEALTH_CHECK_INTERVAL',
+                    30
+                )
+            )
+            _pools[key] = pool
+
+    return pool
+
+
+def close_pool(alias, settings_dict):
+    """Close the idle connections of the pool of a database"""
+    with _pools_lock:
+        pool = _pools.pop(_pool_key(alias, settings_dict), None)
+
+    if pool is not None:
+        pool.close_all()
+
+
+def stats():
+    """Return the statistics of every pool by database alias"""
+    with _pools_lock:
+        pools = dict(_pools)
+
+    return {key[0]: pool.stats() for key, pool in pools.items()}
+
+
+def close_all():
+    """Close the idle connections of every pool"""
+    with _pools_lock:
+        pools = list(_pools.values())
+
+    for pool in pools:
+        pool.close_all()
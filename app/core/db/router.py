@@ -0,0 +1,177 @@
+"""
+Routing of reads to streaming replicas of the database
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY = 'db:sticky:{client}'
+
+# Seconds a replica is behind the primary, 0 when it replayed every WAL
+# record it received
+LAG_QUERY = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE coalesce(
+        extract(epoch FROM now() - pg_last_xact_replay_timestamp()),
+        0
+    )
+END
+"""
+
+# Models always read from the primary: a token must work as soon as it
+# was issued, and its lookups are cached anyway
+PRIMARY_MODELS = ('authtoken.Token',)
+
+# Whether the reads of the current request may go to a replica
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+class ReplicaMonitor:
+    """Track which replicas are up and close enough to the primary
+
+    Each replica is checked at most every DB_REPLICA_CHECK_INTERVAL
+    seconds, by the first read that needs it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Alias to (checked_at, healthy)
+        self._states = {}
+
+    def healthy(self, alias):
+        """Return whether a replica can serve reads"""
+        now = time.monotonic()
+        with self._lock:
+            checked_at, healthy = self._states.get(alias, (None, False))
+            if checked_at is not None and \
+                    now - checked_at < settings.DB_REPLICA_CHECK_INTERVAL:
+                return healthy
+            # Other threads keep the last state while this one checks
+            self._states[alias] = (now, healthy)
+
+        healthy = self.check(alias)
+        with self._lock:
+            self._states[alias] = (time.monotonic(), healthy)
+        return healthy
+
+    def check(self, alias):
+        """Measure the lag of a replica, False when down or too late"""
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(LAG_QUERY)
+                lag = float(cursor.fetchone()[0])
+        except DatabaseError as exc:
+            logger.warning('Replica %s is unavailable: %s', alias, exc)
+            connection.close()
+            return False
+
+        if lag > settings.DB_REPLICA_MAX_LAG:
+            logger.warning('Replica %s is %.1f seconds behind', alias, lag)
+            return False
+        return True
+
+    def states(self):
+        """Return the last known health of every checked replica"""
+        with self._lock:
+            return {
+                alias: healthy for alias, (_, healthy) in self._states.items()
+            }
+
+    def reset(self):
+        """Forget every check"""
+        with self._lock:
+            self._states.clear()
+
+
+monitor = ReplicaMonitor()
+
+
+def enable_replica_reads(enabled):
+    """Allow or forbid replica reads in the current context
+
+    Return a token to give to reset_replica_reads().
+    """
+    return _replica_reads.set(enabled)
+
+
+def reset_replica_reads(token):
+    """Restore the replica reads setting of before a request"""
+    _replica_reads.reset(token)
+
+
+def sticky_key(client):
+    """Return the cache key marking a client as reading the primary"""
+    digest = hashlib.sha256(client.encode()).hexdigest()[:32]
+    return STICKY_KEY.format(client=digest)
+
+
+def stick(clients):
+    """Send a client's reads to the primary for a while after a write
+
+    clients are the keys the client is told apart by, it stays on the
+    primary when it comes back with any of them.
+    """
+    cache.set_many(
+        {sticky_key(client): True for client in clients},
+        settings.DB_REPLICA_STICKY_SECONDS
+    )
+
+
+def is_sticky(clients):
+    """Return whether a client known by any of clients wrote recently"""
+    if not clients:
+        return False
+    return any(cache.get_many(
+        [sticky_key(client) for client in clients]
+    ).values())
+
+
+class ReplicaRouter:
+    """Send the reads of safe requests to a healthy replica
+
+    Writes, reads in a transaction and reads outside of the requests
+    enabled by ReplicaMiddleware use the primary, as does everything
+    when no replica is up.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not settings.DATABASE_REPLICAS or not _replica_reads.get():
+            return DEFAULT_DB_ALIAS
+        if model._meta.label in PRIMARY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if monitor.healthy(alias)
+        ]
+        if not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Replicas hold the same rows as the primary"""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        """Replicas are migrated through replication"""
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
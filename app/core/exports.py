@@ -0,0 +1,94 @@
+"""
+Streaming exports of meal answers
+"""
+import csv
+import datetime
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+ANSWER_FIELDS = [
+    'id',
+    'meal_question',
+    'vegetable_question',
+    'is_allergy',
+    'is_unnecessary',
+    'answer_type',
+    'answer_choice',
+    'answer_int',
+    'answer_bool',
+    'created_at',
+]
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+# Characters sent to the client at once
+BUFFER_SIZE = 64 * 1024
+
+
+class Echo:
+    """File-like object returning what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    """Return a value as written to CSV"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(rows, fields):
+    """Yield a header and one CSV line per row"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def iter_ndjson(rows, fields):
+    """Yield one JSON object per row"""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Join lines into chunks of about size characters"""
+    chunk = []
+    length = 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(chunk)
+            chunk = []
+            length = 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def export_response(queryset, fields, export_format, filename):
+    """Stream the rows of a queryset as CSV or NDJSON
+
+    Rows are read through a server-side cursor, so memory use does not
+    depend on the number of rows.
+    """
+    rows = queryset.values_list(*fields).iterator(
+        chunk_size=settings.MEAL_EXPORT_CHUNK_SIZE
+    )
+    lines = iter_csv(rows, fields) if export_format == 'csv' \
+        else iter_ndjson(rows, fields)
+
+    response = StreamingHttpResponse(
+        buffered(lines),
+        content_type=CONTENT_TYPES[export_format]
+    )
+    response['Content-Disposition'] = \
+        f'attachment; filename="{filename}.{export_format}"'
+    return response
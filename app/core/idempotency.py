@@ -0,0 +1,159 @@
+"""
+Replay of create requests retried with an Idempotency-Key header
+"""
+import datetime
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.crypto import salted_hmac
+
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from core.models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+
+
+class IdempotencyKeyReused(exceptions.APIException):
+    """The key was already used for a different request"""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        f'This {HEADER} was already used with a different request.'
+    )
+    default_code = 'idempotency_key_reused'
+
+
+def request_fingerprint(request):
+    """Return a keyed hash of the method, path and data of a request
+
+    The hash is keyed so the stored value reveals nothing about the
+    data, which may hold a password.
+    """
+    data = json.dumps(request.data, sort_keys=True, default=str)
+    return salted_hmac(
+        'core.idempotency',
+        f'{request.method} {request.path}\n{data}',
+        algorithm='sha256'
+    ).hexdigest()
+
+
+def claim(user, key, fingerprint):
+    """Return the record of a key and whether this request now owns it
+
+    Must run in a transaction. While the owner's transaction is open,
+    a concurrent request inserting the same key waits on the unique
+    constraint, then finds the committed record to replay, or claims
+    the key when the owner rolled back.
+    """
+    now = timezone.now()
+    expires_at = now + datetime.timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+    while True:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    key=key,
+                    fingerprint=fingerprint,
+                    expires_at=expires_at
+                )
+            return record, True
+        except IntegrityError:
+            pass
+
+        record = IdempotencyKey.objects.select_for_update().filter(
+            user=user,
+            key=key
+        ).first()
+        if record is None:
+            # Purged since the insert failed
+            continue
+        if record.expires_at > now:
+            return record, False
+
+        record.fingerprint = fingerprint
+        record.status_code = None
+        record.response = None
+        record.expires_at = expires_at
+        record.save()
+        return record, True
+
+
+def replay(record, fingerprint):
+    """Return the stored response of a record"""
+    if record.fingerprint != fingerprint:
+        raise IdempotencyKeyReused()
+
+    return Response(
+        record.response,
+        status=record.status_code,
+        headers={REPLAYED_HEADER: 'true'}
+    )
+
+
+def purge(max_entries=None, now=None):
+    """Delete the expired records and the oldest beyond max_entries
+
+    Return the number of deleted records.
+    """
+    deleted, _ = IdempotencyKey.objects.filter(
+        expires_at__lte=now or timezone.now()
+    ).delete()
+
+    if max_entries is not None:
+        cutoff = IdempotencyKey.objects.order_by('-id').values_list(
+            'id',
+            flat=True
+        )[max_entries:max_entries + 1].first()
+        if cutoff is not None:
+            trimmed, _ = IdempotencyKey.objects.filter(id__lte=cutoff).delete()
+            deleted += trimmed
+
+    return deleted
+
+
+class IdempotentCreateMixin:
+    """Replay the response of a create retried with an Idempotency-Key
+
+    The view runs in the transaction holding the key, so a duplicate
+    sent while it runs waits and replays its response instead of
+    running again. Only successful responses are kept, for
+    IDEMPOTENCY_KEY_TTL seconds; failed requests can be retried with
+    the same key. Keys are scoped to the authenticated user, anonymous
+    requests share one scope.
+    """
+
+    def create(self, request, *args, **kwargs):
+        """Create once per key, replaying the response of retries"""
+        key = request.headers.get(HEADER)
+        if key is None:
+            return super().create(request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise exceptions.ValidationError({
+                HEADER: [
+                    f'Must be between 1 and {MAX_KEY_LENGTH} characters.'
+                ]
+            })
+
+        user = request.user if request.user.is_authenticated else None
+        fingerprint = request_fingerprint(request)
+        with transaction.atomic():
+            record, owned = claim(user, key, fingerprint)
+            if not owned:
+                return replay(record, fingerprint)
+
+            response = super().create(request, *args, **kwargs)
+            if not status.is_success(response.status_code):
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response = response.data
+            record.save(update_fields=['status_code', 'response'])
+
+        return response
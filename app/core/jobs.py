@@ -0,0 +1,190 @@
+"""
+Background jobs stored in the database and run by the run_worker command
+"""
+import datetime
+import logging
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Name to function of every registered job
+_registry = {}
+
+
+class UnknownJob(LookupError):
+    """No function is registered under the name of a job"""
+
+
+def register(name=None):
+    """Decorator registering a function as a job
+
+    The function is called with the payload of the job as keyword
+    arguments, so the payload must be JSON serializable.
+    """
+    def decorator(function):
+        _registry[name or f'{function.__module__}.{function.__name__}'] = \
+            function
+        return function
+
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0, delay=0, max_attempts=None):
+    """Queue a job and return it
+
+    The job is written in the current transaction, so it only runs once
+    the changes it depends on are committed, and never if they are
+    rolled back.
+    """
+    if name not in _registry:
+        raise UnknownJob(name)
+
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=timezone.now() + datetime.timedelta(seconds=delay)
+    )
+
+
+def claim(worker, limit=1):
+    """Lock up to limit due jobs for a worker and return them
+
+    Jobs are taken by priority, then in the order they became due. Rows
+    locked by another worker are skipped instead of waited for, so
+    workers never take the same job nor queue behind each other.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status=Job.QUEUED,
+                run_at__lte=now
+            ).order_by('-priority', 'run_at', 'id')[:limit]
+        )
+        if not jobs:
+            return []
+
+        Job.objects.filter(id__in=[job.id for job in jobs]).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_at=now,
+            locked_by=worker
+        )
+
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_at = now
+        job.locked_by = worker
+    return jobs
+
+
+def backoff(attempts):
+    """Return the seconds to wait before running a job again"""
+    return min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_BACKOFF
+    )
+
+
+def run(job):
+    """Run a claimed job and record its outcome
+
+    A failed job is queued again after a growing delay, until it made
+    max_attempts attempts. Return whether the job succeeded.
+    """
+    try:
+        function = _registry.get(job.name)
+        if function is None:
+            raise UnknownJob(job.name)
+        function(**job.payload)
+    except Exception:
+        logger.exception('Job %s failed', job)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + datetime.timedelta(
+                seconds=backoff(job.attempts)
+            )
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        succeeded = False
+    else:
+        job.status = Job.DONE
+        job.finished_at = timezone.now()
+        succeeded = True
+
+    job.locked_at = None
+    job.locked_by = ''
+    job.save(update_fields=[
+        'status',
+        'run_at',
+        'locked_at',
+        'locked_by',
+        'last_error',
+        'finished_at',
+    ])
+    return succeeded
+
+
+def heartbeat(job_ids, now=None):
+    """Mark running jobs as still worked on, so they are not requeued"""
+    if not job_ids:
+        return 0
+    return Job.objects.filter(id__in=job_ids, status=Job.RUNNING).update(
+        locked_at=now or timezone.now()
+    )
+
+
+def requeue_stale(now=None):
+    """Queue again the jobs of workers that died while running them
+
+    A running job whose worker sent no heartbeat for JOB_TIMEOUT seconds
+    is considered abandoned. It fails when it used all its attempts.
+    Return the numbers of queued and failed jobs.
+    """
+    now = now or timezone.now()
+    stale = Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=now - datetime.timedelta(seconds=settings.JOB_TIMEOUT)
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        finished_at=now,
+        locked_at=None,
+        locked_by='',
+        last_error='Abandoned by its worker'
+    )
+    queued = stale.update(
+        status=Job.QUEUED,
+        run_at=now,
+        locked_at=None,
+        locked_by=''
+    )
+    return queued, failed
+
+
+def purge(now=None):
+    """Delete the jobs finished more than JOB_KEEP_DAYS ago
+
+    Return the number of deleted jobs.
+    """
+    oldest = (now or timezone.now()) - datetime.timedelta(
+        days=settings.JOB_KEEP_DAYS
+    )
+    deleted, _ = Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED],
+        finished_at__lt=oldest
+    ).delete()
+    return deleted
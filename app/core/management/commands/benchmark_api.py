@@ -0,0 +1,124 @@
+"""
+Django command to benchmark the latency and queries of the API endpoints
+"""
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the user and meal APIs"""
+    help = (
+        'Seed a throwaway test database, then measure the latency and SQL '
+        'queries of every user and meal endpoint. Fails when an endpoint '
+        'runs more queries than its budget.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--answers',
+            type=int,
+            default=500,
+            help='Number of answers seeded for every user.'
+        )
+        parser.add_argument('--questions', type=int, default=30)
+        parser.add_argument('--vegetables', type=int, default=50)
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Number of measured requests per endpoint.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file.'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON results of a previous run to compare with.'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark database between runs.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        with benchmark.database(keepdb=options['keepdb']):
+            self.stdout.write('Seeding benchmark data...')
+            dataset = benchmark.seed(
+                users=options['users'],
+                answers=options['answers'],
+                questions=options['questions'],
+                vegetables=options['vegetables']
+            )
+            self.stdout.write('Measuring endpoints...')
+            results = benchmark.run(
+                dataset,
+                iterations=options['iterations']
+            )
+
+        report = {
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'parameters': {
+                name: options[name]
+                for name in (
+                    'users',
+                    'answers',
+                    'questions',
+                    'vegetables',
+                    'iterations',
+                )
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+
+        baseline = {}
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = {
+                    result['endpoint']: result
+                    for result in json.load(file)['results']
+                }
+        self.write_table(results, baseline)
+
+        failures = benchmark.failures(results)
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('Every endpoint within budget!'))
+
+    def write_table(self, results, baseline):
+        """Print the results, with the change from the baseline if any"""
+        self.stdout.write(
+            f'{"endpoint":<36} {"queries":>9} {"p50 ms":>9} {"p90 ms":>9} '
+            f'{"p99 ms":>9} {"vs base":>8}'
+        )
+        for result in results:
+            latency = result['latency_ms']
+            change = ''
+            previous = baseline.get(result['endpoint'])
+            if previous and previous['latency_ms']['p50']:
+                ratio = latency['p50'] / previous['latency_ms']['p50']
+                change = f'{(ratio - 1) * 100:+.0f}%'
+
+            line = (
+                f'{result["endpoint"]:<36} '
+                f'{result["queries"]:>4}/{result["budget"]:<4} '
+                f'{latency["p50"]:>9.2f} {latency["p90"]:>9.2f} '
+                f'{latency["p99"]:>9.2f} {change:>8}'
+            )
+            if result['queries'] > result['budget']:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
@@ -0,0 +1,60 @@
+"""
+Django command to compare the model and values serializers of answers
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    """Django command to benchmark serializing an answer history"""
+    help = (
+        'Seed a throwaway test database with one long answer history, then '
+        'time MealUserSerializer against its values_list() equivalent.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10000,
+            help='Number of answers in the history.'
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--output',
+            help='Write the results as JSON to this file.'
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Keep the benchmark database between runs.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        with benchmark.database(keepdb=options['keepdb']):
+            self.stdout.write('Seeding benchmark data...')
+            dataset = benchmark.seed(
+                users=1,
+                answers=options['rows'],
+                questions=30,
+                vegetables=50
+            )
+            self.stdout.write('Serializing...')
+            result = benchmark.compare_serializers(
+                dataset.user,
+                repeat=options['repeat']
+            )
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(result, file, indent=2)
+
+        for name, elapsed in result['best_ms'].items():
+            self.stdout.write(f'{name:<20} {elapsed:>10.2f} ms')
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["rows"]} rows, {result["speedup"]}x faster'
+        ))
@@ -0,0 +1,32 @@
+"""
+Django command to generate the OpenAPI schema ahead of serving requests
+"""
+from django.core.management.base import BaseCommand
+
+from core import schema
+
+
+class Command(BaseCommand):
+    """Django command to precompute the API schema"""
+    help = (
+        'Generate the OpenAPI schema of the current code version and save '
+        'it to API_SCHEMA_CACHE_DIR.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Generate it even if the cache has this version.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['force']:
+            generated = schema.refresh()
+        else:
+            generated = schema.get()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'API schema {generated.fingerprint} ready!'
+        ))
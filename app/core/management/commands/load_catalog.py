@@ -0,0 +1,216 @@
+"""
+Django command to load question and vegetable catalogs in bulk
+"""
+import csv
+import io
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.models import MealQuestion, MealVegetable
+from meal import catalog
+
+
+# The time of the statement rather than of the transaction, so a long
+# load is not dated before the changes synced while it ran
+CATALOGS = {
+    'questions': {
+        'model': MealQuestion,
+        'key': 'question',
+        'values': [],
+        'defaults': {
+            'created_at': 'clock_timestamp()',
+            'updated_at': 'clock_timestamp()',
+        },
+    },
+    'vegetables': {
+        'model': MealVegetable,
+        'key': 'vegetable',
+        'values': ['color', 'varieties'],
+        'defaults': {'updated_at': 'clock_timestamp()'},
+    },
+}
+STAGING_TABLE = 'load_catalog_staging'
+
+
+class RowsFile(io.TextIOBase):
+    """Read-only file streaming CSV lines made from an iterator of rows"""
+
+    def __init__(self, rows):
+        self._lines = self._iter_lines(rows)
+        self._buffer = ''
+        # Error raised by the rows, which COPY reports as a database error
+        self.error = None
+
+    @staticmethod
+    def _iter_lines(rows):
+        output = io.StringIO()
+        writer = csv.writer(output)
+        for row in rows:
+            writer.writerow(row)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                line = next(self._lines, None)
+            except Exception as exc:
+                self.error = exc
+                raise
+            if line is None:
+                break
+            self._buffer += line
+
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+class Command(BaseCommand):
+    """Django command to load a question or vegetable catalog"""
+    help = (
+        'Insert or update catalog rows from a CSV or JSON file through a '
+        'PostgreSQL COPY into a staging table.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('catalog', choices=sorted(CATALOGS))
+        parser.add_argument('path', help='CSV file with a header row or '
+                                         'JSON file with a list of objects.')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='File format, guessed from the extension by default.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        config = CATALOGS[options['catalog']]
+        columns = [config['key'], *config['values']]
+        file_format = options['format'] or \
+            os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError('Use --format to give the file format.')
+
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            records = self.read_records(file, file_format)
+            rows = self.iter_rows(records, columns)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    self.copy_to_staging(cursor, columns, rows)
+                    total, inserted, updated = self.upsert(cursor, config)
+                catalog.invalidate_on_commit()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded {total} {options["catalog"]}: {inserted} inserted, '
+            f'{updated} updated, {total - inserted - updated} unchanged'
+        ))
+
+    def read_records(self, file, file_format):
+        """Yield the records of the file as dicts"""
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+            return
+
+        try:
+            records = json.load(file)
+        except ValueError as exc:
+            raise CommandError(f'Invalid JSON: {exc}')
+        if not isinstance(records, list):
+            raise CommandError('The JSON file must contain a list.')
+        yield from records
+
+    def iter_rows(self, records, columns):
+        """Yield (line, *columns) for every record"""
+        for line, record in enumerate(records, start=1):
+            if not isinstance(record, dict):
+                raise CommandError(f'Record {line} is not an object.')
+            missing = [column for column in columns if column not in record]
+            if missing:
+                raise CommandError(
+                    f'Record {line} has no {", ".join(missing)}.'
+                )
+
+            values = [str(record[column]).strip() for column in columns]
+            if not values[0]:
+                raise CommandError(f'Record {line} has an empty {columns[0]}.')
+            yield [line, *values]
+
+    def copy_to_staging(self, cursor, columns, rows):
+        """Load the rows into a temporary table with COPY"""
+        quote = connection.ops.quote_name
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE {quote(STAGING_TABLE)} ('
+            'line bigint, '
+            + ', '.join(f'{quote(column)} text' for column in columns)
+            + ') ON COMMIT DROP'
+        )
+        rows_file = RowsFile(rows)
+        try:
+            cursor.copy_expert(
+                f'COPY {quote(STAGING_TABLE)} (line, '
+                + ', '.join(quote(column) for column in columns)
+                + ') FROM STDIN WITH (FORMAT csv)',
+                rows_file
+            )
+        except Exception:
+            if rows_file.error is not None:
+                raise rows_file.error from None
+            raise
+
+    def upsert(self, cursor, config):
+        """Insert new rows, update changed ones and return the counts
+
+        When the file has the same key twice, its last record wins.
+        """
+        quote = connection.ops.quote_name
+        table = quote(config['model']._meta.db_table)
+        key = quote(config['key'])
+        values = [quote(column) for column in config['values']]
+        defaults = config['defaults']
+        insert_columns = [key, *values, *map(quote, defaults)]
+        select_columns = [key, *values, *defaults.values()]
+
+        if values:
+            current = ', '.join(f'{table}.{value}' for value in values)
+            excluded = ', '.join(f'EXCLUDED.{value}' for value in values)
+            conflict = (
+                'DO UPDATE SET '
+                + ', '.join(f'{value} = EXCLUDED.{value}' for value in values)
+                + ', updated_at = clock_timestamp()'
+                + f' WHERE ROW({current}) IS DISTINCT FROM ROW({excluded})'
+            )
+        else:
+            conflict = 'DO NOTHING'
+
+        cursor.execute(
+            f"""
+            WITH staged AS (
+                SELECT DISTINCT ON ({key}) {', '.join([key, *values])}
+                FROM {quote(STAGING_TABLE)}
+                ORDER BY {key}, line DESC
+            ), upserted AS (
+                INSERT INTO {table} ({', '.join(insert_columns)})
+                SELECT {', '.join(select_columns)} FROM staged
+                ON CONFLICT ({key}) {conflict}
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT
+                (SELECT count(*) FROM staged),
+                count(*) FILTER (WHERE inserted),
+                count(*) FILTER (WHERE NOT inserted)
+            FROM upserted
+            """
+        )
+        return cursor.fetchone()
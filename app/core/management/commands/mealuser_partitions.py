@@ -0,0 +1,50 @@
+"""
+Django command to maintain the monthly partitions of core_mealuser
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import partitions
+
+
+class Command(BaseCommand):
+    """Django command to create and detach MealUser partitions"""
+    help = (
+        'Create the monthly partitions of the answers table ahead of time '
+        'and detach the ones past the retention period.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=settings.MEALUSER_PARTITION_MONTHS_AHEAD,
+            help='Number of future months to create partitions for, '
+                 'MEALUSER_PARTITION_MONTHS_AHEAD by default.'
+        )
+        parser.add_argument(
+            '--retain-months',
+            type=int,
+            default=0,
+            help='Detach partitions older than this many months, the '
+                 'current one included. 0 keeps every partition.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['months_ahead'] < 0 or options['retain_months'] < 0:
+            raise CommandError('Month counts cannot be negative.')
+
+        for name in partitions.ensure_partitions(options['months_ahead']):
+            self.stdout.write(f'Created partition {name}')
+
+        if options['retain_months']:
+            detached = partitions.detach_old_partitions(
+                options['retain_months']
+            )
+            for name in detached:
+                self.stdout.write(
+                    f'Detached partition {name}, drop or archive the table'
+                )
+
+        self.stdout.write(self.style.SUCCESS('Partitions up to date!'))
@@ -0,0 +1,30 @@
+"""
+Django command to delete the expired idempotency keys
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import idempotency
+
+
+class Command(BaseCommand):
+    """Django command to keep the idempotency key store bounded"""
+    help = (
+        'Delete the expired idempotency keys, then the oldest ones beyond '
+        '--max-entries.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=settings.IDEMPOTENCY_KEY_MAX_ENTRIES,
+            help='Number of idempotency keys to keep at most.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        deleted = idempotency.purge(max_entries=options['max_entries'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} idempotency keys!'
+        ))
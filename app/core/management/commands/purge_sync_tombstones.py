@@ -0,0 +1,22 @@
+"""
+Django command to delete the sync tombstones clients no longer need
+"""
+from django.core.management.base import BaseCommand
+
+from meal import sync
+
+
+class Command(BaseCommand):
+    """Django command to delete the old sync tombstones"""
+    help = (
+        'Delete the tombstones of rows deleted more than '
+        'MEAL_SYNC_TOMBSTONE_DAYS days ago. Clients with an older sync '
+        'token have to sync again from scratch.'
+    )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        deleted = sync.purge_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} sync tombstones!'
+        ))
@@ -0,0 +1,27 @@
+"""
+Django command to rebuild the latest answer of every user from scratch
+"""
+from django.core.management.base import BaseCommand
+
+from core import answer_state
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the latest answers"""
+    help = 'Recompute every MealAnswerState row from the MealUser answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of state rows inserted per query.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        self.stdout.write('Rebuilding latest answers...')
+        total = answer_state.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Latest answers rebuilt with {total} rows!'
+        ))
@@ -0,0 +1,27 @@
+"""
+Django command to rebuild the meal summary rollup from scratch
+"""
+from django.core.management.base import BaseCommand
+
+from core import summary
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the meal summary rollup"""
+    help = 'Recompute every MealSummary row from the MealUser answers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rollup rows inserted per query.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        self.stdout.write('Rebuilding meal summary...')
+        total = summary.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Meal summary rebuilt with {total} rows!'
+        ))
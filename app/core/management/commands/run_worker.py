@@ -0,0 +1,163 @@
+"""
+Django command to run the queued background jobs
+"""
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from core import idempotency, jobs, partitions
+from meal import sync
+
+
+# Seconds between two requeues of stale jobs, purges of finished jobs,
+# expired idempotency keys and old sync tombstones, and checks of the
+# answer partitions
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    """Django command to run background jobs"""
+    help = (
+        'Run the queued jobs with a number of threads, until SIGTERM or '
+        'SIGINT. Running jobs are finished before exiting.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Number of jobs run at once.'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait before looking again for a due job.'
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no job is due instead of waiting for more.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['concurrency'] < 1:
+            raise CommandError('Concurrency must be at least 1.')
+
+        self.stopping = threading.Event()
+        self.counts = {True: 0, False: 0}
+        self.running = set()
+        self.counts_lock = threading.Lock()
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        threads = [
+            threading.Thread(
+                target=self.work,
+                args=(
+                    f'{name}:{index}',
+                    options['poll_interval'],
+                    options['burst'],
+                ),
+                name=f'worker-{index}'
+            )
+            for index in range(options['concurrency'])
+        ]
+
+        handlers = {
+            signum: signal.signal(signum, self.stop)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        self.stdout.write(
+            f'Worker {name} running with {len(threads)} threads...'
+        )
+        try:
+            for thread in threads:
+                thread.start()
+            maintained = beaten = time.monotonic()
+            self.maintain()
+            while True:
+                alive = [thread for thread in threads if thread.is_alive()]
+                if not alive:
+                    break
+                now = time.monotonic()
+                if now - beaten >= settings.JOB_TIMEOUT / 3:
+                    self.heartbeat()
+                    beaten = now
+                if now - maintained >= MAINTENANCE_INTERVAL:
+                    self.maintain()
+                    maintained = now
+                alive[0].join(1)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+            connection.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Worker stopped after {self.counts[True]} jobs done and '
+            f'{self.counts[False]} failed!'
+        ))
+
+    def stop(self, signum, frame):
+        """Let the running jobs finish, then exit"""
+        self.stdout.write('Stopping after the running jobs...')
+        self.stopping.set()
+
+    def heartbeat(self):
+        """Keep the running jobs from being taken as abandoned"""
+        with self.counts_lock:
+            running = list(self.running)
+        jobs.heartbeat(running)
+        close_old_connections()
+
+    def maintain(self):
+        """Queue again abandoned jobs and delete old finished ones
+
+        The idempotency keys beyond their TTL or IDEMPOTENCY_KEY_MAX_ENTRIES
+        are deleted too, like purge_idempotency_keys does, and so are the
+        sync tombstones, like purge_sync_tombstones does. The answer
+        partitions of the next MEALUSER_PARTITION_MONTHS_AHEAD months are
+        created. Old partitions are only detached by mealuser_partitions.
+        """
+        requeued, failed = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Queued {requeued} abandoned jobs again')
+        if failed:
+            self.stdout.write(f'{failed} abandoned jobs had no attempt left')
+        jobs.purge()
+        idempotency.purge(max_entries=settings.IDEMPOTENCY_KEY_MAX_ENTRIES)
+        sync.purge_tombstones()
+        created = partitions.ensure_partitions(
+            settings.MEALUSER_PARTITION_MONTHS_AHEAD
+        )
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+        close_old_connections()
+
+    def work(self, name, poll_interval, burst):
+        """Run jobs one at a time until stopped"""
+        try:
+            while not self.stopping.is_set():
+                claimed = jobs.claim(name)
+                if not claimed:
+                    if burst:
+                        break
+                    self.stopping.wait(poll_interval)
+                    continue
+
+                with self.counts_lock:
+                    self.running.update(job.id for job in claimed)
+                for job in claimed:
+                    succeeded = jobs.run(job)
+                    with self.counts_lock:
+                        self.running.discard(job.id)
+                        self.counts[succeeded] += 1
+                close_old_connections()
+        finally:
+            connection.close()
@@ -0,0 +1,121 @@
+"""
+Django command to serve the app with gunicorn and uvicorn workers
+"""
+import shutil
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app import asgi_server
+from core import checks, metrics
+from core.db import pool
+
+
+class Server(BaseApplication):
+    """Gunicorn application configured by app.asgi_server"""
+
+    def __init__(self, overrides):
+        self.overrides = overrides
+        super().__init__()
+
+    def load_config(self):
+        for name, value in vars(asgi_server).items():
+            if name in self.cfg.settings:
+                self.cfg.set(name, value)
+        for name, value in self.overrides.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from app.asgi import application
+
+        return application
+
+
+class Command(BaseCommand):
+    """Django command to run the production server"""
+    help = (
+        'Wait for the database, apply the migrations, then serve the app '
+        'with gunicorn and uvicorn workers. The app is loaded before the '
+        'workers are forked. SIGHUP replaces the workers gracefully, '
+        'SIGTERM stops after the in-flight requests. Several workers need '
+        'a cache shared by the processes. Without METRICS_DIR, the workers '
+        'add up their metrics in a directory made for the run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind',
+            help='Address to listen on, ASGI_BIND by default.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Number of worker processes, by default ASGI_WORKERS or '
+                 'sized from the CPUs and memory available.'
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            help='Requests after which a worker is replaced, '
+                 'ASGI_MAX_REQUESTS by default. 0 never replaces them.'
+        )
+        parser.add_argument(
+            '--no-wait',
+            action='store_false',
+            dest='wait',
+            help='Do not wait for the database to be available.'
+        )
+        parser.add_argument(
+            '--no-migrate',
+            action='store_false',
+            dest='migrate',
+            help='Do not apply the migrations.'
+        )
+
+    def handle(self, *args, **options):
+        """Entry point for command"""
+        if options['workers'] is not None and options['workers'] < 1:
+            raise CommandError('There must be at least 1 worker.')
+        workers = options['workers'] or asgi_server.workers
+        if workers > 1 and not checks.cache_is_shared():
+            raise CommandError(
+                f'{workers} workers would each keep their own cached tokens '
+                f'and catalog. {checks.SHARED_CACHE_HINT} Or run a single '
+                'worker with --workers 1.'
+            )
+
+        if options['wait']:
+            call_command('wait_for_db', stdout=self.stdout)
+        if options['migrate']:
+            call_command('migrate', interactive=False, stdout=self.stdout)
+
+        # The workers are forked from this process, so they share the
+        # settings changed here but must not share its connections
+        metrics_dir = None
+        if not settings.METRICS_DIR:
+            metrics_dir = tempfile.mkdtemp(prefix='app-metrics-')
+            settings.METRICS_DIR = metrics_dir
+        metrics.clear()
+        connections.close_all()
+        pool.close_all()
+
+        overrides = {
+            name: options[name]
+            for name in ('bind', 'workers', 'max_requests')
+            if options[name] is not None
+        }
+        if 'max_requests' in overrides:
+            overrides['max_requests_jitter'] = overrides['max_requests'] // 10
+
+        self.stdout.write('Starting the server...')
+        try:
+            Server(overrides).run()
+        finally:
+            if metrics_dir is not None:
+                settings.METRICS_DIR = ''
+                shutil.rmtree(metrics_dir, ignore_errors=True)
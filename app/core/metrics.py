@@ -0,0 +1,382 @@
+"""
+Request metrics collected per thread and exported in Prometheus format
+"""
+import atexit
+import bisect
+import contextvars
+import glob
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from core.authentication import token_cache
+from core.db import pool, router
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LABELS = ('route', 'method', 'status')
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+Histogram = namedtuple('Histogram', ['name', 'help', 'buckets'])
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+HISTOGRAMS = (
+    Histogram(
+        'http_request_duration_seconds',
+        'Time spent answering a request.',
+        DURATION_BUCKETS
+    ),
+    Histogram(
+        'http_request_db_queries',
+        'Database queries run by a request.',
+        (0, 1, 2, 3, 5, 10, 20, 50, 100)
+    ),
+    Histogram(
+        'http_request_db_duration_seconds',
+        'Time a request spent in database queries.',
+        DURATION_BUCKETS
+    ),
+    Histogram(
+        'http_response_size_bytes',
+        'Size of a response body.',
+        (100, 1000, 10000, 100000, 1000000, 10000000)
+    ),
+)
+
+# Name: (type, help) of the samples taken from the token cache, pools and
+# replica monitor
+SAMPLES = {
+    'token_cache_entries': ('gauge', 'Tokens held by the cache.'),
+    'token_cache_hits_total': ('counter', 'Token cache hits.'),
+    'token_cache_misses_total': ('counter', 'Token cache misses.'),
+    'token_cache_evictions_total': ('counter', 'Token cache evictions.'),
+    'db_pool_max_connections': ('gauge', 'Maximum size of the pool.'),
+    'db_pool_connections': ('gauge', 'Connections held by the pool.'),
+    'db_pool_idle_connections': ('gauge', 'Idle pooled connections.'),
+    'db_pool_in_use_connections': ('gauge', 'Pooled connections in use.'),
+    'db_pool_connections_created_total': (
+        'counter',
+        'Connections opened by the pool.'
+    ),
+    'db_pool_connections_closed_total': (
+        'counter',
+        'Connections closed by the pool.'
+    ),
+    'db_pool_acquired_total': ('counter', 'Connections handed out.'),
+    'db_pool_waits_total': ('counter', 'Acquisitions that had to wait.'),
+    'db_pool_wait_seconds_total': ('counter', 'Time spent waiting.'),
+    'db_pool_timeouts_total': ('counter', 'Acquisitions that timed out.'),
+    'db_replica_up': (
+        'gauge',
+        'Processes which last found the replica usable.'
+    ),
+}
+TOKEN_CACHE_SAMPLES = {
+    'size': 'token_cache_entries',
+    'hits': 'token_cache_hits_total',
+    'misses': 'token_cache_misses_total',
+    'evictions': 'token_cache_evictions_total',
+}
+POOL_SAMPLES = {
+    'max_size': 'db_pool_max_connections',
+    'size': 'db_pool_connections',
+    'idle': 'db_pool_idle_connections',
+    'in_use': 'db_pool_in_use_connections',
+    'connections_created': 'db_pool_connections_created_total',
+    'connections_closed': 'db_pool_connections_closed_total',
+    'acquired': 'db_pool_acquired_total',
+    'waits': 'db_pool_waits_total',
+    'wait_seconds': 'db_pool_wait_seconds_total',
+    'timeouts': 'db_pool_timeouts_total',
+}
+
+# Every thread records into its own store, so recording takes no lock
+_local = threading.local()
+_stores = []
+_stores_lock = threading.Lock()
+_last_flush = 0.0
+
+
+# Timer of the request being served in the current context. Under ASGI,
+# the sync code of concurrent requests shares one thread and its
+# connections, but each request runs in its own context.
+_timer = contextvars.ContextVar('metrics_query_timer', default=None)
+
+
+class QueryTimer:
+    """Database execute wrapper counting queries and their time"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+def time_query(execute, sql, params, many, context):
+    """Execute wrapper adding a query to the current request's timer"""
+    timer = _timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_query_timer(connection):
+    """Add time_query to the execute wrappers of a connection once"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+def start_timer():
+    """Count the queries of the current context, return (timer, token)"""
+    timer = QueryTimer()
+    return timer, _timer.set(timer)
+
+
+def stop_timer(token):
+    """Stop counting the queries of the context started with token"""
+    _timer.reset(token)
+
+
+def _store():
+    """Return the store of the current thread"""
+    pid = os.getpid()
+    if getattr(_local, 'pid', None) != pid:
+        # First record of the thread, or of a forked child
+        _local.store = {}
+        _local.pid = pid
+        with _stores_lock:
+            _stores[:] = [entry for entry in _stores if entry[0] == pid]
+            _stores.append((pid, _local.store))
+
+    return _local.store
+
+
+def _new_series():
+    """Return empty histograms: one count per bucket, +Inf then the sum"""
+    return [[0] * (len(histogram.buckets) + 2) for histogram in HISTOGRAMS]
+
+
+def observe(route, method, status, values):
+    """Record a request, values holds one value per histogram"""
+    if method not in METHODS:
+        method = 'OTHER'
+    key = (route, method, str(status))
+
+    store = _store()
+    series = store.get(key)
+    if series is None:
+        series = store[key] = _new_series()
+
+    for histogram, counts, value in zip(HISTOGRAMS, series, values):
+        counts[bisect.bisect_left(histogram.buckets, value)] += 1
+        counts[-1] += value
+
+
+def _merge(target, key, series):
+    """Add series to the series of key in target"""
+    merged = target.get(key)
+    if merged is None:
+        merged = target[key] = _new_series()
+
+    for merged_counts, counts in zip(merged, series):
+        for index, value in enumerate(counts):
+            merged_counts[index] += value
+
+
+def snapshot():
+    """Return the histograms recorded by every thread of this process"""
+    pid = os.getpid()
+    with _stores_lock:
+        stores = [store for store_pid, store in _stores if store_pid == pid]
+
+    merged = {}
+    for store in stores:
+        # dict.copy() is atomic, unlike iterating a dict being written
+        for key, series in store.copy().items():
+            _merge(merged, key, series)
+
+    return merged
+
+
+def samples():
+    """Return the token cache, pool and replica samples of this process"""
+    taken = {}
+    for key, value in token_cache.stats().items():
+        taken[(TOKEN_CACHE_SAMPLES[key], ())] = value
+
+    for alias, stats in pool.stats().items():
+        for key, value in stats.items():
+            taken[(POOL_SAMPLES[key], (('alias', alias),))] = value
+
+    for alias, healthy in router.monitor.states().items():
+        taken[('db_replica_up', (('alias', alias),))] = int(healthy)
+
+    return taken
+
+
+def flush(directory=None):
+    """Write the metrics of this process for the other workers to read"""
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+
+    data = {
+        'series': [[list(key), series] for key, series in snapshot().items()],
+        'samples': [
+            [name, [list(label) for label in labels], value]
+            for (name, labels), value in samples().items()
+        ],
+    }
+    path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def maybe_flush():
+    """Flush at most once every METRICS_FLUSH_INTERVAL seconds"""
+    global _last_flush
+    if not settings.METRICS_DIR:
+        return
+
+    now = time.monotonic()
+    if now - _last_flush >= settings.METRICS_FLUSH_INTERVAL:
+        _last_flush = now
+        flush()
+
+
+def _alive(pid):
+    """Return whether a process is still running"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """Return the histograms and samples of every worker process
+
+    Without METRICS_DIR, only this process is reported. Counters of
+    workers that exited are kept so totals never go backwards, but
+    their gauges are dropped.
+    """
+    directory = settings.METRICS_DIR
+    if not directory:
+        return snapshot(), samples()
+
+    flush(directory)
+    series, taken = {}, {}
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+        try:
+            with open(path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+
+        for key, values in data['series']:
+            _merge(series, tuple(key), values)
+
+        alive = _alive(pid)
+        for name, labels, value in data['samples']:
+            if SAMPLES[name][0] == 'gauge' and not alive:
+                continue
+            key = (name, tuple(tuple(label) for label in labels))
+            taken[key] = taken.get(key, 0) + value
+
+    return series, taken
+
+
+def _escape(value):
+    """Escape a label value"""
+    return str(value).replace('\\', r'\\').replace('"', r'\"') \
+        .replace('\n', r'\n')
+
+
+def _labels(pairs):
+    """Format label pairs"""
+    if not pairs:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in pairs
+    ) + '}'
+
+
+def _number(value):
+    """Format a sample value"""
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def render():
+    """Return every metric in the Prometheus text exposition format"""
+    series, taken = collect()
+    lines = []
+    for index, histogram in enumerate(HISTOGRAMS):
+        lines.append(f'# HELP {histogram.name} {histogram.help}')
+        lines.append(f'# TYPE {histogram.name} histogram')
+        for key in sorted(series):
+            labels = list(zip(LABELS, key))
+            counts = series[key][index]
+            cumulative = 0
+            bounds = [*map(_number, histogram.buckets), '+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f'{histogram.name}_bucket'
+                    f'{_labels(labels + [("le", bound)])} {cumulative}'
+                )
+            lines.append(
+                f'{histogram.name}_sum{_labels(labels)} {_number(counts[-1])}'
+            )
+            lines.append(
+                f'{histogram.name}_count{_labels(labels)} {cumulative}'
+            )
+
+    for name, (kind, text) in SAMPLES.items():
+        keys = sorted(key for key in taken if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for key in keys:
+            lines.append(f'{name}{_labels(key[1])} {_number(taken[key])}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def clear(directory=None):
+    """Delete the metrics files of a previous run of the server"""
+    directory = directory or settings.METRICS_DIR
+    if not directory:
+        return
+
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def register_exit_flush():
+    """Flush a last time when the worker exits"""
+    if settings.METRICS_DIR:
+        atexit.register(flush)
@@ -0,0 +1,178 @@
+"""
+Middleware for the app
+"""
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils.deprecation import MiddlewareMixin
+
+from core import metrics
+from core.db import router
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Record the latency, queries and response size of every request
+
+    Requests are labelled with their route name, like meal:mealuser-list.
+    A streaming response is recorded once its content has been sent,
+    counting the queries run before it started. Queries are added to
+    the timer of the request's context, set around the rest of the
+    chain like ReplicaMiddleware does.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        metrics.register_exit_flush()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self._acall(request)
+
+        request._metrics_timer, token = metrics.start_timer()
+        try:
+            return super().__call__(request)
+        finally:
+            metrics.stop_timer(token)
+
+    async def _acall(self, request):
+        request._metrics_timer, token = metrics.start_timer()
+        try:
+            return await super().__call__(request)
+        finally:
+            metrics.stop_timer(token)
+
+    def process_request(self, request):
+        for connection in connections.all():
+            metrics.install_query_timer(connection)
+        request._metrics_started = time.perf_counter()
+
+    def process_response(self, request, response):
+        if not hasattr(request, '_metrics_started'):
+            return response
+
+        if response.streaming:
+            response.streaming_content = self._measure_stream(
+                request,
+                response,
+                response.streaming_content
+            )
+        else:
+            self._record(request, response, len(response.content))
+
+        return response
+
+    def _measure_stream(self, request, response, content):
+        """Pass the streamed content through, then record the request"""
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._record(request, response, size)
+
+    def _record(self, request, response, size):
+        """Record a finished request"""
+        timer = request._metrics_timer
+        match = request.resolver_match
+        metrics.observe(
+            match.view_name if match else 'unmatched',
+            request.method,
+            response.status_code,
+            (
+                time.perf_counter() - request._metrics_started,
+                timer.count,
+                timer.seconds,
+                size,
+            )
+        )
+        metrics.maybe_flush()
+
+
+class ReplicaMiddleware(MiddlewareMixin):
+    """Let safe requests read from the replicas
+
+    Clients are told apart by their user, session or Authorization
+    header, so it comes after AuthenticationMiddleware. Once a client
+    sends an unsafe request, its reads stay on the primary for
+    DB_REPLICA_STICKY_SECONDS so it reads its own writes. Views with a
+    true primary_reads attribute always read the primary. The replica
+    reads setting is a context variable, so it is set and reset around
+    the rest of the chain rather than in process_request/response,
+    which run in different contexts under ASGI.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self._acall(request)
+
+        token = router.enable_replica_reads(self._replica_reads(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            router.reset_replica_reads(token)
+        self._stick(request)
+        return response
+
+    async def _acall(self, request):
+        enabled = await sync_to_async(self._replica_reads)(request)
+        token = router.enable_replica_reads(enabled)
+        try:
+            response = await self.get_response(request)
+        finally:
+            router.reset_replica_reads(token)
+        await sync_to_async(self._stick)(request)
+        return response
+
+    def _clients(self, request):
+        """Return the keys telling the client of a request apart
+
+        Its user once authenticated, its session and its Authorization
+        header. A token is only resolved to a user by the view, so the
+        header still identifies token clients before it.
+        """
+        clients = []
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            clients.append(f'user:{user.pk}')
+        session = getattr(request, 'session', None)
+        if session is not None and session.session_key:
+            clients.append(f'session:{session.session_key}')
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if authorization:
+            clients.append(f'authorization:{authorization}')
+        return clients
+
+    def _primary_view(self, request):
+        """Return whether the view of a request must read the primary"""
+        try:
+            match = resolve(
+                request.path_info,
+                getattr(request, 'urlconf', None)
+            )
+        except Resolver404:
+            return False
+
+        view = getattr(match.func, 'cls', None) or \
+            getattr(match.func, 'view_class', match.func)
+        return getattr(view, 'primary_reads', False)
+
+    def _replica_reads(self, request):
+        """Return whether the reads of a request may use a replica"""
+        if request.method not in self.safe_methods:
+            return False
+        if self._primary_view(request):
+            return False
+        return not router.is_sticky(self._clients(request))
+
+    def _stick(self, request):
+        """Keep the reads of a client that wrote on the primary"""
+        if request.method not in self.safe_methods:
+            router.stick(self._clients(request))
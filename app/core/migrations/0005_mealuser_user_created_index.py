@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auto_20230401_0047'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mealuser',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='core_mealuser_user_created'),
+        ),
+    ]
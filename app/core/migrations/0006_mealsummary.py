@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-18 09:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mealuser_user_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('answer_count', models.IntegerField(default=0)),
+                ('choice_none_count', models.IntegerField(default=0)),
+                ('choice_a_bit_count', models.IntegerField(default=0)),
+                ('choice_normal_count', models.IntegerField(default=0)),
+                ('choice_a_lot_count', models.IntegerField(default=0)),
+                ('answer_int_count', models.IntegerField(default=0)),
+                ('answer_int_sum', models.BigIntegerField(default=0)),
+                ('answer_true_count', models.IntegerField(default=0)),
+                ('answer_false_count', models.IntegerField(default=0)),
+                ('meal_question', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.mealquestion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('vegetable_question', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.mealvegetable')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='mealsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('vegetable_question__isnull', True)), fields=('user', 'day', 'meal_question'), name='core_mealsummary_unique_question'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('meal_question__isnull', True)), fields=('user', 'day', 'vegetable_question'), name='core_mealsummary_unique_vegetable'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealsummary',
+            constraint=models.UniqueConstraint(condition=models.Q(('meal_question__isnull', False), ('vegetable_question__isnull', False)), fields=('user', 'day', 'meal_question', 'vegetable_question'), name='core_mealsummary_unique_both'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+"""
+Turn core_mealuser into a table range partitioned by created_at month
+
+The rows are copied into the partitioned table, so the table is locked
+while this migration runs. Monthly partitions are created from the
+oldest answer to three months ahead; manage.py mealuser_partitions
+creates the following ones. Rows outside every month land in the
+default partition.
+"""
+from django.db import migrations
+
+
+INDEXES_AND_FOREIGN_KEYS = """
+CREATE INDEX core_mealuser_meal_question_id_6456d1a7
+    ON core_mealuser (meal_question_id);
+CREATE INDEX core_mealuser_user_id_56955f1c
+    ON core_mealuser (user_id);
+CREATE INDEX core_mealuser_vegetable_question_id_7427ca81
+    ON core_mealuser (vegetable_question_id);
+CREATE INDEX core_mealuser_user_created
+    ON core_mealuser (user_id, created_at, id);
+
+ALTER TABLE core_mealuser
+    ADD CONSTRAINT core_mealuser_meal_question_id_6456d1a7_fk_core_mealquestion_id
+    FOREIGN KEY (meal_question_id) REFERENCES core_mealquestion (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE core_mealuser
+    ADD CONSTRAINT core_mealuser_user_id_56955f1c_fk_core_user_id
+    FOREIGN KEY (user_id) REFERENCES core_user (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE core_mealuser
+    ADD CONSTRAINT core_mealuser_vegetable_question_i_7427ca81_fk_core_meal
+    FOREIGN KEY (vegetable_question_id) REFERENCES core_mealvegetable (id)
+    DEFERRABLE INITIALLY DEFERRED;
+"""
+
+PARTITION = """
+CREATE TABLE core_mealuser_partitioned (
+    LIKE core_mealuser INCLUDING DEFAULTS,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE core_mealuser_default
+    PARTITION OF core_mealuser_partitioned DEFAULT;
+
+DO $$
+DECLARE
+    month timestamp;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            (
+                SELECT date_trunc(
+                    'month',
+                    coalesce(min(created_at), now()) AT TIME ZONE 'UTC'
+                )
+                FROM core_mealuser
+            ),
+            date_trunc('month', now() AT TIME ZONE 'UTC')
+                + interval '3 months',
+            interval '1 month'
+        )
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF core_mealuser_partitioned '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'core_mealuser_p' || to_char(month, 'YYYY_MM'),
+            to_char(month, 'YYYY-MM-DD') || ' 00:00:00+00',
+            to_char(month + interval '1 month', 'YYYY-MM-DD') || ' 00:00:00+00'
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO core_mealuser_partitioned SELECT * FROM core_mealuser;
+ALTER SEQUENCE core_mealuser_id_seq OWNED BY core_mealuser_partitioned.id;
+DROP TABLE core_mealuser;
+ALTER TABLE core_mealuser_partitioned RENAME TO core_mealuser;
+ALTER TABLE core_mealuser
+    RENAME CONSTRAINT core_mealuser_partitioned_pkey TO core_mealuser_pkey;
+""" + INDEXES_AND_FOREIGN_KEYS
+
+UNPARTITION = """
+CREATE TABLE core_mealuser_unpartitioned (
+    LIKE core_mealuser INCLUDING DEFAULTS
+);
+
+INSERT INTO core_mealuser_unpartitioned SELECT * FROM core_mealuser;
+ALTER SEQUENCE core_mealuser_id_seq OWNED BY core_mealuser_unpartitioned.id;
+DROP TABLE core_mealuser;
+ALTER TABLE core_mealuser_unpartitioned RENAME TO core_mealuser;
+ALTER TABLE core_mealuser ADD CONSTRAINT core_mealuser_pkey PRIMARY KEY (id);
+""" + INDEXES_AND_FOREIGN_KEYS
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_mealsummary'),
+    ]
+
+    operations = [
+        migrations.RunSQL(PARTITION, reverse_sql=UNPARTITION),
+    ]
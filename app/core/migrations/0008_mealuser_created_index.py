@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_partition_mealuser'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mealuser',
+            index=models.Index(fields=['created_at', 'id'], name='core_mealuser_created'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_home'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('question', 'MealQuestion'), ('vegetable', 'MealVegetable'), ('answer', 'MealUser')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='mealquestion',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='mealuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='mealvegetable',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='mealquestion',
+            index=models.Index(fields=['updated_at', 'id'], name='core_mealquestion_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='mealuser',
+            index=models.Index(fields=['user', 'updated_at', 'id'], name='core_mealuser_user_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='mealvegetable',
+            index=models.Index(fields=['updated_at', 'id'], name='core_mealvegetable_updated'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user', 'deleted_at', 'id'], name='core_synctombstone_user'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_at'], name='core_synctombstone_deleted'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 3.2.25 on 2026-10-18 10:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Fill the table with the latest existing answer of every user per
+# question or vegetable
+POPULATE = """
+INSERT INTO core_mealanswerstate (
+    user_id, meal_question_id, vegetable_question_id, answer_id,
+    answered_at, is_allergy, is_unnecessary, answer_type, answer_choice,
+    answer_int, answer_bool
+)
+SELECT DISTINCT ON (user_id, meal_question_id, vegetable_question_id)
+    user_id, meal_question_id, vegetable_question_id, id, created_at,
+    is_allergy, is_unnecessary, answer_type, answer_choice, answer_int,
+    answer_bool
+FROM core_mealuser
+ORDER BY user_id, meal_question_id, vegetable_question_id,
+    created_at DESC, id DESC
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealAnswerState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answer_id', models.BigIntegerField()),
+                ('answered_at', models.DateTimeField()),
+                ('is_allergy', models.BooleanField(default=False)),
+                ('is_unnecessary', models.BooleanField(default=False)),
+                ('answer_type', models.CharField(max_length=255)),
+                ('answer_choice', models.CharField(choices=[('none', '無し'), ('a bit', '少し'), ('normal', '普通'), ('a lot', 'たくさん')], max_length=10, null=True)),
+                ('answer_int', models.IntegerField(null=True)),
+                ('answer_bool', models.BooleanField(null=True)),
+                ('meal_question', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.mealquestion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('vegetable_question', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='core.mealvegetable')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='mealanswerstate',
+            constraint=models.UniqueConstraint(condition=models.Q(('vegetable_question__isnull', True)), fields=('user', 'meal_question'), name='core_mealanswerstate_unique_question'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealanswerstate',
+            constraint=models.UniqueConstraint(condition=models.Q(('meal_question__isnull', True)), fields=('user', 'vegetable_question'), name='core_mealanswerstate_unique_vegetable'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealanswerstate',
+            constraint=models.UniqueConstraint(condition=models.Q(('meal_question__isnull', False), ('vegetable_question__isnull', False)), fields=('user', 'meal_question', 'vegetable_question'), name='core_mealanswerstate_unique_both'),
+        ),
+        migrations.RunSQL(POPULATE, migrations.RunSQL.noop),
+    ]
@@ -53,21 +53,41 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     is_family = models.BooleanField(default=False)
+    home = models.ForeignKey(
+        'Home',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='members'
+    )
 
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
 
 
-# class Home(models.Model):
-#     """Home object"""
-#     pass
+class Home(models.Model):
+    """Household grouping users of the same family"""
+    name = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
 
 
 class MealQuestion(models.Model): # Meal
     """Meal questions object"""
     question = models.CharField(max_length=255, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='core_mealquestion_updated'
+            ),
+        ]
 
     def __str__(self):
         return self.question
@@ -78,6 +98,15 @@ class MealVegetable(models.Model):
     vegetable = models.CharField(max_length=255, unique=True)
     color = models.CharField(max_length=255)
     varieties = models.CharField(max_length=255)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='core_mealvegetable_updated'
+            ),
+        ]
 
     def __str__(self):
         return self.vegetable
@@ -112,10 +141,269 @@ class MealUser(models.Model):
     answer_int = models.IntegerField(null=True)
     answer_bool = models.BooleanField(null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at', 'id'],
+                name='core_mealuser_user_updated'
+            ),
+            models.Index(
+                fields=['user', 'created_at', 'id'],
+                name='core_mealuser_user_created'
+            ),
+            models.Index(
+                fields=['created_at', 'id'],
+                name='core_mealuser_created'
+            ),
+        ]
 
     def __str__(self):
-        return self.answer_choice
+        return self.answer_choice or self.answer_type
+
 
+class MealSummary(models.Model):
+    """Daily rollup of a user's answers to a question or vegetable"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    day = models.DateField()
+    meal_question = models.ForeignKey(
+        MealQuestion,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    vegetable_question = models.ForeignKey(
+        MealVegetable,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    answer_count = models.IntegerField(default=0)
+    choice_none_count = models.IntegerField(default=0)
+    choice_a_bit_count = models.IntegerField(default=0)
+    choice_normal_count = models.IntegerField(default=0)
+    choice_a_lot_count = models.IntegerField(default=0)
+    answer_int_count = models.IntegerField(default=0)
+    answer_int_sum = models.BigIntegerField(default=0)
+    answer_true_count = models.IntegerField(default=0)
+    answer_false_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'day', 'meal_question'],
+                condition=models.Q(vegetable_question__isnull=True),
+                name='core_mealsummary_unique_question'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'day', 'vegetable_question'],
+                condition=models.Q(meal_question__isnull=True),
+                name='core_mealsummary_unique_vegetable'
+            ),
+            models.UniqueConstraint(
+                fields=[
+                    'user',
+                    'day',
+                    'meal_question',
+                    'vegetable_question'
+                ],
+                condition=models.Q(
+                    meal_question__isnull=False,
+                    vegetable_question__isnull=False
+                ),
+                name='core_mealsummary_unique_both'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.day}'
+
+
+class MealAnswerState(models.Model):
+    """Latest answer of a user to a question or vegetable
+
+    answer_id has no foreign key: the partitioned core_mealuser table is
+    keyed on (id, created_at), which answer_id and answered_at copy.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    meal_question = models.ForeignKey(
+        MealQuestion,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    vegetable_question = models.ForeignKey(
+        MealVegetable,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    answer_id = models.BigIntegerField()
+    answered_at = models.DateTimeField()
+    is_allergy = models.BooleanField(default=False)
+    is_unnecessary = models.BooleanField(default=False)
+    answer_type = models.CharField(max_length=255)
+    answer_choice = models.CharField(
+        max_length=10,
+        choices=MealUser.HOW_MANY_CHOICES,
+        null=True
+    )
+    answer_int = models.IntegerField(null=True)
+    answer_bool = models.BooleanField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'meal_question'],
+                condition=models.Q(vegetable_question__isnull=True),
+                name='core_mealanswerstate_unique_question'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'vegetable_question'],
+                condition=models.Q(meal_question__isnull=True),
+                name='core_mealanswerstate_unique_vegetable'
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'meal_question', 'vegetable_question'],
+                condition=models.Q(
+                    meal_question__isnull=False,
+                    vegetable_question__isnull=False
+                ),
+                name='core_mealanswerstate_unique_both'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} {self.answer_id}'
+
+
+class IdempotencyKey(models.Model):
+    """Response of a POST to replay when it is retried with the same key"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'],
+                condition=models.Q(user__isnull=False),
+                name='core_idempotencykey_unique_user'
+            ),
+            models.UniqueConstraint(
+                fields=['key'],
+                condition=models.Q(user__isnull=True),
+                name='core_idempotencykey_unique_anonymous'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['expires_at'],
+                name='core_idempotencykey_expires'
+            ),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class SyncTombstone(models.Model):
+    """Record of a deleted row for clients syncing their changes"""
+    QUESTION = 'question'
+    VEGETABLE = 'vegetable'
+    ANSWER = 'answer'
+    KIND_CHOICES = [
+        (QUESTION, 'MealQuestion'),
+        (VEGETABLE, 'MealVegetable'),
+        (ANSWER, 'MealUser'),
+    ]
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    # Owner of a deleted answer. No constraint, so the tombstones of a
+    # user's answers can be written while the user is being deleted.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True
+    )
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted_at', 'id'],
+                name='core_synctombstone_user'
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                name='core_synctombstone_deleted'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class Job(models.Model):
+    """Background job run by the run_worker command"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict)
+    # Jobs of a higher priority run first
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    run_at = models.DateTimeField()
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only the queued jobs are searched by the workers
+            models.Index(
+                models.F('priority').desc(),
+                'run_at',
+                'id',
+                condition=models.Q(status='queued'),
+                name='core_job_queued'
+            ),
+            models.Index(
+                fields=['status', 'finished_at'],
+                name='core_job_finished'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} {self.id}'
 
 # class Sleep(models.Model):
 #     """Sleep object"""
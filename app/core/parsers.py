@@ -0,0 +1,35 @@
+"""
+Parsers for the APIs
+"""
+import io
+
+from django.conf import settings
+
+from rest_framework import parsers
+
+from core.renderers import FastJSONRenderer, orjson
+
+
+UTF8_ENCODINGS = ('utf-8', 'utf8')
+
+
+class FastJSONParser(parsers.JSONParser):
+    """JSON parser using orjson when it is installed
+
+    Bodies orjson rejects are parsed again by JSONParser, which accepts
+    integers over 64 bits and raises its usual parse errors.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or \
+                encoding.lower() not in UTF8_ENCODINGS:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,146 @@
+"""
+Monthly range partitions of the MealUser table
+"""
+import datetime
+import re
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import MealUser
+
+
+TABLE = MealUser._meta.db_table
+DEFAULT_PARTITION = f'{TABLE}_default'
+PARTITION_NAME = re.compile(rf'^{TABLE}_p(\d{{4}})_(\d{{2}})$')
+
+
+def month_start(value):
+    """Return the start of the UTC month of a datetime"""
+    value = value.astimezone(datetime.timezone.utc)
+    return datetime.datetime(
+        value.year,
+        value.month,
+        1,
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def add_months(month, count):
+    """Return the start of the month count months after month"""
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return month.replace(year=month.year + years, month=month_index + 1)
+
+
+def partition_name(month):
+    """Return the table name of the partition of a month"""
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def partitions():
+    """Return the names of the attached monthly partitions by month"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            """,
+            [TABLE]
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    found = {}
+    for name in names:
+        match = PARTITION_NAME.match(name)
+        if match:
+            month = datetime.datetime(
+                int(match.group(1)),
+                int(match.group(2)),
+                1,
+                tzinfo=datetime.timezone.utc
+            )
+            found[month] = name
+
+    return found
+
+
+def create_partition(month):
+    """Attach the partition of a month
+
+    Rows of that month which landed in the default partition are moved
+    into the new partition first, or attaching it would fail.
+    """
+    quote = connection.ops.quote_name
+    name = quote(partition_name(month))
+    start = month.isoformat()
+    end = add_months(month, 1).isoformat()
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE {name} (LIKE {quote(TABLE)} INCLUDING DEFAULTS)'
+        )
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {quote(DEFAULT_PARTITION)}
+                WHERE created_at >= %s AND created_at < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [start, end]
+        )
+        # Partition bounds must be literals, which psycopg2 quotes
+        cursor.execute(
+            f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {name} '
+            'FOR VALUES FROM (%s) TO (%s)',
+            [start, end]
+        )
+
+
+def detach_partition(name):
+    """Detach a partition, keeping it as a standalone table"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}'
+        )
+
+
+def ensure_partitions(months_ahead, now=None):
+    """Create the partitions of this month and the next months_ahead
+
+    Concurrent callers wait for each other, so a partition is created
+    once. Return the names of the created partitions.
+    """
+    current = month_start(now or timezone.now())
+
+    created = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [TABLE])
+        existing = partitions()
+        for count in range(months_ahead + 1):
+            month = add_months(current, count)
+            if month not in existing:
+                create_partition(month)
+                created.append(partition_name(month))
+
+    return created
+
+
+def detach_old_partitions(retain_months, now=None):
+    """Detach the partitions older than the last retain_months months
+
+    The current month counts as one. Return the detached names.
+    """
+    oldest = add_months(month_start(now or timezone.now()), 1 - retain_months)
+
+    detached = []
+    for month, name in sorted(partitions().items()):
+        if month < oldest:
+            detach_partition(name)
+            detached.append(name)
+
+    return detached
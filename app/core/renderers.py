@@ -0,0 +1,87 @@
+"""
+Renderers for the APIs
+"""
+import csv
+import io
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Renderer for newline delimited JSON
+
+    Exports stream their rows themselves, so this only renders other
+    responses of an export view such as errors, one object per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        items = data if isinstance(data, list) else [data]
+        return ''.join(
+            json.dumps(item, ensure_ascii=False) + '\n' for item in items
+        ).encode(self.charset)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Renderer for CSV
+
+    Exports stream their rows themselves, so this only renders other
+    responses of an export view such as errors, as key/value rows.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        items = data.items() if isinstance(data, dict) else enumerate(data)
+        for key, value in items:
+            writer.writerow([key, value])
+        return buffer.getvalue().encode(self.charset)
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """JSON renderer using orjson when it is installed
+
+    The output is the one of JSONRenderer: types orjson does not know,
+    like lazy translation strings and Decimal, go through DRF's encoder.
+    Indented output, and values orjson cannot encode such as integers
+    over 64 bits, are rendered by JSONRenderer.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+    default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if orjson is None or self.ensure_ascii or not self.compact or \
+                self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.default, option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Escape like JSONRenderer so the output stays a JavaScript subset
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028') \
+                .replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,181 @@
+"""
+OpenAPI schema generated once per code version, kept in memory and on disk
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+import drf_spectacular
+import rest_framework
+from django.conf import settings
+from django.urls import URLResolver, get_resolver
+from django.utils.text import compress_string
+
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+
+logger = logging.getLogger(__name__)
+
+# Renderer of each format, keyed like the renderers' format attribute
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+Schema = namedtuple('Schema', ['fingerprint', 'documents'])
+Document = namedtuple('Document', ['body', 'gzipped', 'etag'])
+
+_schema = None
+_lock = threading.Lock()
+
+
+def _sources_version():
+    """Return a hash of the project's Python sources"""
+    base_dir = Path(settings.BASE_DIR)
+    digest = hashlib.sha256()
+    for path in sorted(base_dir.rglob('*.py')):
+        digest.update(str(path.relative_to(base_dir)).encode())
+        digest.update(path.read_bytes())
+
+    return digest.hexdigest()
+
+
+def _describe_urls(patterns, prefix=''):
+    """Yield a line per route with its pattern and view"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _describe_urls(
+                pattern.url_patterns,
+                prefix + str(pattern.pattern)
+            )
+            continue
+
+        callback = pattern.callback
+        yield (
+            f'{prefix}{pattern.pattern} {callback.__module__}.'
+            f'{callback.__qualname__} {getattr(callback, "actions", "")}'
+        )
+
+
+@functools.lru_cache(maxsize=None)
+def fingerprint():
+    """Return the version of the schema
+
+    It changes with APP_VERSION, or the sources when it is not set, the
+    URL conf and the versions of DRF and drf-spectacular.
+    """
+    digest = hashlib.sha256()
+    digest.update((settings.APP_VERSION or _sources_version()).encode())
+    digest.update(
+        f'{rest_framework.VERSION} {drf_spectacular.__version__}'.encode()
+    )
+    resolver = get_resolver(spectacular_settings.SERVE_URLCONF)
+    for line in _describe_urls(resolver.url_patterns):
+        digest.update(line.encode() + b'\n')
+
+    return digest.hexdigest()[:20]
+
+
+def generate():
+    """Generate the schema and return its body in every format"""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=spectacular_settings.SERVE_URLCONF
+    )
+    data = generator.get_schema(
+        request=None,
+        public=spectacular_settings.SERVE_PUBLIC
+    )
+
+    return {
+        schema_format: renderer().render(data, renderer.media_type, {})
+        for schema_format, renderer in RENDERERS.items()
+    }
+
+
+def _path(key, schema_format):
+    """Return the path of a schema in the disk cache"""
+    return os.path.join(
+        settings.API_SCHEMA_CACHE_DIR,
+        f'schema-{key}.{schema_format}'
+    )
+
+
+def _read(key):
+    """Return the bodies of a schema from the disk cache, if there"""
+    bodies = {}
+    try:
+        for schema_format in RENDERERS:
+            with open(_path(key, schema_format), 'rb') as file:
+                bodies[schema_format] = file.read()
+    except OSError:
+        return None
+
+    return bodies
+
+
+def _write(key, bodies):
+    """Save the bodies of a schema to the disk cache"""
+    try:
+        os.makedirs(settings.API_SCHEMA_CACHE_DIR, exist_ok=True)
+        for schema_format, body in bodies.items():
+            path = _path(key, schema_format)
+            temporary = f'{path}.{os.getpid()}.tmp'
+            with open(temporary, 'wb') as file:
+                file.write(body)
+            os.replace(temporary, path)
+    except OSError as exc:
+        logger.warning('Could not save the API schema: %s', exc)
+
+
+def _load(key, bodies):
+    """Keep the schema in memory and return it"""
+    global _schema
+    _schema = Schema(key, {
+        schema_format: Document(
+            body=body,
+            gzipped=compress_string(body),
+            etag=f'"{key}-{schema_format}"'
+        )
+        for schema_format, body in bodies.items()
+    })
+    return _schema
+
+
+def get():
+    """Return the schema, generating it only if no cache has it"""
+    key = fingerprint()
+    schema = _schema
+    if schema is not None and schema.fingerprint == key:
+        return schema
+
+    with _lock:
+        if _schema is not None and _schema.fingerprint == key:
+            return _schema
+
+        bodies = _read(key)
+        if bodies is None:
+            bodies = generate()
+            _write(key, bodies)
+        return _load(key, bodies)
+
+
+def refresh():
+    """Generate the schema again and replace the cached one"""
+    key = fingerprint()
+    with _lock:
+        bodies = generate()
+        _write(key, bodies)
+        return _load(key, bodies)
+
+
+def warm():
+    """Load the schema at startup, without failing the startup"""
+    try:
+        get()
+    except Exception:
+        logger.exception('Could not generate the API schema')
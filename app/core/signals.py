@@ -0,0 +1,107 @@
+"""
+Signal handlers for the core app
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from core import answer_state, summary
+from core.authentication import bump_generations, token_cache
+from core.models import MealUser
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Drop a deleted token from the token caches of every process"""
+    key = instance.key
+    token_cache.invalidate(key)
+    transaction.on_commit(lambda: bump_generations([key]))
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """Drop the cached tokens of a changed user in every process
+
+    The generations change once the transaction commits, so no process
+    caches the user as it was before. A new user has no token yet.
+    """
+    user_id = instance.pk
+    token_cache.invalidate_user(user_id)
+    if created:
+        return
+
+    def bump():
+        bump_generations(
+            Token.objects.filter(user_id=user_id).values_list(
+                'key',
+                flat=True
+            )
+        )
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_delete, sender=get_user_model())
+def forget_user_tokens(sender, instance, **kwargs):
+    """Drop the cached tokens of a deleted user
+
+    Its tokens are deleted with it, which reaches the other processes.
+    """
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(pre_save, sender=MealUser)
+def remember_previous_answer(sender, instance, **kwargs):
+    """Keep the stored answer of an updated MealUser for the rollup"""
+    instance._previous_answer = None
+    if instance.pk is not None and not instance._state.adding:
+        instance._previous_answer = MealUser.objects.filter(
+            pk=instance.pk
+        ).values(*summary.ANSWER_FIELDS).first()
+
+
+@receiver(post_save, sender=MealUser)
+def add_answer_to_summary(sender, instance, created, **kwargs):
+    """Add a saved MealUser to the rollup"""
+    deltas = summary.compute_deltas([summary.answer_values(instance)])
+    previous = getattr(instance, '_previous_answer', None)
+    if not created and previous is not None:
+        deltas = summary.merge_deltas(
+            summary.compute_deltas([previous], sign=-1),
+            deltas
+        )
+
+    summary.apply_deltas(deltas)
+
+
+@receiver(post_delete, sender=MealUser)
+def remove_answer_from_summary(sender, instance, **kwargs):
+    """Remove a deleted MealUser from the rollup"""
+    summary.apply_deltas(summary.compute_deltas(
+        [summary.answer_values(instance)],
+        sign=-1
+    ))
+
+
+@receiver(post_save, sender=MealUser)
+def update_answer_state(sender, instance, created, **kwargs):
+    """Make a saved MealUser the latest answer to its question"""
+    answer = answer_state.answer_values(instance)
+    previous = getattr(instance, '_previous_answer', None)
+    if not created and previous is not None and \
+            answer_state.answer_key(previous) != \
+            answer_state.answer_key(answer):
+        # The answer moved to another question, whose previous answer
+        # becomes the latest again
+        answer_state.forget_answers([{**previous, 'id': instance.pk}])
+
+    answer_state.apply_answers([answer])
+
+
+@receiver(post_delete, sender=MealUser)
+def remove_answer_state(sender, instance, **kwargs):
+    """Make the answer before a deleted MealUser the latest one"""
+    answer_state.forget_answers([answer_state.answer_values(instance)])
@@ -0,0 +1,201 @@
+"""
+Incremental maintenance of the MealSummary rollup
+"""
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from core.models import MealSummary, MealUser
+
+
+CHOICE_FIELDS = {
+    'none': 'choice_none_count',
+    'a bit': 'choice_a_bit_count',
+    'normal': 'choice_normal_count',
+    'a lot': 'choice_a_lot_count',
+}
+COUNT_FIELDS = [
+    'answer_count',
+    *CHOICE_FIELDS.values(),
+    'answer_int_count',
+    'answer_int_sum',
+    'answer_true_count',
+    'answer_false_count',
+]
+ANSWER_FIELDS = [
+    'user_id',
+    'created_at',
+    'meal_question_id',
+    'vegetable_question_id',
+    'answer_choice',
+    'answer_int',
+    'answer_bool',
+]
+
+
+def summary_key(user_id, day, meal_question_id, vegetable_question_id):
+    """Return the key identifying a rollup row"""
+    return (user_id, day, meal_question_id, vegetable_question_id)
+
+
+def compute_deltas(answers, sign=1):
+    """Return the rollup changes caused by adding or removing answers
+
+    Answers are dicts of ANSWER_FIELDS, removed answers use sign=-1.
+    """
+    deltas = defaultdict(Counter)
+    for answer in answers:
+        delta = deltas[summary_key(
+            answer['user_id'],
+            timezone.localdate(answer['created_at']),
+            answer['meal_question_id'],
+            answer['vegetable_question_id']
+        )]
+        delta['answer_count'] += sign
+        if answer['answer_choice'] in CHOICE_FIELDS:
+            delta[CHOICE_FIELDS[answer['answer_choice']]] += sign
+        if answer['answer_int'] is not None:
+            delta['answer_int_count'] += sign
+            delta['answer_int_sum'] += sign * answer['answer_int']
+        if answer['answer_bool'] is True:
+            delta['answer_true_count'] += sign
+        elif answer['answer_bool'] is False:
+            delta['answer_false_count'] += sign
+
+    return deltas
+
+
+def answer_values(meal_user):
+    """Return the fields of a MealUser the rollup depends on"""
+    return {field: getattr(meal_user, field) for field in ANSWER_FIELDS}
+
+
+def merge_deltas(*all_deltas):
+    """Merge several rollup changes into one"""
+    merged = defaultdict(Counter)
+    for deltas in all_deltas:
+        for key, delta in deltas.items():
+            merged[key].update(delta)
+
+    return merged
+
+
+def _apply(deltas):
+    """Apply rollup changes, the caller must hold a transaction"""
+    rows = MealSummary.objects.select_for_update().filter(
+        user_id__in={key[0] for key in deltas},
+        day__in={key[1] for key in deltas}
+    )
+    existing = {
+        summary_key(
+            row.user_id,
+            row.day,
+            row.meal_question_id,
+            row.vegetable_question_id
+        ): row
+        for row in rows
+    }
+
+    to_update = []
+    to_create = []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            # Removing answers whose row is already gone, e.g. when the
+            # user is being deleted, leaves nothing to update
+            if delta['answer_count'] <= 0:
+                continue
+            user_id, day, meal_question_id, vegetable_question_id = key
+            to_create.append(MealSummary(
+                user_id=user_id,
+                day=day,
+                meal_question_id=meal_question_id,
+                vegetable_question_id=vegetable_question_id,
+                **{field: delta[field] for field in COUNT_FIELDS}
+            ))
+            continue
+
+        for field in COUNT_FIELDS:
+            setattr(row, field, getattr(row, field) + delta[field])
+        to_update.append(row)
+
+    if to_update:
+        MealSummary.objects.bulk_update(to_update, COUNT_FIELDS)
+    if to_create:
+        MealSummary.objects.bulk_create(to_create)
+
+
+def apply_deltas(deltas):
+    """Apply rollup changes with a few queries whatever their size"""
+    deltas = {key: delta for key, delta in deltas.items() if any(
+        delta.values()
+    )}
+    if not deltas:
+        return
+
+    try:
+        with transaction.atomic():
+            _apply(deltas)
+    except IntegrityError:
+        # A concurrent writer created one of the rows first, so the rows
+        # now exist and can be locked and updated
+        with transaction.atomic():
+            _apply(deltas)
+
+
+def record_answers(meal_users):
+    """Add newly created answers to the rollup"""
+    apply_deltas(compute_deltas(
+        answer_values(meal_user) for meal_user in meal_users
+    ))
+
+
+def totals(queryset, *fields):
+    """Add up rollup rows per question and vegetable
+
+    The rows are grouped on fields first, for instance the user.
+    """
+    group_by = [*fields, 'meal_question', 'vegetable_question']
+    return queryset.values(*group_by).annotate(
+        **{field: Sum(field) for field in COUNT_FIELDS}
+    ).order_by(*group_by)
+
+
+def rebuild(batch_size=1000):
+    """Recompute the whole rollup from MealUser and return its size"""
+    rows = MealUser.objects.annotate(
+        day=TruncDate('created_at')
+    ).values(
+        'user_id',
+        'day',
+        'meal_question_id',
+        'vegetable_question_id'
+    ).annotate(
+        answer_count=Count('id'),
+        answer_int_count=Count('answer_int'),
+        answer_int_sum=Coalesce(Sum('answer_int'), 0),
+        answer_true_count=Count('id', filter=Q(answer_bool=True)),
+        answer_false_count=Count('id', filter=Q(answer_bool=False)),
+        **{
+            field: Count('id', filter=Q(answer_choice=choice))
+            for choice, field in CHOICE_FIELDS.items()
+        }
+    ).order_by()
+
+    total = 0
+    with transaction.atomic():
+        MealSummary.objects.all().delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(MealSummary(**row))
+            if len(batch) >= batch_size:
+                MealSummary.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        MealSummary.objects.bulk_create(batch)
+        total += len(batch)
+
+    return total
@@ -0,0 +1,45 @@
+"""
+Jobs run in the background by the run_worker command
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from core import answer_state, jobs, summary
+from core.models import MealUser, SyncTombstone
+from meal import recommendations
+
+
+@jobs.register('rebuild_meal_summary')
+def rebuild_meal_summary(batch_size=1000):
+    """Recompute the meal summary rollup"""
+    summary.rebuild(batch_size=batch_size)
+
+
+@jobs.register('rebuild_answer_state')
+def rebuild_answer_state(batch_size=1000):
+    """Recompute the latest answer of every user"""
+    answer_state.rebuild(batch_size=batch_size)
+
+
+@jobs.register('delete_user')
+def delete_user(user_id):
+    """Delete a user with their answers, rollup rows and tokens
+
+    The answers are deleted in one statement, without the signals that
+    would update the rollups and record a tombstone for each answer.
+    The user's rollup and state rows are then deleted by the cascade in
+    one statement each, and its tombstones with it.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            table = connection.ops.quote_name(MealUser._meta.db_table)
+            cursor.execute(
+                f'DELETE FROM {table} WHERE user_id = %s',
+                [user_id]
+            )
+        SyncTombstone.objects.filter(user_id=user_id).delete()
+        get_user_model().objects.filter(id=user_id).delete()
+        transaction.on_commit(lambda: cache.delete(
+            recommendations.CACHE_KEY.format(user_id=user_id)
+        ))
@@ -1,9 +1,16 @@
 """
 Tests for the Django admin modification
 """
-from django.test import TestCase, Client
+import datetime
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
+
+from core import admin, models
 
 
 class AdminSiteTests(TestCase):
@@ -48,3 +55,121 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_export_meal_users_action(self):
+        """Test staff can export the answers of every user"""
+        meal_question = models.MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+        for user in [self.admin_user, self.user]:
+            models.MealUser.objects.create(
+                user=user,
+                meal_question=meal_question,
+                answer_type='choice',
+                answer_choice='none'
+            )
+        url = reverse('admin:core_mealuser_changelist')
+
+        res = self.client.post(url, {
+            'action': 'export_csv',
+            'select_across': '1',
+            '_selected_action': models.MealUser.objects.values_list(
+                'pk',
+                flat=True
+            ),
+        })
+
+        self.assertEqual(res.status_code, 200)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['user', 'id'])
+        self.assertEqual(len(lines), 3)
+
+
+class MealUserAdminTests(TestCase):
+    """Tests for the admin pages of meal answers"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='tesTpass123'
+        )
+        self.client.force_login(self.admin_user)
+        self.meal_question = models.MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+
+    def create_answers(self, count, created_at=None):
+        """Create count answers of the admin user"""
+        answers = models.MealUser.objects.bulk_create([
+            models.MealUser(
+                user=self.admin_user,
+                meal_question=self.meal_question,
+                answer_type='int',
+                answer_int=index
+            )
+            for index in range(count)
+        ])
+        if created_at is not None:
+            models.MealUser.objects.filter(
+                pk__in=[answer.pk for answer in answers]
+            ).update(created_at=created_at)
+
+    def test_changelist_queries_do_not_grow(self):
+        """Test the changelist runs the same queries for more answers"""
+        url = reverse('admin:core_mealuser_changelist')
+        self.create_answers(3)
+        with CaptureQueriesContext(connection) as few:
+            res = self.client.get(url)
+        self.create_answers(30)
+
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(many), len(few))
+
+    def test_date_hierarchy_lists_months(self):
+        """Test the date hierarchy lists the months of the answers"""
+        self.create_answers(
+            2,
+            created_at=datetime.datetime(2021, 3, 15, tzinfo=timezone.utc)
+        )
+        self.create_answers(
+            2,
+            created_at=datetime.datetime(2021, 5, 15, tzinfo=timezone.utc)
+        )
+        url = reverse('admin:core_mealuser_changelist')
+
+        res = self.client.get(url, {'created_at__year': '2021'})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'created_at__month=3')
+        self.assertContains(res, 'created_at__month=5')
+
+    def test_change_page(self):
+        """Test the change page of an answer without a choice works"""
+        self.create_answers(1)
+        answer = models.MealUser.objects.get()
+        url = reverse('admin:core_mealuser_change', args=[answer.pk])
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=0)
+    def test_paginator_estimates_count(self):
+        """Test big tables are counted from the planner statistics"""
+        self.create_answers(5)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_mealuser')
+        queryset = models.MealUser.objects.order_by('id')
+
+        paginator = admin.EstimatedCountPaginator(queryset, 100)
+        filtered = admin.EstimatedCountPaginator(
+            queryset.filter(answer_int__gte=2),
+            100
+        )
+
+        self.assertEqual(paginator.count, 5)
+        self.assertGreaterEqual(filtered.count, 1)
@@ -0,0 +1,162 @@
+"""
+Tests for the async API views served through ASGI
+"""
+import asyncio
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from core.authentication import token_cache
+from core.models import MealQuestion, MealUser
+
+
+MEAL_QUESTION_URL = '/api/meal/meal-question/'
+MEAL_USER_URL = '/api/meal/meal-user/'
+ME_URL = '/api/user/me/'
+
+
+@override_settings(ROOT_URLCONF='app.asgi_urls')
+class AsyncAPITests(TestCase):
+    """Test the async read paths"""
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='tesTpass123',
+            first_name='Taro',
+            last_name='Test',
+            gender='male'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.meal_question = MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+        self.client = AsyncClient()
+        self.headers = {'authorization': f'Token {self.token.key}'}
+
+    def test_url_names(self):
+        """Test the async paths keep the names of the sync views"""
+        for name, url in [
+            ('meal:mealquestion-list', MEAL_QUESTION_URL),
+            ('meal:mealuser-list', MEAL_USER_URL),
+            ('user:me', ME_URL),
+        ]:
+            self.assertEqual(reverse(name), url)
+            self.assertEqual(resolve(url).view_name, name)
+
+        self.assertEqual(reverse('meal:summary'), '/api/meal/summary/')
+        self.assertEqual(reverse('metrics'), '/metrics')
+
+    async def test_auth_required(self):
+        """Test auth is required to call the async views"""
+        res = await self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    async def test_invalid_token_error(self):
+        """Test an unknown token is rejected"""
+        res = await self.client.get(ME_URL, authorization='Token wrong')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_retrieve_me(self):
+        """Test retrieving the authenticated user"""
+        res = await self.client.get(ME_URL, **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {
+            'email': 'user@example.com',
+            'first_name': 'Taro',
+            'last_name': 'Test',
+            'gender': 'male'
+        })
+
+    async def test_cached_token_resolved_off_event_loop(self):
+        """Test the shared cache is never called from the event loop"""
+        await self.client.get(ME_URL, **self.headers)
+        loops = []
+        get_generation = patch(
+            'core.authentication.get_generation',
+            side_effect=lambda key: loops.append(self.running_loop())
+        )
+
+        with get_generation:
+            res = await self.client.get(ME_URL, **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(loops, [None])
+
+    def running_loop(self):
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    async def test_list_meal_questions(self):
+        """Test listing the catalog with validators"""
+        res = await self.client.get(MEAL_QUESTION_URL, **self.headers)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()[0]['id'], self.meal_question.id)
+
+        res = await self.client.get(
+            MEAL_QUESTION_URL,
+            if_none_match=res['ETag'],
+            **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def create_answers(self, count):
+        for answer in range(count):
+            MealUser.objects.create(
+                user=self.user,
+                meal_question=self.meal_question,
+                answer_type='int',
+                answer_int=answer
+            )
+
+    async def test_list_meal_user_history(self):
+        """Test listing the answer history page by page"""
+        await sync_to_async(self.create_answers)(3)
+
+        res = await self.client.get(
+            f'{MEAL_USER_URL}?page_size=2',
+            **self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = res.json()
+        self.assertEqual([item['answer_int'] for item in data['results']],
+                         [2, 1])
+        self.assertIsNotNone(data['next'])
+
+    async def test_create_meal_user_falls_back_to_sync_view(self):
+        """Test writes to an async path are handled by the DRF view"""
+        payload = {
+            'meal_question': self.meal_question.id,
+            'answer_type': 'choice',
+            'answer_choice': 'a lot'
+        }
+
+        res = await self.client.post(
+            MEAL_USER_URL,
+            payload,
+            content_type='application/json',
+            **self.headers
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        exists = await sync_to_async(
+            MealUser.objects.filter(user=self.user).exists
+        )()
+        self.assertTrue(exists)
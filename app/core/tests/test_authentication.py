@@ -0,0 +1,167 @@
+"""
+Tests for the cached token authentication
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import (
+    TokenCache,
+    bump_generations,
+    get_generation,
+    token_cache
+)
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test authenticating with cached tokens"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='tesTpass123',
+            first_name='Taro',
+            last_name='Test',
+            gender='male'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_token_resolved_from_cache(self):
+        """Test a known token is resolved without a query"""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token is no longer accepted"""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_user_rejected(self):
+        """Test a deactivated user is no longer accepted"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates_cache(self):
+        """Test changing the password drops the cached user"""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'password': 'Newpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        with patch.object(token_cache, 'set') as patched_set:
+            self.client.get(ME_URL)
+
+        cached_user = patched_set.call_args[0][1]
+        self.assertEqual(cached_user.password, self.user.password)
+
+    def test_change_by_other_process_drops_entry(self):
+        """Test a new token generation drops the entry of this process"""
+        self.client.get(ME_URL)
+
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            is_active=False
+        )
+        bump_generations([self.token.key])
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_saved_user_bumps_generation(self):
+        """Test saving a user changes its token generation on commit"""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertIsNotNone(get_generation(self.token.key))
+
+    def test_update_keeps_fields_changed_since_cached(self):
+        """Test an update from a cached user only writes its fields"""
+        self.client.get(ME_URL)
+        get_user_model().objects.filter(pk=self.user.pk).update(
+            last_name='Other',
+            is_active=False
+        )
+
+        self.client.patch(ME_URL, {'first_name': 'Jiro'})
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Jiro')
+        self.assertEqual(self.user.last_name, 'Other')
+        self.assertFalse(self.user.is_active)
+
+
+class TokenCacheTests(TestCase):
+    """Test the token cache"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='tesTpass123'
+        )
+
+    def test_least_recently_used_evicted(self):
+        """Test the least recently used token is evicted when full"""
+        cache = TokenCache(max_size=2, ttl=60)
+        tokens = [Token(key=f'key{i}', user=self.user) for i in range(3)]
+
+        cache.set('key0', self.user, tokens[0])
+        cache.set('key1', self.user, tokens[1])
+        cache.get('key0')
+        cache.set('key2', self.user, tokens[2])
+
+        self.assertIsNotNone(cache.get('key0'))
+        self.assertIsNone(cache.get('key1'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    @patch('core.authentication.time.monotonic')
+    def test_expired_token_dropped(self, patched_monotonic):
+        """Test an entry is dropped once its TTL passed"""
+        cache = TokenCache(max_size=2, ttl=60)
+        patched_monotonic.return_value = 100
+
+        cache.set('key', self.user, Token(key='key', user=self.user))
+        patched_monotonic.return_value = 161
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['size'], 0)
+
+    def test_snapshot_restored_as_new_instance(self):
+        """Test each hit returns a new user instance"""
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('key', self.user, Token(key='key', user=self.user))
+
+        user, token = cache.get('key')
+        other_user, _ = cache.get('key')
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(user.email, self.user.email)
+        self.assertIsNot(user, other_user)
+        self.assertEqual(token.key, 'key')
@@ -0,0 +1,65 @@
+"""
+Tests for the API benchmark and its query budgets
+"""
+from django.test import TestCase
+
+from core import benchmark
+
+
+class BenchmarkTests(TestCase):
+    """Test every endpoint stays within its query budget"""
+
+    def test_every_endpoint_has_a_budget(self):
+        """Test each user and meal route is benchmarked"""
+        benchmarked = {endpoint.url_name for endpoint in benchmark.ENDPOINTS}
+
+        self.assertEqual(benchmark.url_names() - benchmarked, set())
+
+    def test_query_budgets(self):
+        """Test no endpoint runs more queries than its budget"""
+        dataset = benchmark.seed(
+            users=3,
+            answers=20,
+            questions=5,
+            vegetables=5
+        )
+
+        results = benchmark.run(dataset, iterations=2, warmup=1)
+
+        self.assertEqual(benchmark.failures(results), [])
+
+    def test_queries_do_not_grow_with_data(self):
+        """Test query counts do not depend on the amount of data"""
+        small = benchmark.run(
+            benchmark.seed(users=1, answers=2, questions=2, vegetables=2),
+            iterations=1,
+            warmup=1
+        )
+        large = benchmark.run(
+            benchmark.seed(users=2, answers=150, questions=40, vegetables=20),
+            iterations=1,
+            warmup=1
+        )
+
+        self.assertEqual(
+            [result['queries'] for result in large],
+            [result['queries'] for result in small]
+        )
+
+    def test_compare_serializers(self):
+        """Test both serializers are timed on the same history"""
+        dataset = benchmark.seed(
+            users=1,
+            answers=50,
+            questions=3,
+            vegetables=3
+        )
+
+        result = benchmark.compare_serializers(dataset.user, repeat=1)
+
+        self.assertEqual(result['rows'], 50)
+        self.assertEqual(
+            set(result['best_ms']),
+            {'model_serializer', 'values_serializer'}
+        )
+        self.assertGreater(result['speedup'], 0)
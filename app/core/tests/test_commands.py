@@ -1,13 +1,23 @@
 """
 Test custom Django management commands
 """
+import json
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.conf import settings
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app import asgi_server
+from core.management.commands import serve
+from core.models import MealQuestion, MealVegetable
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -32,3 +42,195 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class LoadCatalogTests(TestCase):
+    """Test the load_catalog command."""
+
+    def write_file(self, suffix, content):
+        """Write a temporary catalog file and return its path"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def load(self, *args):
+        """Run the command and return its output"""
+        out = StringIO()
+        call_command('load_catalog', *args, stdout=out)
+        return out.getvalue()
+
+    def test_load_vegetables_csv(self):
+        """Test vegetables are inserted, updated or left unchanged"""
+        MealVegetable.objects.create(
+            vegetable='Carrot',
+            color='orange',
+            varieties='1'
+        )
+        MealVegetable.objects.create(
+            vegetable='Leek',
+            color='green',
+            varieties='2'
+        )
+        path = self.write_file(
+            '.csv',
+            'vegetable,color,varieties\n'
+            'Carrot,purple,3\n'
+            'Leek,green,2\n'
+            'Beet,red,1\n'
+            'Beet,red,4\n'
+        )
+
+        out = self.load('vegetables', path)
+
+        self.assertIn('3 vegetables: 1 inserted, 1 updated, 1 unchanged', out)
+        carrot = MealVegetable.objects.get(vegetable='Carrot')
+        self.assertEqual((carrot.color, carrot.varieties), ('purple', '3'))
+        self.assertEqual(
+            MealVegetable.objects.get(vegetable='Beet').varieties,
+            '4'
+        )
+        self.assertEqual(MealVegetable.objects.count(), 3)
+
+    def test_load_questions_json(self):
+        """Test existing questions are kept and new ones added"""
+        MealQuestion.objects.create(question='Breakfast?')
+        path = self.write_file('.json', json.dumps([
+            {'question': 'Breakfast?'},
+            {'question': 'Lunch?'},
+        ]))
+
+        out = self.load('questions', path)
+
+        self.assertIn('2 questions: 1 inserted, 0 updated, 1 unchanged', out)
+        self.assertEqual(
+            sorted(MealQuestion.objects.values_list('question', flat=True)),
+            ['Breakfast?', 'Lunch?']
+        )
+
+    def test_load_missing_column(self):
+        """Test a record without a required column loads nothing"""
+        path = self.write_file('.json', json.dumps([
+            {'vegetable': 'Kale', 'color': 'green'},
+        ]))
+
+        with self.assertRaises(CommandError):
+            self.load('vegetables', path)
+
+        self.assertFalse(MealVegetable.objects.exists())
+
+
+@patch('core.management.commands.serve.Server')
+@patch('core.management.commands.serve.call_command')
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'cache',
+}})
+class ServeCommandTests(SimpleTestCase):
+    """Test the serve command."""
+
+    def test_serve(self, patched_call_command, patched_server):
+        """Test the database is awaited and migrated before serving"""
+        with tempfile.TemporaryDirectory() as directory:
+            stale = os.path.join(directory, 'metrics-1.json')
+            open(stale, 'w').close()
+
+            with override_settings(METRICS_DIR=directory):
+                call_command('serve', workers=3, stdout=StringIO())
+
+            self.assertFalse(os.path.exists(stale))
+
+        self.assertEqual(
+            [call.args[0] for call in patched_call_command.call_args_list],
+            ['wait_for_db', 'migrate']
+        )
+        patched_server.assert_called_once_with({'workers': 3})
+        patched_server.return_value.run.assert_called_once_with()
+
+    def test_serve_without_migrating(self, patched_call_command,
+                                     patched_server):
+        """Test waiting and migrating can be skipped"""
+        call_command(
+            'serve',
+            '--no-wait',
+            '--no-migrate',
+            '--max-requests=500',
+            stdout=StringIO()
+        )
+
+        patched_call_command.assert_not_called()
+        patched_server.assert_called_once_with(
+            {'max_requests': 500, 'max_requests_jitter': 50}
+        )
+
+    def test_metrics_dir_made_for_the_run(self, patched_call_command,
+                                          patched_server):
+        """Test the workers share a metrics directory without METRICS_DIR"""
+        seen = []
+        patched_server.return_value.run.side_effect = \
+            lambda: seen.append(settings.METRICS_DIR)
+
+        with override_settings(METRICS_DIR=''):
+            call_command('serve', '--no-wait', '--no-migrate',
+                         stdout=StringIO())
+            self.assertEqual(settings.METRICS_DIR, '')
+
+        directory, = seen
+        self.assertTrue(directory)
+        self.assertFalse(os.path.exists(directory))
+
+    def test_workers_need_shared_cache(self, patched_call_command,
+                                       patched_server):
+        """Test several workers with a per process cache are refused"""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+
+        with override_settings(CACHES=locmem):
+            with self.assertRaises(CommandError):
+                call_command('serve', '--no-wait', workers=2,
+                             stdout=StringIO())
+            patched_server.assert_not_called()
+
+            call_command('serve', '--no-wait', '--no-migrate', workers=1,
+                         stdout=StringIO())
+        patched_server.assert_called_once_with({'workers': 1})
+
+
+class ServerConfigTests(SimpleTestCase):
+    """Test the gunicorn configuration of the server."""
+
+    def test_config(self):
+        """Test the settings come from app.asgi_server"""
+        server = serve.Server({'workers': 2})
+
+        self.assertEqual(server.cfg.workers, 2)
+        self.assertTrue(server.cfg.preload_app)
+        self.assertEqual(server.cfg.worker_class_str, asgi_server.worker_class)
+        self.assertIs(server.cfg.pre_fork, asgi_server.pre_fork)
+
+    def test_workers_per_cpu(self):
+        """Test 2 workers per CPU plus one are started"""
+        self.assertEqual(asgi_server.default_workers(2, None), 5)
+
+    def test_workers_capped_by_memory(self):
+        """Test no more workers are started than the memory holds"""
+        with patch.dict(os.environ, {'ASGI_WORKER_MEMORY_MB': '256'}):
+            workers = asgi_server.default_workers(8, 1024 * 1024 * 1024)
+            one = asgi_server.default_workers(8, 1)
+
+        self.assertEqual(workers, 4)
+        self.assertEqual(one, 1)
+
+    @patch('app.asgi_server._read')
+    def test_cpu_quota(self, patched_read):
+        """Test a cgroup CPU quota lowers the CPU count"""
+        patched_read.return_value = '150000 100000'
+
+        with patch('os.sched_getaffinity', return_value=set(range(8))):
+            self.assertEqual(asgi_server.available_cpus(), 2)
+
+        patched_read.return_value = 'max 100000'
+        with patch('os.sched_getaffinity', return_value=set(range(8))):
+            self.assertEqual(asgi_server.available_cpus(), 8)
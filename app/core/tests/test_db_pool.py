@@ -0,0 +1,108 @@
+"""
+Tests for the database connection pool
+"""
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from psycopg2 import OperationalError
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+def create_connection():
+    """Create and return a fake DB-API connection"""
+    connection = MagicMock()
+    connection.closed = 0
+    connection.get_transaction_status.return_value = TRANSACTION_STATUS_IDLE
+    return connection
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the connection pool"""
+
+    def create_pool(self, **params):
+        defaults = {
+            'max_size': 2,
+            'timeout': 0.01,
+            'max_lifetime': 0,
+            'health_check_interval': 60,
+        }
+        defaults.update(params)
+        return ConnectionPool(**defaults)
+
+    def test_connection_reused(self):
+        """Test a released connection is handed out again"""
+        pool = self.create_pool()
+        connect = MagicMock(side_effect=create_connection)
+
+        connection = pool.acquire(connect)
+        pool.release(connection)
+
+        self.assertIs(pool.acquire(connect), connection)
+        self.assertEqual(connect.call_count, 1)
+        self.assertEqual(pool.stats()['in_use'], 1)
+
+    def test_pool_size_bounded(self):
+        """Test acquiring times out once every connection is in use"""
+        pool = self.create_pool()
+        pool.acquire(create_connection)
+        pool.acquire(create_connection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(create_connection)
+
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+
+    def test_open_transaction_rolled_back(self):
+        """Test a connection is rolled back when it is released"""
+        pool = self.create_pool()
+        connection = pool.acquire(create_connection)
+        connection.get_transaction_status.return_value = 2
+
+        pool.release(connection)
+
+        connection.rollback.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_broken_connection_discarded(self):
+        """Test a connection released after an error is closed"""
+        pool = self.create_pool()
+        connection = pool.acquire(create_connection)
+
+        pool.release(connection, discard=True)
+
+        connection.close.assert_called_once()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    @patch('core.db.pool.time.monotonic')
+    def test_idle_connection_health_checked(self, patched_monotonic):
+        """Test a connection idle for long is checked before reuse"""
+        patched_monotonic.return_value = 100
+        pool = self.create_pool()
+        connection = pool.acquire(create_connection)
+        pool.release(connection)
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = OperationalError
+
+        patched_monotonic.return_value = 200
+        new_connection = pool.acquire(create_connection)
+
+        self.assertIsNot(new_connection, connection)
+        connection.close.assert_called_once()
+
+    @patch('core.db.pool.time.monotonic')
+    def test_old_connection_recycled(self, patched_monotonic):
+        """Test a connection older than max_lifetime is not reused"""
+        patched_monotonic.return_value = 100
+        pool = self.create_pool(max_lifetime=60)
+        connection = pool.acquire(create_connection)
+
+        patched_monotonic.return_value = 200
+        pool.release(connection)
+
+        connection.close.assert_called_once()
+        self.assertEqual(pool.stats()['idle'], 0)
@@ -0,0 +1,224 @@
+"""
+Tests for the Idempotency-Key support of create endpoints
+"""
+import datetime
+import io
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import idempotency
+from core.models import IdempotencyKey, MealQuestion, MealUser
+from meal.views import MealUserViewSet
+
+
+MEAL_USER_URL = reverse('meal:mealuser-list')
+CREATE_USER_URL = reverse('user:create')
+
+
+class IdempotencyKeyTests(TestCase):
+    """Test retried creates are replayed"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.meal_question = MealQuestion.objects.create(question='Fried?')
+        self.payload = {
+            'meal_question': self.meal_question.id,
+            'answer_type': 'choice',
+            'answer_choice': 'a lot',
+        }
+
+    def post(self, url, payload, key='retry-1', client=None):
+        return (client or self.client).post(
+            url,
+            payload,
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_response(self):
+        """Test a retried answer is created once and replayed"""
+        first = self.post(MEAL_USER_URL, self.payload)
+        second = self.post(MEAL_USER_URL, self.payload)
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second[idempotency.REPLAYED_HEADER], 'true')
+        self.assertFalse(first.has_header(idempotency.REPLAYED_HEADER))
+        self.assertEqual(MealUser.objects.count(), 1)
+
+    def test_without_key_creates_every_time(self):
+        """Test requests without a key are not deduplicated"""
+        self.client.post(MEAL_USER_URL, self.payload, format='json')
+        self.client.post(MEAL_USER_URL, self.payload, format='json')
+
+        self.assertEqual(MealUser.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_key_reused_with_other_data(self):
+        """Test a key sent with another payload is rejected"""
+        self.post(MEAL_USER_URL, self.payload)
+
+        res = self.post(
+            MEAL_USER_URL,
+            {**self.payload, 'answer_choice': 'none'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(MealUser.objects.count(), 1)
+
+    def test_keys_are_scoped_per_user(self):
+        """Test another user's key does not replay"""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='Testpass123'
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+
+        self.post(MEAL_USER_URL, self.payload)
+        res = self.post(MEAL_USER_URL, self.payload, client=client)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(res.has_header(idempotency.REPLAYED_HEADER))
+        self.assertEqual(MealUser.objects.filter(user=other).count(), 1)
+
+    def test_failed_request_can_be_retried(self):
+        """Test an invalid request does not keep its key"""
+        res = self.post(MEAL_USER_URL, {**self.payload, 'meal_question': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.post(MEAL_USER_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(MealUser.objects.count(), 1)
+
+    def test_expired_key_runs_again(self):
+        """Test a key is reused once its response expired"""
+        self.post(MEAL_USER_URL, self.payload)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        res = self.post(MEAL_USER_URL, self.payload)
+
+        self.assertFalse(res.has_header(idempotency.REPLAYED_HEADER))
+        self.assertEqual(MealUser.objects.count(), 2)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+    def test_invalid_key(self):
+        """Test a key longer than the store allows is rejected"""
+        res = self.post(MEAL_USER_URL, self.payload, key='k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(MealUser.objects.count(), 0)
+
+    def test_user_create_is_replayed(self):
+        """Test a retried signup does not create or hash again"""
+        payload = {
+            'email': 'new@example.com',
+            'password': 'tesTpass123',
+            'first_name': 'Taro',
+            'last_name': 'Test',
+            'gender': 'male',
+        }
+        client = APIClient()
+        first = self.post(CREATE_USER_URL, payload, client=client)
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+
+        with patch('core.models.User.set_password') as set_password:
+            res = self.post(CREATE_USER_URL, payload, client=client)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['email'], payload['email'])
+        set_password.assert_not_called()
+        record = IdempotencyKey.objects.get(user=None)
+        self.assertNotIn(payload['password'], record.fingerprint)
+
+    def test_purge(self):
+        """Test expired keys and the oldest beyond the limit are purged"""
+        for key in ['a', 'b', 'c']:
+            self.post(MEAL_USER_URL, self.payload, key=key)
+        IdempotencyKey.objects.filter(key='a').update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        call_command(
+            'purge_idempotency_keys',
+            max_entries=1,
+            stdout=io.StringIO()
+        )
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list('key', flat=True)),
+            ['c']
+        )
+
+
+class ConcurrentIdempotencyKeyTests(TransactionTestCase):
+    """Test concurrent duplicates run the view once"""
+
+    def test_concurrent_duplicates(self):
+        """Test the duplicate waits for the first request and replays it"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='Testpass123'
+        )
+        meal_question = MealQuestion.objects.create(question='Fried?')
+        payload = {
+            'meal_question': meal_question.id,
+            'answer_type': 'choice',
+            'answer_choice': 'a lot',
+        }
+        perform_create = MealUserViewSet.perform_create
+
+        def slow_perform_create(view, serializer):
+            perform_create(view, serializer)
+            time.sleep(0.3)
+
+        responses = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                responses.append(client.post(
+                    MEAL_USER_URL,
+                    payload,
+                    format='json',
+                    HTTP_IDEMPOTENCY_KEY='retry-1'
+                ))
+            finally:
+                connection.close()
+
+        with patch.object(
+            MealUserViewSet,
+            'perform_create',
+            slow_perform_create
+        ):
+            threads = [threading.Thread(target=post) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            [res.status_code for res in responses],
+            [status.HTTP_201_CREATED] * 2
+        )
+        self.assertEqual(responses[0].data, responses[1].data)
+        self.assertEqual(MealUser.objects.count(), 1)
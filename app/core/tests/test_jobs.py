@@ -0,0 +1,271 @@
+"""
+Tests for the background job queue
+"""
+import datetime
+import threading
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import answer_state, jobs, partitions, summary, tasks
+from core.management.commands import run_worker
+from core.models import (
+    IdempotencyKey,
+    Job,
+    MealAnswerState,
+    MealQuestion,
+    MealSummary,
+    MealUser,
+    SyncTombstone
+)
+
+
+calls = []
+
+
+@jobs.register('tests.record')
+def record(value):
+    calls.append(value)
+
+
+@jobs.register('tests.fail')
+def fail():
+    raise RuntimeError('failed')
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10)
+class JobTests(TestCase):
+    """Test queueing and running jobs"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim_by_priority(self):
+        """Test due jobs are claimed by priority, then in order"""
+        low = jobs.enqueue('tests.record', {'value': 1})
+        high = jobs.enqueue('tests.record', {'value': 2}, priority=5)
+        jobs.enqueue('tests.record', {'value': 3}, priority=9, delay=60)
+        later = jobs.enqueue('tests.record', {'value': 4})
+
+        claimed = jobs.claim('worker', limit=10)
+
+        self.assertEqual(
+            [job.id for job in claimed],
+            [high.id, low.id, later.id]
+        )
+        self.assertEqual(jobs.claim('worker'), [])
+        high.refresh_from_db()
+        self.assertEqual(high.status, Job.RUNNING)
+        self.assertEqual(high.attempts, 1)
+        self.assertEqual(high.locked_by, 'worker')
+
+    def test_run(self):
+        """Test a job is called with its payload"""
+        jobs.enqueue('tests.record', {'value': 1})
+        job, = jobs.claim('worker')
+
+        self.assertTrue(jobs.run(job))
+
+        job.refresh_from_db()
+        self.assertEqual(calls, [1])
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_retry_with_backoff(self):
+        """Test a failed job is retried later, until max_attempts"""
+        jobs.enqueue('tests.fail')
+
+        for attempt, delay in enumerate([10, 20], start=1):
+            Job.objects.update(run_at=timezone.now())
+            job, = jobs.claim('worker')
+            started = timezone.now()
+
+            with self.assertLogs('core.jobs', 'ERROR'):
+                self.assertFalse(jobs.run(job))
+
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertEqual(job.attempts, attempt)
+            self.assertIn('RuntimeError', job.last_error)
+            self.assertGreaterEqual(
+                job.run_at,
+                started + datetime.timedelta(seconds=delay)
+            )
+
+        Job.objects.update(run_at=timezone.now())
+        job, = jobs.claim('worker')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run(job)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(jobs.claim('worker'), [])
+
+    def test_unknown_job(self):
+        """Test only registered jobs can be queued"""
+        with self.assertRaises(jobs.UnknownJob):
+            jobs.enqueue('tests.unknown')
+
+    def test_enqueue_rolled_back(self):
+        """Test a job queued by a rolled back transaction never runs"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                jobs.enqueue('tests.record', {'value': 1})
+                raise RuntimeError()
+
+        self.assertEqual(jobs.claim('worker'), [])
+
+    @override_settings(
+        JOB_TIMEOUT=60,
+        JOB_KEEP_DAYS=7,
+        MEALUSER_PARTITION_MONTHS_AHEAD=6
+    )
+    def test_maintenance(self):
+        """Test the worker maintenance of jobs, tombstones and partitions"""
+        now = timezone.now()
+        stale = jobs.enqueue('tests.record', {'value': 1})
+        jobs.claim('worker')
+        Job.objects.filter(id=stale.id).update(
+            locked_at=now - datetime.timedelta(minutes=5)
+        )
+        done = jobs.enqueue('tests.record', {'value': 2})
+        Job.objects.filter(id=done.id).update(
+            status=Job.DONE,
+            finished_at=now - datetime.timedelta(days=8)
+        )
+        old = SyncTombstone.objects.create(
+            kind=SyncTombstone.QUESTION,
+            object_id=1
+        )
+        SyncTombstone.objects.filter(id=old.id).update(
+            deleted_at=now - datetime.timedelta(days=365)
+        )
+        recent = SyncTombstone.objects.create(
+            kind=SyncTombstone.QUESTION,
+            object_id=2
+        )
+        ahead = partitions.partition_name(
+            partitions.add_months(partitions.month_start(now), 6)
+        )
+        out = StringIO()
+
+        # The test transaction would be taken as a broken connection
+        with patch.object(run_worker, 'close_old_connections'):
+            run_worker.Command(stdout=out).maintain()
+
+        self.assertEqual(
+            list(Job.objects.values_list('id', 'status')),
+            [(stale.id, Job.QUEUED)]
+        )
+        self.assertEqual(
+            list(SyncTombstone.objects.values_list('id', flat=True)),
+            [recent.id]
+        )
+        self.assertIn(ahead, partitions.partitions().values())
+        self.assertIn(f'Created partition {ahead}', out.getvalue())
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_stale_jobs(self):
+        """Test heartbeats keep jobs running and exhausted ones fail"""
+        now = timezone.now()
+        alive = jobs.enqueue('tests.record', {'value': 1})
+        exhausted = jobs.enqueue('tests.record', {'value': 2}, max_attempts=1)
+        jobs.claim('worker', limit=2)
+        Job.objects.update(locked_at=now - datetime.timedelta(minutes=5))
+
+        self.assertEqual(jobs.heartbeat([alive.id], now), 1)
+        self.assertEqual(jobs.requeue_stale(now), (0, 1))
+
+        alive.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual(alive.status, Job.RUNNING)
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertEqual(exhausted.finished_at, now)
+
+    def test_delete_user(self):
+        """Test a user's answers are deleted without a query per answer"""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        question = MealQuestion.objects.create(question='揚げ物？')
+        MealUser.objects.bulk_create([
+            MealUser(
+                user=user,
+                meal_question=question,
+                answer_type='int',
+                answer_int=value
+            )
+            for value in range(50)
+        ])
+        summary.rebuild()
+        answer_state.rebuild()
+
+        with CaptureQueriesContext(connection) as queries:
+            tasks.delete_user(user.id)
+
+        self.assertLess(len(queries), 20)
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(MealUser.objects.exists())
+        self.assertFalse(MealSummary.objects.exists())
+        self.assertFalse(MealAnswerState.objects.exists())
+        self.assertFalse(SyncTombstone.objects.exists())
+
+
+class JobWorkerTests(TransactionTestCase):
+    """Test jobs taken by concurrent workers"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_locked_jobs_are_skipped(self):
+        """Test a job claimed in an open transaction is not waited for"""
+        first = jobs.enqueue('tests.record', {'value': 1})
+        second = jobs.enqueue('tests.record', {'value': 2})
+        claimed = []
+
+        def claim():
+            try:
+                claimed.extend(jobs.claim('other'))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            Job.objects.select_for_update().get(id=first.id)
+            thread = threading.Thread(target=claim)
+            thread.start()
+            thread.join(5)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([job.id for job in claimed], [second.id])
+
+    def test_run_worker(self):
+        """Test the worker runs every due job and purges expired keys"""
+        for value in range(4):
+            jobs.enqueue('tests.record', {'value': value})
+        jobs.enqueue('tests.fail', max_attempts=1)
+        IdempotencyKey.objects.create(
+            key='expired',
+            fingerprint='',
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+        out = StringIO()
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            call_command(
+                'run_worker',
+                concurrency=2,
+                burst=True,
+                stdout=out
+            )
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 4)
+        self.assertIn('4 jobs done and 1 failed', out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,183 @@
+"""
+Tests for the request metrics
+"""
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import metrics
+
+
+METRICS_URL = reverse('metrics')
+
+
+def sample_value(text, line_start):
+    """Return the value of the sample line starting with line_start"""
+    for line in text.splitlines():
+        if line.startswith(line_start + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+class MetricsTests(TestCase):
+    """Test recording and exporting metrics"""
+
+    def test_render_histogram(self):
+        """Test buckets are cumulative and sum and count are exported"""
+        for duration in (0.003, 0.02, 20):
+            metrics.observe('test:render', 'GET', 200, (duration, 1, 0, 10))
+
+        text = metrics.render()
+
+        labels = 'route="test:render",method="GET",status="200"'
+        name = 'http_request_duration_seconds'
+        self.assertEqual(
+            sample_value(text, f'{name}_bucket{{{labels},le="0.005"}}'),
+            1
+        )
+        self.assertEqual(
+            sample_value(text, f'{name}_bucket{{{labels},le="0.025"}}'),
+            2
+        )
+        self.assertEqual(
+            sample_value(text, f'{name}_bucket{{{labels},le="+Inf"}}'),
+            3
+        )
+        self.assertEqual(sample_value(text, f'{name}_count{{{labels}}}'), 3)
+        self.assertAlmostEqual(
+            sample_value(text, f'{name}_sum{{{labels}}}'),
+            20.023
+        )
+
+    def test_unknown_method_grouped(self):
+        """Test unusual methods do not add label values"""
+        metrics.observe('test:method', 'BREW', 405, (0, 0, 0, 0))
+
+        self.assertIn('method="OTHER"', metrics.render())
+
+    def test_requests_recorded_by_route(self):
+        """Test API requests are recorded under their route name"""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'tesTpass123'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        labels = 'route="meal:mealuser-list",method="GET",status="200"'
+        before = metrics.render()
+
+        client.get(reverse('meal:mealuser-list'))
+        with override_settings(METRICS_ALLOWED_IPS=['127.0.0.1']):
+            res = client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], metrics.CONTENT_TYPE)
+        text = res.content.decode()
+        name = 'http_request_db_queries_count'
+        self.assertEqual(
+            sample_value(text, f'{name}{{{labels}}}'),
+            (sample_value(before, f'{name}{{{labels}}}') or 0) + 1
+        )
+        self.assertGreater(
+            sample_value(text, f'http_request_db_queries_sum{{{labels}}}'),
+            0
+        )
+        self.assertIn('token_cache_hits_total', text)
+
+    def test_queries_counted_per_request_context(self):
+        """Test overlapping requests sharing a connection count apart"""
+        metrics.install_query_timer(connection)
+
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+
+        async def measure(queries):
+            timer, token = metrics.start_timer()
+            try:
+                for _ in range(queries):
+                    await sync_to_async(query)()
+                    await asyncio.sleep(0)
+            finally:
+                metrics.stop_timer(token)
+            return timer.count
+
+        async def overlap():
+            return await asyncio.gather(measure(1), measure(3))
+
+        self.assertEqual(async_to_sync(overlap)(), [1, 3])
+
+    def test_metrics_access(self):
+        """Test only staff users and allowed scrapers read the metrics"""
+        staff = get_user_model().objects.create_superuser(
+            'admin@example.com',
+            'tesTpass123'
+        )
+        client = Client()
+
+        with override_settings(METRICS_TOKEN='secret'):
+            self.assertEqual(client.get(METRICS_URL).status_code, 403)
+            self.assertEqual(
+                client.get(
+                    METRICS_URL,
+                    HTTP_AUTHORIZATION='Bearer wrong'
+                ).status_code,
+                403
+            )
+            self.assertEqual(
+                client.get(
+                    METRICS_URL,
+                    HTTP_AUTHORIZATION='Bearer secret'
+                ).status_code,
+                200
+            )
+
+        client.force_login(staff)
+        self.assertEqual(client.get(METRICS_URL).status_code, 200)
+
+    def test_metrics_added_up_across_processes(self):
+        """Test counters of other workers are added and dead gauges dropped"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        metrics.observe('test:workers', 'GET', 200, (0.001, 2, 0.001, 50))
+        series = metrics._new_series()
+        series[0][0] = 4
+        with open(os.path.join(directory, 'metrics-999999999.json'),
+                  'w') as file:
+            json.dump({
+                'series': [[['test:workers', 'GET', '200'], series]],
+                'samples': [
+                    ['token_cache_entries', [], 1000],
+                    ['token_cache_hits_total', [], 1000],
+                ],
+            }, file)
+
+        with override_settings(METRICS_DIR=directory):
+            text = metrics.render()
+
+        self.assertTrue(os.path.exists(
+            os.path.join(directory, f'metrics-{os.getpid()}.json')
+        ))
+        labels = 'route="test:workers",method="GET",status="200"'
+        self.assertEqual(
+            sample_value(
+                text,
+                f'http_request_duration_seconds_count{{{labels}}}'
+            ),
+            5
+        )
+        self.assertLess(sample_value(text, 'token_cache_entries'), 1000)
+        self.assertGreaterEqual(
+            sample_value(text, 'token_cache_hits_total'),
+            1000
+        )
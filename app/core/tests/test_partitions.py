@@ -0,0 +1,106 @@
+"""
+Tests for the monthly partitions of MealUser
+"""
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from core import partitions
+from core.models import MealQuestion, MealUser
+
+
+def table_of(answer):
+    """Return the partition holding an answer"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT tableoid::regclass::text FROM core_mealuser WHERE id = %s',
+            [answer.id]
+        )
+        return cursor.fetchone()[0]
+
+
+class PartitionTests(TestCase):
+    """Test the MealUser table partitioning"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'tesTpass123'
+        )
+        self.question = MealQuestion.objects.create(question='Breakfast?')
+
+    def create_answer(self, created_at=None):
+        """Create an answer, then move it to created_at"""
+        answer = MealUser.objects.create(
+            user=self.user,
+            meal_question=self.question,
+            answer_type='int',
+            answer_int=1
+        )
+        if created_at:
+            MealUser.objects.filter(id=answer.id).update(
+                created_at=created_at
+            )
+        return answer
+
+    def test_answer_in_month_partition(self):
+        """Test a new answer is stored in the partition of its month"""
+        answer = self.create_answer()
+
+        self.assertEqual(
+            table_of(answer),
+            partitions.partition_name(partitions.month_start(timezone.now()))
+        )
+
+    def test_create_future_partitions(self):
+        """Test partitions are created ahead, taking rows from default"""
+        now = timezone.now()
+        far = partitions.add_months(partitions.month_start(now), 12)
+        answer = self.create_answer(far + datetime.timedelta(days=3))
+        self.assertEqual(table_of(answer), partitions.DEFAULT_PARTITION)
+
+        created = partitions.ensure_partitions(12, now=now)
+
+        self.assertIn(partitions.partition_name(far), created)
+        self.assertEqual(table_of(answer), partitions.partition_name(far))
+        self.assertEqual(partitions.ensure_partitions(12, now=now), [])
+        self.assertEqual(MealUser.objects.get(id=answer.id).answer_int, 1)
+
+    def test_detach_old_partitions(self):
+        """Test old partitions are detached and leave the queryset"""
+        now = timezone.now()
+        past = partitions.add_months(partitions.month_start(now), -2)
+        partitions.create_partition(past)
+        old_answer = self.create_answer(past + datetime.timedelta(hours=1))
+        answer = self.create_answer()
+
+        detached = partitions.detach_old_partitions(2, now=now)
+
+        self.assertEqual(detached, [partitions.partition_name(past)])
+        self.assertEqual(
+            list(MealUser.objects.values_list('id', flat=True)),
+            [answer.id]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM {partitions.partition_name(past)}'
+            )
+            self.assertEqual(cursor.fetchall(), [(old_answer.id,)])
+
+    def test_command(self):
+        """Test the command creates the partitions ahead"""
+        out = StringIO()
+
+        call_command('mealuser_partitions', '--months-ahead', '6', stdout=out)
+
+        month = partitions.add_months(
+            partitions.month_start(timezone.now()),
+            6
+        )
+        self.assertIn(month, partitions.partitions())
+        self.assertIn('Partitions up to date!', out.getvalue())
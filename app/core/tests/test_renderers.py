@@ -0,0 +1,112 @@
+"""
+Tests for the JSON renderer and parser
+"""
+import datetime
+import decimal
+import io
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core import parsers, renderers
+from core.models import MealUser
+
+
+def sample_data():
+    """Return data with the types the API renders"""
+    return {
+        'created_at': datetime.datetime(
+            2022, 5, 1, 9, 30, 15, 123456,
+            tzinfo=timezone.utc
+        ),
+        'day': datetime.date(2022, 5, 1),
+        'amount': decimal.Decimal('12.50'),
+        'choices': [(value, gettext_lazy(label))
+                    for value, label in MealUser.HOW_MANY_CHOICES],
+        'label': gettext_lazy('少し'),
+        'separator': 'a\u2028b\u2029c',
+        'ids': {1: 'one'},
+        'nothing': None,
+    }
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test the fast JSON renderer"""
+
+    def test_same_output_as_json_renderer(self):
+        """Test the output matches JSONRenderer for the API types"""
+        data = sample_data()
+
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+    def test_large_integer(self):
+        """Test integers orjson cannot encode are still rendered"""
+        data = {'value': 2 ** 70}
+
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data),
+            b'{"value":1180591620717411303424}'
+        )
+
+    def test_indent(self):
+        """Test indented output is rendered like JSONRenderer"""
+        data = sample_data()
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data, media_type),
+            JSONRenderer().render(data, media_type)
+        )
+
+    @patch('core.renderers.orjson', None)
+    def test_without_orjson(self):
+        """Test rendering falls back to the standard library"""
+        data = sample_data()
+
+        self.assertEqual(
+            renderers.FastJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test the fast JSON parser"""
+
+    def parse(self, body):
+        """Parse a body with the fast parser"""
+        return parsers.FastJSONParser().parse(io.BytesIO(body))
+
+    def test_parse(self):
+        """Test a body parses like with JSONParser"""
+        body = '{"answer_choice": "a bit", "label": "少し", "n": 1.5}'.encode()
+
+        self.assertEqual(
+            self.parse(body),
+            JSONParser().parse(io.BytesIO(body))
+        )
+
+    def test_large_integer(self):
+        """Test integers orjson cannot decode are still parsed"""
+        self.assertEqual(self.parse(b'{"n": 1180591620717411303424}'), {
+            'n': 2 ** 70,
+        })
+
+    def test_invalid_json(self):
+        """Test invalid JSON raises a parse error"""
+        for body in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                self.parse(body)
+
+    @patch('core.parsers.orjson', None)
+    def test_without_orjson(self):
+        """Test parsing falls back to the standard library"""
+        self.assertEqual(self.parse(b'[1, 2]'), [1, 2])
@@ -0,0 +1,163 @@
+"""
+Tests for the routing of reads to replicas
+"""
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+
+from core import checks
+from core.db import router
+from core.middleware import ReplicaMiddleware
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the database chosen for reads and writes"""
+
+    def setUp(self):
+        cache.clear()
+        router.monitor.reset()
+        self.router = router.ReplicaRouter()
+        self.user_model = get_user_model()
+        # Tests run in no transaction, unlike TestCase
+        connections = {'default': MagicMock(in_atomic_block=False)}
+        patcher = patch.object(router, 'connections', connections)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.check = self.patch_check(True)
+
+    def patch_check(self, healthy):
+        patcher = patch.object(
+            router.monitor,
+            'check',
+            return_value=healthy
+        )
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def read(self, model=None):
+        """Return the database of a read made in a replica read context"""
+        token = router.enable_replica_reads(True)
+        try:
+            return self.router.db_for_read(model or self.user_model)
+        finally:
+            router.reset_replica_reads(token)
+
+    def test_reads_go_to_replica(self):
+        """Test reads of a safe request use a healthy replica"""
+        self.assertEqual(self.read(), 'replica')
+        self.assertEqual(
+            self.router.db_for_write(self.user_model),
+            'default'
+        )
+
+    def test_reads_outside_requests_use_primary(self):
+        """Test reads are not sent to a replica unless enabled"""
+        self.assertEqual(self.router.db_for_read(self.user_model), 'default')
+
+    def test_token_reads_use_primary(self):
+        """Test tokens are always read from the primary"""
+        self.assertEqual(self.read(Token), 'default')
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        """Test a replica down or behind is not used"""
+        self.check.return_value = False
+
+        self.assertEqual(self.read(), 'default')
+
+    def test_health_is_cached(self):
+        """Test a replica is checked once per interval"""
+        self.read()
+        self.read()
+
+        self.check.assert_called_once_with('replica')
+        self.assertEqual(router.monitor.states(), {'replica': True})
+
+    @override_settings(DB_REPLICA_MAX_LAG=5)
+    def test_check_lag(self):
+        """Test a replica too far behind is unhealthy"""
+        cursor = MagicMock()
+        cursor.__enter__.return_value.fetchone.return_value = (10.0,)
+        connection = MagicMock()
+        connection.cursor.return_value = cursor
+
+        with patch.object(router, 'connections', {'replica': connection}):
+            monitor = router.ReplicaMonitor()
+            self.assertFalse(monitor.check('replica'))
+            cursor.__enter__.return_value.fetchone.return_value = (1.0,)
+            self.assertTrue(monitor.check('replica'))
+
+    def test_middleware_sticks_after_write(self):
+        """Test a client reads the primary after sending a write"""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(self.user_model))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        factory = RequestFactory()
+        for method in ('get', 'post', 'get'):
+            middleware(getattr(factory, method)(
+                '/', HTTP_AUTHORIZATION='Token abc'
+            ))
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Token other'))
+
+        self.assertEqual(seen, ['replica', 'default', 'default', 'replica'])
+        self.assertFalse(router._replica_reads.get())
+
+    def test_middleware_sticks_session_users(self):
+        """Test a user authenticated by the session reads its writes"""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(self.user_model))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        factory = RequestFactory()
+        for method, pk in (('post', 1), ('get', 1), ('get', 2)):
+            request = getattr(factory, method)('/')
+            request.user = self.user_model(pk=pk)
+            middleware(request)
+
+        self.assertEqual(seen, ['default', 'default', 'replica'])
+
+    def test_sync_reads_primary(self):
+        """Test views marked with primary_reads never read a replica"""
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(self.user_model))
+            return HttpResponse()
+
+        middleware = ReplicaMiddleware(view)
+        factory = RequestFactory()
+        for url in (reverse('meal:sync'), reverse('meal:summary')):
+            middleware(factory.get(url, HTTP_AUTHORIZATION='Token abc'))
+
+        self.assertEqual(seen, ['default', 'replica'])
+
+    def test_shared_cache_required(self):
+        """Test replicas with a per process cache fail the system check"""
+        locmem = {'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }}
+        shared = {'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache',
+        }}
+
+        with override_settings(CACHES=locmem):
+            errors = checks.check_replica_cache(None)
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        with override_settings(CACHES=shared):
+            self.assertEqual(checks.check_replica_cache(None), [])
+        with override_settings(CACHES=locmem, DATABASE_REPLICAS=[]):
+            self.assertEqual(checks.check_replica_cache(None), [])
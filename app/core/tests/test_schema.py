@@ -0,0 +1,87 @@
+"""
+Tests for the precomputed API schema
+"""
+import gzip
+import json
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaTests(TestCase):
+    """Test serving the precomputed schema"""
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        settings_override = override_settings(API_SCHEMA_CACHE_DIR=cache_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        schema._schema = None
+        self.addCleanup(setattr, schema, '_schema', None)
+        self.client = APIClient()
+
+    def test_schema_generated_once(self):
+        """Test the schema is generated on the first request only"""
+        with patch('core.schema.generate', wraps=schema.generate) as generate:
+            res = self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(b'openapi: 3.0.3', res.content)
+        self.assertIn('/api/meal/meal-user/', res.content.decode())
+        self.assertEqual(generate.call_count, 1)
+
+    def test_schema_read_from_disk(self):
+        """Test a new process reads the schema saved by another one"""
+        call_command('generate_schema', stdout=StringIO())
+        schema._schema = None
+
+        with patch('core.schema.generate') as generate:
+            res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        generate.assert_not_called()
+        self.assertIn('paths', json.loads(res.content))
+
+    def test_etag(self):
+        """Test an unchanged schema is answered with 304"""
+        res = self.client.get(SCHEMA_URL)
+        cached_res = self.client.get(
+            SCHEMA_URL,
+            HTTP_IF_NONE_MATCH=res['ETag']
+        )
+
+        self.assertEqual(cached_res.status_code, 304)
+        self.assertEqual(cached_res['ETag'], res['ETag'])
+
+    def test_gzip(self):
+        """Test the schema is compressed when the client accepts it"""
+        res = self.client.get(SCHEMA_URL)
+        gzip_res = self.client.get(SCHEMA_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(gzip_res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzip_res.content), res.content)
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_fingerprint_follows_app_version(self):
+        """Test a new code version gives a new schema version"""
+        self.addCleanup(schema.fingerprint.cache_clear)
+        fingerprints = set()
+        for version in ('1.0', '1.1'):
+            schema.fingerprint.cache_clear()
+            with override_settings(APP_VERSION=version):
+                fingerprints.add(schema.fingerprint())
+
+        self.assertEqual(len(fingerprints), 2)
@@ -0,0 +1,122 @@
+"""
+Tests for the meal summary rollup
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from core import models, summary
+
+
+def create_answer(user, meal_question, **params):
+    """Create and return a sample answer"""
+    return models.MealUser.objects.create(
+        user=user,
+        meal_question=meal_question,
+        **params
+    )
+
+
+class MealSummaryTests(TestCase):
+    """Test maintaining the meal summary rollup"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'tesTpass123'
+        )
+        self.meal_question = models.MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+
+    def get_summary(self):
+        return models.MealSummary.objects.get(
+            user=self.user,
+            meal_question=self.meal_question
+        )
+
+    def test_summary_updated_on_create(self):
+        """Test creating answers updates the rollup of the day"""
+        create_answer(
+            self.user,
+            self.meal_question,
+            answer_type='choice',
+            answer_choice='a lot'
+        )
+        create_answer(
+            self.user,
+            self.meal_question,
+            answer_type='int',
+            answer_int=3
+        )
+        create_answer(
+            self.user,
+            self.meal_question,
+            answer_type='bool',
+            answer_bool=False
+        )
+
+        row = self.get_summary()
+        self.assertEqual(row.day, timezone.localdate())
+        self.assertEqual(row.answer_count, 3)
+        self.assertEqual(row.choice_a_lot_count, 1)
+        self.assertEqual(row.answer_int_count, 1)
+        self.assertEqual(row.answer_int_sum, 3)
+        self.assertEqual(row.answer_false_count, 1)
+        self.assertEqual(row.answer_true_count, 0)
+
+    def test_summary_updated_on_change_and_delete(self):
+        """Test changing and deleting answers updates the rollup"""
+        answer = create_answer(
+            self.user,
+            self.meal_question,
+            answer_type='choice',
+            answer_choice='none'
+        )
+
+        answer.answer_choice = 'normal'
+        answer.save()
+        row = self.get_summary()
+        self.assertEqual(row.answer_count, 1)
+        self.assertEqual(row.choice_none_count, 0)
+        self.assertEqual(row.choice_normal_count, 1)
+
+        answer.delete()
+        row = self.get_summary()
+        self.assertEqual(row.answer_count, 0)
+        self.assertEqual(row.choice_normal_count, 0)
+
+    def test_deleting_user_removes_summary(self):
+        """Test deleting a user with answers removes the rollup"""
+        create_answer(
+            self.user,
+            self.meal_question,
+            answer_type='choice',
+            answer_choice='none'
+        )
+
+        self.user.delete()
+
+        self.assertFalse(models.MealSummary.objects.exists())
+
+    def test_rebuild_summary_command(self):
+        """Test rebuilding the rollup matches the incremental one"""
+        for answer_int in [1, 2, 3]:
+            create_answer(
+                self.user,
+                self.meal_question,
+                answer_type='int',
+                answer_int=answer_int
+            )
+        expected = summary.COUNT_FIELDS
+        before = models.MealSummary.objects.values(*expected).get()
+        models.MealSummary.objects.all().delete()
+
+        call_command('rebuild_meal_summary', stdout=StringIO())
+
+        after = models.MealSummary.objects.values(*expected).get()
+        self.assertEqual(before, after)
+        self.assertEqual(after['answer_int_sum'], 6)
@@ -0,0 +1,94 @@
+"""
+Views for the core app
+"""
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+
+from core import metrics as request_metrics
+from core import schema
+
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+def can_scrape(request):
+    """Return whether a request may read the metrics
+
+    Staff users may, and scrapers sending METRICS_TOKEN as a bearer
+    token or connecting from one of METRICS_ALLOWED_IPS.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_active and user.is_staff:
+        return True
+
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+
+    keyword, _, token = request.META.get(
+        'HTTP_AUTHORIZATION',
+        ''
+    ).partition(' ')
+    return bool(settings.METRICS_TOKEN) and \
+        keyword.lower() == 'bearer' and \
+        constant_time_compare(token, settings.METRICS_TOKEN)
+
+
+@require_GET
+def metrics(request):
+    """Return the metrics of every worker in the Prometheus text format"""
+    if not can_scrape(request):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        request_metrics.render(),
+        content_type=request_metrics.CONTENT_TYPE
+    )
+
+
+class SchemaView(SpectacularAPIView):
+    """OpenAPI schema served from the precomputed one
+
+    Translated, versioned or non public schemas are still generated per
+    request by SpectacularAPIView.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if self.urlconf != spectacular_settings.SERVE_URLCONF or \
+                self.api_version or not self.serve_public or \
+                (settings.USE_I18N and request.GET.get('lang')):
+            return super().get(request, *args, **kwargs)
+
+        renderer = request.accepted_renderer
+        document = schema.get().documents[renderer.format]
+        response = get_conditional_response(request, etag=document.etag)
+        if response is None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+
+            accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+            if ACCEPTS_GZIP.search(accept_encoding):
+                response = HttpResponse(
+                    document.gzipped,
+                    content_type=content_type
+                )
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(
+                    document.body,
+                    content_type=content_type
+                )
+
+        response['ETag'] = document.etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
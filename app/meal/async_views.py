@@ -0,0 +1,52 @@
+"""
+Async views for the Meal APIs
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+
+from rest_framework.request import Request
+
+from core.async_api import async_read_view
+from core.models import MealUser
+from meal import catalog, fast_serializers, views
+from meal.pagination import MealUserCursorPagination
+
+
+json_list_response = functools.partial(JsonResponse, safe=False)
+
+
+def history_response(request):
+    """Return a page of the user's answers"""
+    paginator = MealUserCursorPagination()
+    rows = fast_serializers.meal_user.values(
+        MealUser.objects.filter(user=request.user),
+        'created_at'
+    ).order_by('-created_at', '-id')
+    page = paginator.paginate_queryset(rows, Request(request))
+    data = fast_serializers.meal_user.list_representation(page)
+
+    return JsonResponse(paginator.get_paginated_response(data).data)
+
+
+@async_read_view(views.MealQuestionViewSet.as_view({
+    'get': 'list',
+    'post': 'create',
+}))
+async def meal_question_list(request):
+    """List the question catalog"""
+    return await sync_to_async(catalog.respond)(
+        request,
+        'questions',
+        json_list_response
+    )
+
+
+@async_read_view(views.MealUserViewSet.as_view({
+    'get': 'list',
+    'post': 'create',
+}))
+async def meal_user_list(request):
+    """List the authenticated user's answer history"""
+    return await sync_to_async(history_response)(request)
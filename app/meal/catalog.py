@@ -0,0 +1,148 @@
+"""
+Versioned cache for the meal question and vegetable catalog
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core.models import MealQuestion, MealVegetable
+from meal import fast_serializers
+
+
+CATALOG_KEY = 'meal:catalog:{version}'
+
+# Latest update and size of both tables, read through their updated_at
+# indexes
+VERSION_SQL = """
+    SELECT
+        (SELECT max(updated_at) FROM {questions}),
+        (SELECT count(*) FROM {questions}),
+        (SELECT max(updated_at) FROM {vegetables}),
+        (SELECT count(*) FROM {vegetables})
+"""
+
+# Catalog and version of the latest version seen by this process
+_local = {}
+
+
+def _micros(value):
+    """Return a datetime in microseconds since the epoch, 0 for None"""
+    if value is None:
+        return 0
+    return int(value.timestamp() * 1000000)
+
+
+def read_version():
+    """Return the catalog version stored in the database
+
+    The version is the time of the last change in microseconds, which
+    gives the Last-Modified time of the catalog, followed by the number
+    of questions and vegetables, which change when a row is deleted.
+    Every process reads the same version, whichever changed the catalog.
+    """
+    sql = VERSION_SQL.format(
+        questions=connection.ops.quote_name(MealQuestion._meta.db_table),
+        vegetables=connection.ops.quote_name(MealVegetable._meta.db_table)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        questions_at, questions, vegetables_at, vegetables = \
+            cursor.fetchone()
+
+    updated = max(_micros(questions_at), _micros(vegetables_at))
+    return f'{updated}-{questions}-{vegetables}'
+
+
+def get_version():
+    """Return the current catalog version
+
+    The version read from the database is kept by the process for
+    MEAL_CATALOG_VERSION_TTL seconds, so changes made by other processes
+    are seen after at most that long.
+    """
+    cached = _local.get('version')
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    version = read_version()
+    _local['version'] = (
+        time.monotonic() + settings.MEAL_CATALOG_VERSION_TTL,
+        version
+    )
+    return version
+
+
+def invalidate():
+    """Read the catalog version from the database on the next request"""
+    _local.pop('version', None)
+
+
+def invalidate_on_commit():
+    """Read the catalog version again once the transaction commits"""
+    transaction.on_commit(invalidate)
+
+
+def last_modified(version):
+    """Return the Last-Modified timestamp of a catalog version"""
+    return int(version.split('-')[0]) // 1000000
+
+
+def _build(version):
+    """Serialize the catalog from the database"""
+    questions = fast_serializers.meal_question
+    vegetables = fast_serializers.meal_vegetable
+
+    return {
+        'version': version,
+        'questions': questions.list_representation(
+            questions.values(MealQuestion.objects.order_by('-id'))
+        ),
+        'vegetables': vegetables.list_representation(
+            vegetables.values(MealVegetable.objects.order_by('-id'))
+        ),
+    }
+
+
+def get_catalog(version=None):
+    """Return the serialized catalog, building it only when it changed"""
+    if version is None:
+        version = get_version()
+
+    catalog = _local.get('catalog')
+    if catalog is not None and catalog['version'] == version:
+        return catalog
+
+    key = CATALOG_KEY.format(version=version)
+    catalog = cache.get(key)
+    if catalog is None:
+        catalog = _build(version)
+        cache.set(key, catalog, settings.MEAL_CATALOG_CACHE_TIMEOUT)
+
+    _local['catalog'] = catalog
+    return catalog
+
+
+def respond(request, key, response_class):
+    """Return a part of the catalog, or 304 when the client is up to date
+
+    response_class builds the response from the serialized data.
+    """
+    version = get_version()
+    etag = f'"{key}-{version}"'
+    modified = last_modified(version)
+
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=modified
+    )
+    if response is None:
+        response = response_class(get_catalog(version)[key])
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(modified)
+    return response
@@ -0,0 +1,86 @@
+"""
+Read-only serializers working on values_list() rows for the meal API
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+
+from rest_framework import serializers as drf_serializers
+
+from meal import serializers
+
+
+class ValuesSerializer:
+    """Serialize rows like a ModelSerializer, without model instances
+
+    The fields of the serializer class are compiled once: values which
+    their field would return unchanged are zipped into the output dict
+    and only the others, like datetimes, go through to_representation().
+    """
+    unchanged_fields = (
+        drf_serializers.BooleanField,
+        drf_serializers.CharField,
+        drf_serializers.ChoiceField,
+        drf_serializers.IntegerField,
+    )
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def _compiled(self):
+        """Return the output names, columns and converters of the fields"""
+        names, columns, converters = [], [], []
+        for field in self.serializer_class().fields.values():
+            if field.write_only:
+                continue
+            if field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(
+                    f'{self.serializer_class.__name__}.{field.field_name} '
+                    'is not a model column.'
+                )
+
+            names.append(field.field_name)
+            columns.append(field.source)
+            if isinstance(field, drf_serializers.PrimaryKeyRelatedField):
+                # values_list() gives the pk of a foreign key
+                if field.pk_field is not None:
+                    converters.append(
+                        (field.field_name, field.pk_field.to_representation)
+                    )
+            elif not isinstance(field, self.unchanged_fields):
+                converters.append((field.field_name, field.to_representation))
+
+        return tuple(names), tuple(columns), tuple(converters)
+
+    def values(self, queryset, *extra_columns):
+        """Return the rows of a queryset to serialize
+
+        extra_columns are fetched after the output ones, for instance for
+        the ordering fields a cursor paginator reads.
+        """
+        _, columns, _ = self._compiled
+        extra_columns = [
+            column for column in extra_columns if column not in columns
+        ]
+        return queryset.values_list(*columns, *extra_columns, named=True)
+
+    def to_representation(self, row):
+        """Return the serialized dict of a row"""
+        names, _, converters = self._compiled
+        data = dict(zip(names, row))
+        for name, convert in converters:
+            value = data[name]
+            if value is not None:
+                data[name] = convert(value)
+
+        return data
+
+    def list_representation(self, rows):
+        """Return the serialized dicts of rows"""
+        to_representation = self.to_representation
+        return [to_representation(row) for row in rows]
+
+
+meal_question = ValuesSerializer(serializers.MealQuestionSerializer)
+meal_vegetable = ValuesSerializer(serializers.MealVegetableSerializer)
+meal_user = ValuesSerializer(serializers.MealUserSerializer)
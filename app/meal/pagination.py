@@ -0,0 +1,17 @@
+"""
+Pagination for the meal APIs
+"""
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination
+
+
+class MealUserCursorPagination(CursorPagination):
+    """Keyset pagination over a user's answers, newest first
+
+    Pages are read from the (user, created_at, id) index of MealUser.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = settings.MEAL_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MEAL_PAGE_MAX_SIZE
@@ -0,0 +1,87 @@
+"""
+Questions and vegetables a user has not answered yet in the current period
+"""
+import datetime
+
+from django.db.models import Exists, OuterRef, Value
+from django.utils import timezone
+
+from core.models import MealQuestion, MealUser, MealVegetable
+from meal import catalog
+
+
+DAY = 'day'
+WEEK = 'week'
+PERIODS = [DAY, WEEK]
+
+
+def period_start(period, now=None):
+    """Return the start of the current day or week, weeks start on Monday"""
+    today = timezone.localtime(now).replace(
+        hour=0,
+        minute=0,
+        second=0,
+        microsecond=0
+    )
+    if period == WEEK:
+        return today - datetime.timedelta(days=today.weekday())
+    return today
+
+
+def unanswered(model, field, user, start):
+    """Return the (kind, id) of the catalog rows not answered since start"""
+    answers = MealUser.objects.filter(
+        user=user,
+        created_at__gte=start,
+        **{field: OuterRef('pk')}
+    )
+    return model.objects.filter(~Exists(answers)).annotate(
+        kind=Value(field)
+    ).values_list('kind', 'id')
+
+
+def pending_ids(user, start):
+    """Return the ids of the questions and vegetables left to answer
+
+    A single query: both NOT EXISTS become anti-joins against the user's
+    answers since start, found through core_mealuser_user_created in
+    the partitions of the period only. Its cost follows the size of the
+    catalog, not of the user's history.
+    """
+    ids = {'meal_question': set(), 'vegetable_question': set()}
+    rows = unanswered(
+        MealQuestion,
+        'meal_question',
+        user,
+        start
+    ).union(
+        unanswered(MealVegetable, 'vegetable_question', user, start),
+        all=True
+    )
+    for kind, pk in rows:
+        ids[kind].add(pk)
+
+    return ids
+
+
+def pending(user, period, now=None):
+    """Return the serialized questions and vegetables left to answer
+
+    Rows are taken from the cached catalog, in its order.
+    """
+    start = period_start(period, now)
+    ids = pending_ids(user, start)
+    serialized = catalog.get_catalog()
+
+    return {
+        'period': period,
+        'start': start,
+        'questions': [
+            question for question in serialized['questions']
+            if question['id'] in ids['meal_question']
+        ],
+        'vegetables': [
+            vegetable for vegetable in serialized['vegetables']
+            if vegetable['id'] in ids['vegetable_question']
+        ],
+    }
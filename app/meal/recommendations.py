@@ -0,0 +1,277 @@
+"""
+Vegetable recommendations scored against the user's recent intake
+"""
+import datetime
+import functools
+import operator
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from core.models import MealSummary, MealUser
+from meal import catalog
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CACHE_KEY = 'meal:recommendations:{user_id}'
+
+# Catalog fields whose values are the features of a vegetable
+FEATURE_FIELDS = ['color', 'varieties']
+
+# Intake counted for an answer, by answer
+CHOICE_WEIGHTS = {'none': 0, 'a bit': 1, 'normal': 2, 'a lot': 3}
+TRUE_WEIGHT = 2
+
+# The same weights applied to the MealSummary counters
+SUMMARY_WEIGHTS = {
+    'choice_a_bit_count': CHOICE_WEIGHTS['a bit'],
+    'choice_normal_count': CHOICE_WEIGHTS['normal'],
+    'choice_a_lot_count': CHOICE_WEIGHTS['a lot'],
+    'answer_true_count': TRUE_WEIGHT,
+    'answer_int_sum': 1,
+}
+
+Features = namedtuple('Features', [
+    'version',
+    'vegetables',
+    'index',
+    'columns',
+    'matrix',
+])
+
+# Features of the latest catalog version seen by this process
+_local = {}
+
+
+def get_features(version=None):
+    """Return the feature columns of every vegetable of the catalog
+
+    Every distinct value of a feature field is a column, so a vegetable
+    has one column per field. matrix is the one-hot vegetable x column
+    matrix, or None without NumPy.
+    """
+    data = catalog.get_catalog(version)
+    features = _local.get('features')
+    if features is not None and features.version == data['version']:
+        return features
+
+    vegetables = data['vegetables']
+    column_ids = {}
+    columns = [
+        tuple(
+            column_ids.setdefault((field, vegetable[field]), len(column_ids))
+            for field in FEATURE_FIELDS
+        )
+        for vegetable in vegetables
+    ]
+
+    matrix = None
+    if numpy is not None:
+        matrix = numpy.zeros((len(vegetables), len(column_ids)))
+        if vegetables:
+            rows = numpy.arange(len(vegetables))[:, None]
+            matrix[rows, numpy.array(columns)] = 1
+
+    features = Features(
+        data['version'],
+        vegetables,
+        {vegetable['id']: position
+         for position, vegetable in enumerate(vegetables)},
+        columns,
+        matrix
+    )
+    _local['features'] = features
+    return features
+
+
+def score(features, intake):
+    """Return the score of every vegetable for an intake
+
+    intake maps vegetable ids to the amount eaten recently. Vegetables
+    score higher the less they were eaten and the less their color and
+    variety were eaten through other vegetables.
+    """
+    if numpy is None:
+        return _score_python(features, intake)
+
+    eaten = numpy.zeros(len(features.vegetables))
+    for vegetable_id, amount in intake.items():
+        position = features.index.get(int(vegetable_id))
+        if position is not None:
+            eaten[position] = amount
+
+    exposure = features.matrix.T @ eaten
+    total = exposure.sum()
+    share = exposure / total if total else exposure
+    coverage = features.matrix @ share / len(FEATURE_FIELDS)
+
+    return ((1 - coverage) / (1 + eaten)).tolist()
+
+
+def _score_python(features, intake):
+    """Compute score() without NumPy"""
+    eaten = [0] * len(features.vegetables)
+    for vegetable_id, amount in intake.items():
+        position = features.index.get(int(vegetable_id))
+        if position is not None:
+            eaten[position] = amount
+
+    exposure = {}
+    for columns, amount in zip(features.columns, eaten):
+        for column in columns:
+            exposure[column] = exposure.get(column, 0) + amount
+    total = sum(exposure.values())
+
+    scores = []
+    for columns, amount in zip(features.columns, eaten):
+        coverage = 0
+        if total:
+            coverage = sum(exposure[column] for column in columns) / total
+        scores.append(
+            (1 - coverage / len(FEATURE_FIELDS)) / (1 + amount)
+        )
+
+    return scores
+
+
+def window_start():
+    """Return the first day of intake taken into account"""
+    return timezone.localdate() - datetime.timedelta(
+        days=settings.MEAL_RECOMMENDATION_DAYS - 1
+    )
+
+
+def answer_intake(answer):
+    """Return the intake recorded by an answer"""
+    amount = CHOICE_WEIGHTS.get(answer.answer_choice, 0)
+    if answer.answer_bool is True:
+        amount += TRUE_WEIGHT
+    if answer.answer_int is not None:
+        amount += answer.answer_int
+
+    return amount
+
+
+def load_state(user_id, start):
+    """Read the user's intake since start and excluded vegetables"""
+    weighted = functools.reduce(operator.add, [
+        F(field) * weight for field, weight in SUMMARY_WEIGHTS.items()
+    ])
+    intake = dict(MealSummary.objects.filter(
+        user_id=user_id,
+        day__gte=start,
+        vegetable_question__isnull=False
+    ).values_list('vegetable_question').annotate(
+        intake=Sum(weighted)
+    ).order_by())
+    excluded = MealUser.objects.filter(
+        Q(is_allergy=True) | Q(is_unnecessary=True),
+        user_id=user_id,
+        vegetable_question__isnull=False
+    ).values_list('vegetable_question', flat=True).distinct()
+
+    return {
+        'start': start,
+        'intake': intake,
+        'excluded': set(excluded),
+        'version': None,
+        'ranking': None,
+    }
+
+
+def get_state(user_id):
+    """Return the cached state of a user, reading it when missing
+
+    The state is read again when the window moved to a new day.
+    """
+    key = CACHE_KEY.format(user_id=user_id)
+    start = window_start()
+    state = cache.get(key)
+    if state is None or state['start'] != start:
+        state = load_state(user_id, start)
+        cache.set(key, state, settings.MEAL_RECOMMENDATION_CACHE_TIMEOUT)
+
+    return state
+
+
+def recommend(user_id, limit):
+    """Return the vegetables the user should eat more, best first"""
+    features = get_features()
+    state = get_state(user_id)
+    if state['ranking'] is None or state['version'] != features.version:
+        scores = score(features, state['intake'])
+        excluded = state['excluded']
+        state['ranking'] = sorted(
+            (
+                (round(value, 6), vegetable['id'])
+                for vegetable, value in zip(features.vegetables, scores)
+                if vegetable['id'] not in excluded
+            ),
+            key=lambda item: (-item[0], item[1])
+        )
+        state['version'] = features.version
+        cache.set(
+            CACHE_KEY.format(user_id=user_id),
+            state,
+            settings.MEAL_RECOMMENDATION_CACHE_TIMEOUT
+        )
+
+    vegetables = features.vegetables
+    return [
+        {**vegetables[features.index[vegetable_id]], 'score': value}
+        for value, vegetable_id in state['ranking'][:limit]
+    ]
+
+
+def _apply_answers(answers, created):
+    """Fold answers into the cached states of their users"""
+    for user_id, user_answers in answers.items():
+        key = CACHE_KEY.format(user_id=user_id)
+        if not created:
+            cache.delete(key)
+            continue
+
+        state = cache.get(key)
+        if state is None:
+            continue
+
+        start = state['start']
+        for answer in user_answers:
+            if timezone.localdate(answer.created_at) < start:
+                continue
+            vegetable_id = answer.vegetable_question_id
+            state['intake'][vegetable_id] = (
+                state['intake'].get(vegetable_id, 0) + answer_intake(answer)
+            )
+            if answer.is_allergy or answer.is_unnecessary:
+                state['excluded'].add(vegetable_id)
+        state['ranking'] = None
+        cache.set(key, state, settings.MEAL_RECOMMENDATION_CACHE_TIMEOUT)
+
+
+def record_answers(meal_users, created=True):
+    """Update the cached recommendations once the answers are committed
+
+    Created answers are added to the cached intake, so the next request
+    only scores the catalog again. The states of users with updated or
+    deleted answers are read again. Writers racing on the same user may
+    lose an increment until MEAL_RECOMMENDATION_CACHE_TIMEOUT.
+    """
+    answers = {}
+    for meal_user in meal_users:
+        # An update may have removed the vegetable of the answer
+        if not created or meal_user.vegetable_question_id is not None:
+            answers.setdefault(meal_user.user_id, []).append(meal_user)
+
+    if answers:
+        transaction.on_commit(
+            functools.partial(_apply_answers, answers, created)
+        )
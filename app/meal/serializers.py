@@ -1,9 +1,41 @@
 """
 Serializers for the meal API View
 """
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
 from rest_framework import serializers
 
-from core.models import MealQuestion, MealUser
+from core import answer_state, summary
+from core.models import (
+    Home,
+    MealAnswerState,
+    MealQuestion,
+    MealUser,
+    MealVegetable
+)
+from meal import pending, recommendations
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field resolved from objects prefetched by the parent"""
+
+    def to_internal_value(self, data):
+        """Look the object up in the prefetched map when there is one"""
+        prefetched = self.context.get('prefetched', {}).get(self.field_name)
+        if prefetched is None:
+            return super().to_internal_value(data)
+
+        try:
+            return prefetched[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
 
 class MealQuestionSerializer(serializers.ModelSerializer):
@@ -20,24 +52,257 @@ class MealQuestionSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'question', 'created_at']
 
 
+class MealVegetableSerializer(serializers.ModelSerializer):
+    """Serializer for MealVegetable"""
+
+    class Meta:
+        model = MealVegetable
+        fields = [
+            'id',
+            'vegetable',
+            'color',
+            'varieties'
+        ]
+
+        read_only_fields = ['id', 'vegetable', 'color', 'varieties']
+
+
+class MealUserListSerializer(serializers.ListSerializer):
+    """Validate and create many MealUser answers at once"""
+    related_fields = {
+        'meal_question': MealQuestion,
+        'vegetable_question': MealVegetable,
+    }
+
+    def to_internal_value(self, data):
+        """Resolve every related object of the batch before validating"""
+        max_items = settings.MEAL_USER_BULK_MAX_ITEMS
+        if isinstance(data, list) and len(data) > max_items:
+            msg = _('Ensure this list has no more than %(max)d items.')
+            raise serializers.ValidationError(
+                {'non_field_errors': [msg % {'max': max_items}]},
+                code='max_length'
+            )
+
+        if isinstance(data, list):
+            self._context['prefetched'] = self._prefetch_related(data)
+
+        return super().to_internal_value(data)
+
+    def _prefetch_related(self, data):
+        """Fetch the referenced objects with one query per related model"""
+        prefetched = {}
+        for field_name, model in self.related_fields.items():
+            pks = set()
+            for item in data:
+                if not isinstance(item, dict):
+                    continue
+                try:
+                    pks.add(int(item[field_name]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+            prefetched[field_name] = model.objects.in_bulk(pks) if pks else {}
+
+        return prefetched
+
+    def create(self, validated_data):
+        """Insert all answers with a single query"""
+        meal_users = [MealUser(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            MealUser.objects.bulk_create(meal_users)
+            # bulk_create sends no post_save, so update the rollup, the
+            # latest answers and the recommendations here
+            summary.record_answers(meal_users)
+            answer_state.record_answers(meal_users)
+            recommendations.record_answers(meal_users)
+
+        return meal_users
+
+
 class MealUserSerializer(serializers.ModelSerializer):
     """Serializer for MealUser"""
+    meal_question = PrefetchedPrimaryKeyRelatedField(
+        queryset=MealQuestion.objects.all(),
+        required=False,
+        allow_null=True
+    )
+    vegetable_question = PrefetchedPrimaryKeyRelatedField(
+        queryset=MealVegetable.objects.all(),
+        required=False,
+        allow_null=True
+    )
 
     class Meta:
         model = MealUser
         fields = [
             'id',
             'meal_question',
+            'vegetable_question',
+            'is_allergy',
+            'is_unnecessary',
             'answer_type',
             'answer_choice',
             'answer_int',
             'answer_bool'
         ]
 
-        read_only_fields = [
-            'id',
+        read_only_fields = ['id']
+        list_serializer_class = MealUserListSerializer
+
+    def validate(self, attributes):
+        """Validate the answer refers to a question or a vegetable"""
+        meal_question = attributes.get(
+            'meal_question',
+            getattr(self.instance, 'meal_question', None)
+        )
+        vegetable_question = attributes.get(
+            'vegetable_question',
+            getattr(self.instance, 'vegetable_question', None)
+        )
+        if meal_question is None and vegetable_question is None:
+            msg = _('Either meal_question or vegetable_question is required')
+            raise serializers.ValidationError(msg, code='required')
+
+        return attributes
+
+
+class MealAnswerStateSerializer(serializers.ModelSerializer):
+    """Serializer for the latest answer to a question or vegetable"""
+    answer = serializers.IntegerField(source='answer_id', read_only=True)
+
+    class Meta:
+        model = MealAnswerState
+        fields = [
             'meal_question',
+            'vegetable_question',
+            'answer',
+            'answered_at',
+            'is_allergy',
+            'is_unnecessary',
+            'answer_type',
             'answer_choice',
             'answer_int',
-            'answer_bool'
-        ]
\ No newline at end of file
+            'answer_bool',
+        ]
+        read_only_fields = fields
+
+
+class MealSummaryQuerySerializer(serializers.Serializer):
+    """Serializer for the date range of a meal summary"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, attributes):
+        """Default to the last MEAL_SUMMARY_DEFAULT_DAYS days"""
+        end = attributes.get('end') or timezone.localdate()
+        start = attributes.get('start') or end - datetime.timedelta(
+            days=settings.MEAL_SUMMARY_DEFAULT_DAYS - 1
+        )
+        if start > end:
+            msg = _('start must not be after end')
+            raise serializers.ValidationError(msg, code='invalid')
+
+        attributes['start'] = start
+        attributes['end'] = end
+        return attributes
+
+
+class MealSyncQuerySerializer(serializers.Serializer):
+    """Serializer for the sync token and page size of a delta sync"""
+    since = serializers.CharField(required=False)
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MEAL_SYNC_PAGE_SIZE,
+        required=False
+    )
+
+
+class MealSyncDeletedSerializer(serializers.Serializer):
+    """Serializer for the ids deleted since a sync token"""
+    questions = serializers.ListField(child=serializers.IntegerField())
+    vegetables = serializers.ListField(child=serializers.IntegerField())
+    answers = serializers.ListField(child=serializers.IntegerField())
+
+
+class MealSyncSerializer(serializers.Serializer):
+    """Serializer for the changes since a sync token"""
+    questions = MealQuestionSerializer(many=True)
+    vegetables = MealVegetableSerializer(many=True)
+    answers = MealUserSerializer(many=True)
+    deleted = MealSyncDeletedSerializer()
+    next = serializers.CharField()
+    has_more = serializers.BooleanField()
+
+
+class MealPendingQuerySerializer(serializers.Serializer):
+    """Serializer for the period of the pending questions"""
+    period = serializers.ChoiceField(
+        choices=pending.PERIODS,
+        default=pending.DAY
+    )
+
+
+class MealPendingSerializer(serializers.Serializer):
+    """Serializer for the questions and vegetables left to answer"""
+    period = serializers.ChoiceField(choices=pending.PERIODS)
+    start = serializers.DateTimeField()
+    questions = MealQuestionSerializer(many=True)
+    vegetables = MealVegetableSerializer(many=True)
+
+
+class MealRecommendationQuerySerializer(serializers.Serializer):
+    """Serializer for the number of recommended vegetables"""
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=settings.MEAL_RECOMMENDATION_MAX_LIMIT,
+        default=settings.MEAL_RECOMMENDATION_LIMIT
+    )
+
+
+class MealRecommendationSerializer(MealVegetableSerializer):
+    """Serializer for a recommended vegetable and its score"""
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(MealVegetableSerializer.Meta):
+        fields = MealVegetableSerializer.Meta.fields + ['score']
+        read_only_fields = fields
+
+
+class MealSummarySerializer(serializers.Serializer):
+    """Serializer for the answers to a question or vegetable in a range"""
+    meal_question = serializers.IntegerField(allow_null=True)
+    vegetable_question = serializers.IntegerField(allow_null=True)
+    answer_count = serializers.IntegerField()
+    choice_none_count = serializers.IntegerField()
+    choice_a_bit_count = serializers.IntegerField()
+    choice_normal_count = serializers.IntegerField()
+    choice_a_lot_count = serializers.IntegerField()
+    answer_int_count = serializers.IntegerField()
+    answer_int_sum = serializers.IntegerField()
+    answer_true_count = serializers.IntegerField()
+    answer_false_count = serializers.IntegerField()
+
+
+class HomeSerializer(serializers.ModelSerializer):
+    """Serializer for a household"""
+
+    class Meta:
+        model = Home
+        fields = ['id', 'name']
+        read_only_fields = ['id', 'name']
+
+
+class MealHomeMemberSerializer(serializers.Serializer):
+    """Serializer for a household member and their summary"""
+    id = serializers.IntegerField(source='user.id')
+    first_name = serializers.CharField(source='user.first_name')
+    last_name = serializers.CharField(source='user.last_name')
+    summary = MealSummarySerializer(many=True)
+
+
+class MealHomeSummarySerializer(serializers.Serializer):
+    """Serializer for the summaries of every member of a household"""
+    home = HomeSerializer()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    members = MealHomeMemberSerializer(many=True)
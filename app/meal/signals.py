@@ -0,0 +1,42 @@
+"""
+Signal handlers for the meal app
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import MealQuestion, MealUser, MealVegetable
+from meal import catalog, recommendations, sync
+
+
+@receiver(post_save, sender=MealQuestion)
+@receiver(post_delete, sender=MealQuestion)
+@receiver(post_save, sender=MealVegetable)
+@receiver(post_delete, sender=MealVegetable)
+def invalidate_catalog(sender, **kwargs):
+    """Invalidate the cached catalog when a question or vegetable changes
+
+    The version is read again right away, for the rest of the
+    transaction, and once it commits, for the other requests.
+    """
+    catalog.invalidate()
+    catalog.invalidate_on_commit()
+
+
+@receiver(post_save, sender=MealUser)
+def update_recommendations(sender, instance, created, **kwargs):
+    """Fold a saved answer into the cached recommendations"""
+    recommendations.record_answers([instance], created=created)
+
+
+@receiver(post_delete, sender=MealUser)
+def forget_recommendations(sender, instance, **kwargs):
+    """Drop the cached recommendations of a deleted answer's user"""
+    recommendations.record_answers([instance], created=False)
+
+
+@receiver(post_delete, sender=MealQuestion)
+@receiver(post_delete, sender=MealVegetable)
+@receiver(post_delete, sender=MealUser)
+def record_tombstone(sender, instance, **kwargs):
+    """Keep the id of a deleted row for the clients syncing changes"""
+    sync.record_deletion(instance)
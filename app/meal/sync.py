@@ -0,0 +1,260 @@
+"""
+Delta sync of the catalog and the user's answers for offline clients
+"""
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import (
+    MealQuestion,
+    MealUser,
+    MealVegetable,
+    SyncTombstone
+)
+from meal import fast_serializers
+
+
+# A stream of changes, ordered by (timestamp field, id)
+Stream = namedtuple('Stream', ['name', 'field'])
+
+STREAMS = [
+    Stream('questions', 'updated_at'),
+    Stream('vegetables', 'updated_at'),
+    Stream('answers', 'updated_at'),
+    Stream('deleted', 'deleted_at'),
+]
+
+# Name of the deleted ids of each tombstone kind in the response
+DELETED_NAMES = {
+    SyncTombstone.QUESTION: 'questions',
+    SyncTombstone.VEGETABLE: 'vegetables',
+    SyncTombstone.ANSWER: 'answers',
+}
+
+# Serializer of the rows of each stream but the tombstones
+SERIALIZERS = {
+    'questions': fast_serializers.meal_question,
+    'vegetables': fast_serializers.meal_vegetable,
+    'answers': fast_serializers.meal_user,
+}
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+# Start of the oldest transaction open in another session. Sessions of
+# other roles are only seen by roles with pg_read_all_stats.
+OLDEST_TRANSACTION_SQL = """
+    SELECT min(xact_start)
+    FROM pg_stat_activity
+    WHERE datname = current_database()
+        AND backend_type = 'client backend'
+        AND pid <> pg_backend_pid()
+"""
+
+KIND_OF_MODEL = {
+    MealQuestion: SyncTombstone.QUESTION,
+    MealVegetable: SyncTombstone.VEGETABLE,
+    MealUser: SyncTombstone.ANSWER,
+}
+
+
+class InvalidToken(ValueError):
+    """The sync token is malformed"""
+
+
+class ExpiredToken(ValueError):
+    """The sync token is older than the kept tombstones"""
+
+
+def encode_token(positions):
+    """Return the opaque token of the position reached in every stream
+
+    A position is (timestamp, id) when the stream stopped inside a
+    timestamp, or (timestamp, None) when every row up to it was sent.
+    """
+    data = {
+        name: [moment.isoformat(), last_id]
+        for name, (moment, last_id) in positions.items()
+    }
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(',', ':')).encode()
+    ).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Return the positions of a token made by encode_token()"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ))
+        positions = {
+            stream.name: (
+                parse_datetime(data[stream.name][0]),
+                data[stream.name][1]
+            )
+            for stream in STREAMS
+        }
+    except (binascii.Error, LookupError, TypeError, ValueError) as exc:
+        raise InvalidToken() from exc
+
+    for moment, last_id in positions.values():
+        if moment is None or moment.tzinfo is None or not (
+            last_id is None or type(last_id) is int
+        ):
+            raise InvalidToken()
+
+    return positions
+
+
+def after(field, position):
+    """Return the filter of the rows after a position"""
+    moment, last_id = position
+    if last_id is None:
+        return Q(**{f'{field}__gt': moment})
+
+    return Q(**{f'{field}__gt': moment}) | Q(
+        **{field: moment, 'id__gt': last_id}
+    )
+
+
+def querysets(user):
+    """Return the queryset of every stream for a user"""
+    return {
+        'questions': MealQuestion.objects.all(),
+        'vegetables': MealVegetable.objects.all(),
+        'answers': MealUser.objects.filter(user=user),
+        'deleted': SyncTombstone.objects.filter(
+            Q(user=user) | Q(user__isnull=True)
+        ),
+    }
+
+
+def high_water_mark(now):
+    """Return the time up to which every change is committed
+
+    A row is dated after the start of the transaction writing it, so no
+    row dated before the oldest open transaction can still appear. The
+    mark also stays MEAL_SYNC_SETTLE_SECONDS behind now, to allow for
+    clock differences between the app servers and the database.
+    """
+    upper = now - datetime.timedelta(seconds=settings.MEAL_SYNC_SETTLE_SECONDS)
+    with connection.cursor() as cursor:
+        cursor.execute(OLDEST_TRANSACTION_SQL)
+        oldest, = cursor.fetchone()
+
+    if oldest is not None:
+        upper = min(upper, oldest - datetime.timedelta(microseconds=1))
+    return upper
+
+
+def read_stream(stream, queryset, position, upper, limit):
+    """Return up to limit named rows of a stream after a position"""
+    queryset = queryset.filter(
+        after(stream.field, position),
+        **{f'{stream.field}__lte': upper}
+    ).order_by(stream.field, 'id')
+
+    if stream.name in SERIALIZERS:
+        rows = SERIALIZERS[stream.name].values(queryset, stream.field, 'id')
+    else:
+        rows = queryset.values_list(
+            stream.field,
+            'id',
+            'kind',
+            'object_id',
+            named=True
+        )
+
+    return list(rows[:limit + 1])
+
+
+def changes(user, token=None, limit=None):
+    """Return the changes seen by a user since a sync token
+
+    Every stream is read up to the high_water_mark(), so rows written
+    by transactions still open are not skipped once they commit. Streams
+    stop after limit rows; has_more then tells the client to ask again
+    with the next token. Without a token the whole
+    catalog and history are sent, without tombstones.
+    """
+    limit = limit or settings.MEAL_SYNC_PAGE_SIZE
+    now = timezone.now()
+    upper = high_water_mark(now)
+
+    if token is None:
+        positions = {stream.name: (EPOCH, None) for stream in STREAMS}
+        positions['deleted'] = (upper, None)
+    else:
+        positions = decode_token(token)
+        oldest = now - datetime.timedelta(
+            days=settings.MEAL_SYNC_TOMBSTONE_DAYS
+        )
+        if positions['deleted'][0] < oldest:
+            raise ExpiredToken()
+
+    data = {'deleted': {name: [] for name in DELETED_NAMES.values()}}
+    has_more = False
+    streams = querysets(user)
+    for stream in STREAMS:
+        position = positions[stream.name]
+        rows = read_stream(
+            stream,
+            streams[stream.name],
+            position,
+            upper,
+            limit
+        )
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            has_more = True
+            positions[stream.name] = (
+                getattr(rows[-1], stream.field),
+                rows[-1].id
+            )
+        else:
+            # Every row up to upper was read
+            positions[stream.name] = (max(upper, position[0]), None)
+
+        if stream.name in SERIALIZERS:
+            data[stream.name] = SERIALIZERS[
+                stream.name
+            ].list_representation(rows)
+        else:
+            for row in rows:
+                data['deleted'][DELETED_NAMES[row.kind]].append(
+                    row.object_id
+                )
+
+    data['next'] = encode_token(positions)
+    data['has_more'] = has_more
+    return data
+
+
+def record_deletion(instance):
+    """Keep a tombstone of a deleted question, vegetable or answer"""
+    kind = KIND_OF_MODEL[type(instance)]
+    SyncTombstone.objects.create(
+        kind=kind,
+        object_id=instance.pk,
+        user_id=instance.user_id if kind == SyncTombstone.ANSWER else None
+    )
+
+
+def purge_tombstones(now=None):
+    """Delete the tombstones older than MEAL_SYNC_TOMBSTONE_DAYS
+
+    Return the number of deleted tombstones.
+    """
+    oldest = (now or timezone.now()) - datetime.timedelta(
+        days=settings.MEAL_SYNC_TOMBSTONE_DAYS
+    )
+    deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=oldest).delete()
+    return deleted
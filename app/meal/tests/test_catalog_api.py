@@ -0,0 +1,123 @@
+"""
+Tests for the cached meal catalog APIs
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealQuestion, MealVegetable
+
+from meal import catalog
+from meal.serializers import MealVegetableSerializer
+
+MEAL_QUESTION_URL = reverse('meal:mealquestion-list')
+MEAL_VEGETABLE_URL = reverse('meal:mealvegetable-list')
+
+
+class CatalogAPITests(TestCase):
+    """Test the cached catalog endpoints"""
+
+    def setUp(self):
+        cache.clear()
+        catalog.invalidate()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        MealQuestion.objects.create(question='野菜を食べましたか？')
+        MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+
+    def test_list_vegetables(self):
+        """Test listing the vegetable catalog"""
+        res = self.client.get(MEAL_VEGETABLE_URL)
+
+        vegetables = MealVegetable.objects.all().order_by('-id')
+        serializer = MealVegetableSerializer(vegetables, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, serializer.data)
+
+    def test_catalog_has_validators(self):
+        """Test the catalog is served with ETag and Last-Modified"""
+        res = self.client.get(MEAL_QUESTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_catalog_not_modified(self):
+        """Test an unchanged catalog returns 304 without a query"""
+        res = self.client.get(MEAL_QUESTION_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(
+                MEAL_QUESTION_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_catalog_served_from_cache(self):
+        """Test a cached catalog is served without a query"""
+        self.client.get(MEAL_QUESTION_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(MEAL_QUESTION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+    def test_catalog_updated_on_change(self):
+        """Test saving a question invalidates the cached catalog"""
+        res = self.client.get(MEAL_QUESTION_URL)
+        etag = res['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MealQuestion.objects.create(question='果物を食べましたか？')
+
+        res = self.client.get(MEAL_QUESTION_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(len(res.data), 2)
+
+    def test_catalog_version_bumped_on_delete(self):
+        """Test deleting a vegetable moves the catalog to a new version"""
+        version = catalog.get_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MealVegetable.objects.all().delete()
+
+        self.assertNotEqual(catalog.get_version(), version)
+        self.assertEqual(catalog.get_catalog()['vegetables'], [])
+
+    def test_change_by_other_process(self):
+        """Test a change without signals is served once the version expires"""
+        res = self.client.get(MEAL_QUESTION_URL)
+        MealQuestion.objects.update(
+            question='果物を食べましたか？',
+            updated_at=timezone.now() + datetime.timedelta(seconds=1)
+        )
+
+        with override_settings(MEAL_CATALOG_VERSION_TTL=60):
+            catalog.invalidate()
+            self.client.get(MEAL_QUESTION_URL)
+            cached = self.client.get(
+                MEAL_QUESTION_URL,
+                HTTP_IF_NONE_MATCH=res['ETag']
+            )
+
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data[0]['question'], '果物を食べましたか？')
@@ -0,0 +1,166 @@
+"""
+Tests for the latest answers API
+"""
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealAnswerState, MealQuestion, MealUser, MealVegetable
+
+CURRENT_ANSWERS_URL = reverse('meal:current-answers')
+MEAL_USER_BULK_URL = reverse('meal:mealuser-bulk')
+
+
+def state_rows():
+    """Return the stored latest answers"""
+    return sorted(MealAnswerState.objects.values_list(
+        'user_id',
+        'meal_question_id',
+        'vegetable_question_id',
+        'answer_id',
+        'answer_int'
+    ), key=str)
+
+
+class PublicCurrentAnswersAPITests(TestCase):
+    """Test unauthenticated latest answers requests"""
+
+    def test_auth_required(self):
+        """Test auth is required to get the latest answers"""
+        res = APIClient().get(CURRENT_ANSWERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateCurrentAnswersAPITests(TestCase):
+    """Test authenticated latest answers requests"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.question = MealQuestion.objects.create(question='揚げ物？')
+        self.other_question = MealQuestion.objects.create(question='甘い物？')
+        self.vegetable = MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+
+    def answer(self, value, user=None, **params):
+        params.setdefault('meal_question', self.question)
+        return MealUser.objects.create(
+            user=user or self.user,
+            answer_type='int',
+            answer_int=value,
+            **params
+        )
+
+    def test_latest_answer_per_question(self):
+        """Test only the latest answer to each question is listed"""
+        self.answer(1)
+        latest = self.answer(2)
+        vegetable = self.answer(
+            3,
+            meal_question=None,
+            vegetable_question=self.vegetable
+        )
+        self.answer(4, get_user_model().objects.create_user(
+            'other@example.com',
+            'Testpass123'
+        ))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(CURRENT_ANSWERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(item['answer'], item['answer_int']) for item in res.data],
+            [(latest.id, 2), (vegetable.id, 3)]
+        )
+        self.assertEqual(res.data[0]['meal_question'], self.question.id)
+
+    def test_updated_answer(self):
+        """Test editing the latest answer updates the state"""
+        answer = self.answer(1)
+        answer.answer_int = 5
+        answer.save()
+
+        self.assertEqual(state_rows(), [
+            (self.user.id, self.question.id, None, answer.id, 5),
+        ])
+
+    def test_editing_older_answer_keeps_latest(self):
+        """Test editing an older answer leaves the latest one"""
+        older = self.answer(1)
+        latest = self.answer(2)
+        older.answer_int = 5
+        older.save()
+
+        self.assertEqual(state_rows(), [
+            (self.user.id, self.question.id, None, latest.id, 2),
+        ])
+
+    def test_deleted_answer(self):
+        """Test deleting the latest answer brings back the previous one"""
+        older = self.answer(1)
+        latest = self.answer(2)
+
+        latest.delete()
+        self.assertEqual(state_rows(), [
+            (self.user.id, self.question.id, None, older.id, 1),
+        ])
+
+        older.delete()
+        self.assertEqual(state_rows(), [])
+
+    def test_moved_answer(self):
+        """Test an answer moved to another question updates both"""
+        older = self.answer(1)
+        latest = self.answer(2)
+
+        latest.meal_question = self.other_question
+        latest.save()
+
+        self.assertEqual(state_rows(), sorted([
+            (self.user.id, self.question.id, None, older.id, 1),
+            (self.user.id, self.other_question.id, None, latest.id, 2),
+        ], key=str))
+
+    def test_bulk_create(self):
+        """Test answers created in bulk update the state"""
+        self.answer(1)
+
+        self.client.post(MEAL_USER_BULK_URL, [
+            {
+                'meal_question': self.question.id,
+                'answer_type': 'int',
+                'answer_int': value,
+            }
+            for value in (2, 3)
+        ], format='json')
+
+        res = self.client.get(CURRENT_ANSWERS_URL)
+        self.assertEqual([item['answer_int'] for item in res.data], [3])
+
+    def test_rebuild(self):
+        """Test rebuilding from the history gives the maintained state"""
+        self.answer(1)
+        self.answer(2)
+        self.answer(3, meal_question=self.other_question).delete()
+        self.answer(4, meal_question=None, vegetable_question=self.vegetable)
+        expected = state_rows()
+        MealAnswerState.objects.all().delete()
+
+        call_command('rebuild_answer_state', stdout=io.StringIO())
+
+        self.assertEqual(state_rows(), expected)
@@ -0,0 +1,146 @@
+"""
+Tests for the values_list() serializers of the meal API
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealQuestion, MealUser, MealVegetable
+from meal import fast_serializers
+from meal.serializers import (
+    MealQuestionSerializer,
+    MealUserSerializer,
+    MealVegetableSerializer
+)
+
+
+def detail_url(name, pk):
+    """Return the detail URL of a meal route"""
+    return reverse(f'meal:{name}-detail', args=[pk])
+
+
+class FastSerializerTests(TestCase):
+    """Test the fast serializers give the same output as the model ones"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'tesTpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.question = MealQuestion.objects.create(question='朝食は？')
+        self.vegetable = MealVegetable.objects.create(
+            vegetable='Carrot',
+            color='orange',
+            varieties='3'
+        )
+        MealUser.objects.create(
+            user=self.user,
+            meal_question=self.question,
+            answer_type='choice',
+            answer_choice='a lot'
+        )
+        MealUser.objects.create(
+            user=self.user,
+            vegetable_question=self.vegetable,
+            is_allergy=True,
+            answer_type='bool',
+            answer_bool=False
+        )
+        MealUser.objects.create(
+            user=self.user,
+            meal_question=self.question,
+            vegetable_question=self.vegetable,
+            is_unnecessary=True,
+            answer_type='int',
+            answer_int=0
+        )
+
+    def assertSameOutput(self, fast_serializer, serializer_class, queryset):
+        """Assert both serializers give the same data for queryset"""
+        expected = serializer_class(queryset, many=True).data
+        data = fast_serializer.list_representation(
+            fast_serializer.values(queryset)
+        )
+
+        self.assertEqual(data, [dict(item) for item in expected])
+        self.assertEqual(
+            [list(item) for item in data],
+            [list(item) for item in expected]
+        )
+
+    def test_meal_user_output(self):
+        """Test answers serialize like MealUserSerializer"""
+        self.assertSameOutput(
+            fast_serializers.meal_user,
+            MealUserSerializer,
+            MealUser.objects.order_by('-id')
+        )
+
+    def test_catalog_output(self):
+        """Test questions and vegetables serialize like their serializers"""
+        self.assertSameOutput(
+            fast_serializers.meal_question,
+            MealQuestionSerializer,
+            MealQuestion.objects.order_by('-id')
+        )
+        self.assertSameOutput(
+            fast_serializers.meal_vegetable,
+            MealVegetableSerializer,
+            MealVegetable.objects.order_by('-id')
+        )
+
+    def test_list_meal_user_unchanged(self):
+        """Test the answer history pages are unchanged"""
+        res = self.client.get(
+            reverse('meal:mealuser-list'),
+            {'page_size': 2}
+        )
+        next_res = self.client.get(res.data['next'])
+
+        answers = MealUser.objects.order_by('-created_at', '-id')
+        serializer = MealUserSerializer(answers, many=True)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'] + next_res.data['results'],
+            serializer.data
+        )
+        self.assertIsNone(next_res.data['next'])
+
+    def test_retrieve_unchanged(self):
+        """Test detail routes return what the serializers return"""
+        answer = MealUser.objects.first()
+        cases = [
+            ('mealuser', answer, MealUserSerializer),
+            ('mealquestion', self.question, MealQuestionSerializer),
+            ('mealvegetable', self.vegetable, MealVegetableSerializer),
+        ]
+
+        for name, instance, serializer_class in cases:
+            res = self.client.get(detail_url(name, instance.id))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.data, serializer_class(instance).data)
+
+    def test_retrieve_other_user_answer(self):
+        """Test another user's answer is not found"""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'tesTpass123'
+        )
+        answer = MealUser.objects.create(
+            user=other,
+            meal_question=self.question,
+            answer_type='int',
+            answer_int=1
+        )
+
+        res = self.client.get(detail_url('mealuser', answer.id))
+        invalid_res = self.client.get(detail_url('mealuser', 'abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(invalid_res.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,23 +1,35 @@
 """
 Tests for meal APIs
 """
+import csv
+import io
+import json
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.models import MealSummary
 from core.models import MealUser
 from core.models import MealQuestion
+from core.models import MealVegetable
 
+from meal.pagination import MealUserCursorPagination
 from meal.serializers import MealQuestionSerializer
 from meal.serializers import MealUserSerializer
 
-MEAL_QUESTION_URL = reverse('meal:meal-question')
-MEAL_USER_URL = reverse('meal:meal-user')
+MEAL_QUESTION_URL = reverse('meal:mealquestion-list')
+MEAL_USER_URL = reverse('meal:mealuser-list')
+MEAL_USER_BULK_URL = reverse('meal:mealuser-bulk')
+MEAL_USER_EXPORT_URL = reverse('meal:mealuser-export')
+
 
-def create_user_meal(user, meal_quesion, **params):
+def create_user_meal(user, meal_question, **params):
     """Create and return a sample meal"""
     # defaults = {
     #     'anser_type': 'choice',
@@ -25,9 +37,14 @@ def create_user_meal(user, meal_quesion, **params):
     # }
     # defaults.update(params)
 
-    user_meal = MealUser.objects.create(user=user, meal_quesion=meal_quesion, **params)
+    user_meal = MealUser.objects.create(
+        user=user,
+        meal_question=meal_question,
+        **params
+    )
     return user_meal
 
+
 def create_meal_question(question):
     """Create and return a smaple meal question"""
     meal_question = MealQuestion.objects.create(question=question)
@@ -56,12 +73,13 @@ class PrivateMealAPITests(TestCase):
 
         res = self.client.get(MEAL_QUESTION_URL)
 
-        meal_question = MealQuestion.objects.all().first()
-        serializer = MealQuestionSerializer(meal_question)
+        meal_question = MealQuestion.objects.all().order_by('-id')
+        serializer = MealQuestionSerializer(meal_question, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.meal_question = MealQuestion.objects.create(
             question='揚げ物をどれくらい食べましたか？'
@@ -76,7 +94,7 @@ class PrivateMealAPITests(TestCase):
         """Test retrieving meal user"""
         create_user_meal(
             user=self.user,
-            meal_quesion=self.meal_question,
+            meal_question=self.meal_question,
             answer_type='choice',
             answer_choice='none'
         )
@@ -86,7 +104,7 @@ class PrivateMealAPITests(TestCase):
         meal_user = MealUser.objects.all().order_by('-id')
         serializer = MealUserSerializer(meal_user, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_meal_user_table_limited_to_correct_user(self):
         """Test MealUser object is limited to correct user"""
@@ -96,15 +114,15 @@ class PrivateMealAPITests(TestCase):
         )
         create_user_meal(
             user=self.user,
-            meal_quesion=self.meal_question,
+            meal_question=self.meal_question,
             answer_type='choice',
             answer_choice='none'
         )
         create_user_meal(
             user=other_user,
-            meal_quesion=self.meal_question,
+            meal_question=self.meal_question,
             answer_type='choice',
-            asnwer_choice='a lot'
+            answer_choice='a lot'
         )
 
         res = self.client.get(MEAL_USER_URL)
@@ -112,11 +130,175 @@ class PrivateMealAPITests(TestCase):
         meal_user = MealUser.objects.filter(user=self.user)
         serializer = MealUserSerializer(meal_user, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_bulk_create_meal_user(self):
+        """Test creating every answer of a questionnaire at once"""
+        vegetable = MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+        payload = [
+            {
+                'meal_question': self.meal_question.id,
+                'answer_type': 'choice',
+                'answer_choice': 'a bit'
+            },
+            {
+                'vegetable_question': vegetable.id,
+                'answer_type': 'bool',
+                'answer_bool': True
+            },
+        ]
+
+        res = self.client.post(MEAL_USER_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        meal_users = MealUser.objects.filter(user=self.user)
+        self.assertEqual(meal_users.count(), 2)
+        self.assertTrue(meal_users.filter(
+            meal_question=self.meal_question,
+            answer_choice='a bit'
+        ).exists())
+        self.assertTrue(meal_users.filter(
+            vegetable_question=vegetable,
+            answer_bool=True
+        ).exists())
+        summary = MealSummary.objects.get(vegetable_question=vegetable)
+        self.assertEqual(summary.answer_true_count, 1)
+
+    def test_bulk_create_meal_user_returns_errors_per_item(self):
+        """Test invalid items are reported and nothing is created"""
+        payload = [
+            {
+                'meal_question': self.meal_question.id,
+                'answer_type': 'choice',
+                'answer_choice': 'none'
+            },
+            {
+                'meal_question': self.meal_question.id + 100,
+                'answer_type': 'choice',
+                'answer_choice': 'none'
+            },
+            {
+                'answer_type': 'choice',
+                'answer_choice': 'none'
+            },
+        ]
 
+        res = self.client.post(MEAL_USER_BULK_URL, payload, format='json')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('meal_question', res.data[1])
+        self.assertIn('non_field_errors', res.data[2])
+        self.assertFalse(MealUser.objects.filter(user=self.user).exists())
 
+    def test_bulk_create_meal_user_resolves_questions_once(self):
+        """Test related questions are fetched with a single query"""
+        questions = [
+            MealQuestion.objects.create(question=f'question {i}')
+            for i in range(5)
+        ]
+        payload = [
+            {
+                'meal_question': question.id,
+                'answer_type': 'int',
+                'answer_int': 3
+            }
+            for question in questions
+        ]
+        serializer = MealUserSerializer(data=payload, many=True)
 
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
 
+    def test_bulk_create_meal_user_empty_error(self):
+        """Test an empty submission returns an error"""
+        res = self.client.post(MEAL_USER_BULK_URL, [], format='json')
 
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_meal_user_history_paginated(self):
+        """Test answer history is returned newest first page by page"""
+        for answer in range(5):
+            create_user_meal(
+                user=self.user,
+                meal_question=self.meal_question,
+                answer_type='int',
+                answer_int=answer
+            )
+
+        res = self.client.get(MEAL_USER_URL, {'page_size': 2})
+        first_page = [item['answer_int'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second_page = [item['answer_int'] for item in res.data['results']]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(first_page, [4, 3])
+        self.assertEqual(second_page, [2, 1])
+
+    def test_meal_user_page_size_limited(self):
+        """Test the page size can not exceed the configured maximum"""
+        with patch.object(MealUserCursorPagination, 'max_page_size', 2):
+            for answer in range(3):
+                create_user_meal(
+                    user=self.user,
+                    meal_question=self.meal_question,
+                    answer_type='int',
+                    answer_int=answer
+                )
+
+            res = self.client.get(MEAL_USER_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_export_meal_user_ndjson(self):
+        """Test exporting the answer history as NDJSON"""
+        create_user_meal(
+            user=self.user,
+            meal_question=self.meal_question,
+            answer_type='choice',
+            answer_choice='a lot'
+        )
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'otherPass123'
+        )
+        create_user_meal(
+            user=other_user,
+            meal_question=self.meal_question,
+            answer_type='choice',
+            answer_choice='none'
+        )
+
+        res = self.client.get(MEAL_USER_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        row = json.loads(lines[0])
+        self.assertEqual(row['meal_question'], self.meal_question.id)
+        self.assertEqual(row['answer_choice'], 'a lot')
+
+    def test_export_meal_user_csv(self):
+        """Test exporting the answer history as CSV"""
+        for answer in range(3):
+            create_user_meal(
+                user=self.user,
+                meal_question=self.meal_question,
+                answer_type='int',
+                answer_int=answer
+            )
+
+        res = self.client.get(MEAL_USER_EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['answer_int'] for row in rows],
+                         ['0', '1', '2'])
@@ -0,0 +1,141 @@
+"""
+Tests for the pending questions API
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealQuestion, MealUser, MealVegetable
+
+from meal import catalog, pending
+
+MEAL_PENDING_URL = reverse('meal:pending')
+
+
+def ids(items):
+    """Return the ids of serialized rows"""
+    return [item['id'] for item in items]
+
+
+class PublicMealPendingAPITests(TestCase):
+    """Test unauthenticated pending questions requests"""
+
+    def test_auth_required(self):
+        """Test auth is required to get the pending questions"""
+        res = APIClient().get(MEAL_PENDING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateMealPendingAPITests(TestCase):
+    """Test authenticated pending questions requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.questions = [
+            MealQuestion.objects.create(question=question)
+            for question in ['揚げ物？', '甘い物？']
+        ]
+        self.vegetable = MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+
+    def answer(self, user=None, **params):
+        return MealUser.objects.create(
+            user=user or self.user,
+            answer_type='int',
+            answer_int=1,
+            **params
+        )
+
+    def test_unanswered_questions(self):
+        """Test only the questions not answered today are returned"""
+        self.answer(meal_question=self.questions[0])
+        self.answer(
+            get_user_model().objects.create_user(
+                'other@example.com',
+                'Testpass123'
+            ),
+            meal_question=self.questions[1],
+            vegetable_question=self.vegetable
+        )
+        catalog.get_catalog()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(MEAL_PENDING_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['period'], pending.DAY)
+        self.assertEqual(ids(res.data['questions']), [self.questions[1].id])
+        self.assertEqual(ids(res.data['vegetables']), [self.vegetable.id])
+        self.assertEqual(
+            res.data['vegetables'][0]['vegetable'],
+            self.vegetable.vegetable
+        )
+
+    def test_answers_of_past_periods_ignored(self):
+        """Test answers before the period do not count"""
+        answer = self.answer(vegetable_question=self.vegetable)
+        MealUser.objects.filter(id=answer.id).update(
+            created_at=timezone.now() - datetime.timedelta(days=8)
+        )
+
+        res = self.client.get(MEAL_PENDING_URL, {'period': pending.WEEK})
+
+        self.assertEqual(ids(res.data['vegetables']), [self.vegetable.id])
+
+    def test_week_period(self):
+        """Test an answer earlier in the week counts for the week only"""
+        now = timezone.now()
+        monday = pending.period_start(pending.WEEK, now)
+        answer = self.answer(meal_question=self.questions[0])
+        MealUser.objects.filter(id=answer.id).update(
+            created_at=monday + datetime.timedelta(seconds=1)
+        )
+        sunday = monday + datetime.timedelta(days=6, hours=12)
+
+        week = pending.pending(self.user, pending.WEEK, sunday)
+        day = pending.pending(self.user, pending.DAY, sunday)
+
+        self.assertEqual(ids(week['questions']), [self.questions[1].id])
+        self.assertEqual(
+            sorted(ids(day['questions'])),
+            sorted(question.id for question in self.questions)
+        )
+
+    def test_period_start(self):
+        """Test days start at midnight and weeks on Monday"""
+        now = datetime.datetime(
+            2024, 5, 16, 15, 30,
+            tzinfo=datetime.timezone.utc
+        )
+
+        self.assertEqual(
+            pending.period_start(pending.DAY, now),
+            datetime.datetime(2024, 5, 16, tzinfo=datetime.timezone.utc)
+        )
+        self.assertEqual(
+            pending.period_start(pending.WEEK, now),
+            datetime.datetime(2024, 5, 13, tzinfo=datetime.timezone.utc)
+        )
+
+    def test_invalid_period(self):
+        """Test an unknown period is rejected"""
+        res = self.client.get(MEAL_PENDING_URL, {'period': 'year'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
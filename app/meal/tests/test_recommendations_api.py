@@ -0,0 +1,163 @@
+"""
+Tests for the vegetable recommendation API
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealUser, MealVegetable
+
+from meal import recommendations
+
+MEAL_USER_URL = reverse('meal:mealuser-list')
+MEAL_USER_BULK_URL = reverse('meal:mealuser-bulk')
+RECOMMENDATIONS_URL = reverse('meal:recommendations')
+
+
+def vegetable_ids(res):
+    """Return the ids of the recommended vegetables in order"""
+    return [vegetable['id'] for vegetable in res.data]
+
+
+class PublicRecommendationAPITests(TestCase):
+    """Test unauthenticated recommendation requests"""
+
+    def test_auth_required(self):
+        """Test auth is required to get recommendations"""
+        res = APIClient().get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecommendationAPITests(TestCase):
+    """Test authenticated recommendation requests"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.tomato = MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+        self.pepper = MealVegetable.objects.create(
+            vegetable='パプリカ',
+            color='赤',
+            varieties='果菜類'
+        )
+        self.spinach = MealVegetable.objects.create(
+            vegetable='ほうれん草',
+            color='緑',
+            varieties='葉菜類'
+        )
+
+    def answer(self, vegetable, choice='a lot', **params):
+        """Record an answer about a vegetable"""
+        with self.captureOnCommitCallbacks(execute=True):
+            return MealUser.objects.create(
+                user=self.user,
+                vegetable_question=vegetable,
+                answer_type='choice',
+                answer_choice=choice,
+                **params
+            )
+
+    def test_under_eaten_vegetables_first(self):
+        """Test vegetables unlike the ones eaten are recommended first"""
+        self.answer(self.tomato)
+
+        res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            vegetable_ids(res),
+            [self.spinach.id, self.pepper.id, self.tomato.id]
+        )
+        self.assertEqual(res.data[0]['vegetable'], self.spinach.vegetable)
+        self.assertGreater(res.data[0]['score'], res.data[1]['score'])
+
+    def test_excludes_allergies(self):
+        """Test vegetables the user is allergic to are not recommended"""
+        self.answer(self.spinach, choice='none', is_allergy=True)
+
+        res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertNotIn(self.spinach.id, vegetable_ids(res))
+
+    def test_limit(self):
+        """Test the number of recommendations can be limited"""
+        res = self.client.get(RECOMMENDATIONS_URL, {'limit': 1})
+        self.assertEqual(len(res.data), 1)
+
+        res = self.client.get(RECOMMENDATIONS_URL, {'limit': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_new_answers_update_cached_intake(self):
+        """Test new answers are added to the cache without reading it"""
+        self.client.get(RECOMMENDATIONS_URL)
+        self.answer(self.spinach)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(MEAL_USER_BULK_URL, [
+                {
+                    'vegetable_question': self.spinach.id,
+                    'answer_type': 'choice',
+                    'answer_choice': 'a lot',
+                },
+                {
+                    'vegetable_question': self.pepper.id,
+                    'answer_type': 'choice',
+                    'answer_choice': 'normal',
+                    'is_unnecessary': True,
+                },
+            ], format='json')
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(vegetable_ids(res), [self.tomato.id, self.spinach.id])
+        state = cache.get(
+            recommendations.CACHE_KEY.format(user_id=self.user.id)
+        )
+        self.assertEqual(
+            state['intake'],
+            recommendations.load_state(self.user.id, state['start'])['intake']
+        )
+
+    def test_deleted_answer_reloads_intake(self):
+        """Test deleting an answer drops the cached intake"""
+        answer = self.answer(self.tomato)
+        self.client.get(RECOMMENDATIONS_URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.delete()
+        res = self.client.get(RECOMMENDATIONS_URL)
+
+        self.assertEqual(
+            sorted(vegetable['score'] for vegetable in res.data),
+            [1.0] * 3
+        )
+
+    def test_scores_without_numpy(self):
+        """Test the pure Python scores match the NumPy ones"""
+        features = recommendations.get_features()
+        intake = {self.tomato.id: 5, self.spinach.id: 1}
+
+        with patch.object(recommendations, 'numpy', None):
+            expected = recommendations.score(features, intake)
+
+        for value, other in zip(
+            recommendations.score(features, intake),
+            expected
+        ):
+            self.assertAlmostEqual(value, other)
@@ -0,0 +1,181 @@
+"""
+Tests for the meal summary API
+"""
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Home, MealQuestion, MealSummary
+
+
+MEAL_SUMMARY_URL = reverse('meal:summary')
+HOME_SUMMARY_URL = reverse('meal:home-summary')
+
+
+class MealSummaryAPITests(TestCase):
+    """Test the meal summary API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.meal_question = MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+        self.today = timezone.localdate()
+
+    def create_summary(self, user, day, **params):
+        return MealSummary.objects.create(
+            user=user,
+            day=day,
+            meal_question=self.meal_question,
+            **params
+        )
+
+    def test_summary_adds_up_days_in_range(self):
+        """Test the summary adds up the rollup of the requested days"""
+        yesterday = self.today - datetime.timedelta(days=1)
+        last_year = self.today - datetime.timedelta(days=365)
+        self.create_summary(self.user, self.today, answer_count=2,
+                            choice_a_lot_count=2)
+        self.create_summary(self.user, yesterday, answer_count=1,
+                            choice_a_lot_count=1)
+        self.create_summary(self.user, last_year, answer_count=5,
+                            choice_a_lot_count=5)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(MEAL_SUMMARY_URL, {
+                'start': yesterday.isoformat(),
+                'end': self.today.isoformat(),
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]['meal_question'], self.meal_question.id)
+        self.assertEqual(res.data[0]['answer_count'], 3)
+        self.assertEqual(res.data[0]['choice_a_lot_count'], 3)
+
+    def test_summary_limited_to_user(self):
+        """Test the summary only includes the authenticated user"""
+        other_user = get_user_model().objects.create_user(
+            'other@example.com',
+            'otherPass123'
+        )
+        self.create_summary(other_user, self.today, answer_count=1)
+
+        res = self.client.get(MEAL_SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_summary_invalid_range_error(self):
+        """Test an error is returned if start is after end"""
+        res = self.client.get(MEAL_SUMMARY_URL, {
+            'start': self.today.isoformat(),
+            'end': (self.today - datetime.timedelta(days=1)).isoformat(),
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HomeSummaryAPITests(TestCase):
+    """Test the household dashboard API"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.home = Home.objects.create(name='Yamada')
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123',
+            first_name='Taro',
+            home=self.home
+        )
+        self.client.force_authenticate(self.user)
+        self.meal_question = MealQuestion.objects.create(
+            question='揚げ物をどれくらい食べましたか？'
+        )
+        self.today = timezone.localdate()
+
+    def create_member(self, index, home=None):
+        return get_user_model().objects.create_user(
+            f'member{index}@example.com',
+            'Testpass123',
+            first_name=f'Member{index}',
+            home=home or self.home
+        )
+
+    def create_summary(self, user, day, **params):
+        return MealSummary.objects.create(
+            user=user,
+            day=day,
+            meal_question=self.meal_question,
+            **params
+        )
+
+    def test_home_summary_lists_members(self):
+        """Test every member is listed with their own summary"""
+        member = self.create_member(1)
+        self.create_summary(self.user, self.today, answer_count=2)
+        self.create_summary(
+            member,
+            self.today - datetime.timedelta(days=1),
+            answer_count=1
+        )
+        self.create_summary(member, self.today, answer_count=3)
+        outsider = self.create_member(2, home=Home.objects.create(name='x'))
+        self.create_summary(outsider, self.today, answer_count=5)
+
+        res = self.client.get(HOME_SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['home'], {'id': self.home.id,
+                                            'name': 'Yamada'})
+        self.assertEqual(
+            [item['id'] for item in res.data['members']],
+            [self.user.id, member.id]
+        )
+        self.assertEqual(
+            [
+                item['summary'][0]['answer_count']
+                for item in res.data['members']
+            ],
+            [2, 4]
+        )
+
+    def test_home_summary_member_without_answers(self):
+        """Test members without answers are listed with no summary"""
+        member = self.create_member(1)
+
+        res = self.client.get(HOME_SUMMARY_URL)
+
+        self.assertEqual(res.data['members'][1]['id'], member.id)
+        self.assertEqual(res.data['members'][1]['summary'], [])
+
+    def test_home_summary_queries_do_not_grow(self):
+        """Test the dashboard runs two queries whatever the household size"""
+        for index in range(10):
+            member = self.create_member(index)
+            self.create_summary(member, self.today, answer_count=1)
+
+        with self.assertNumQueries(2):
+            res = self.client.get(HOME_SUMMARY_URL)
+
+        self.assertEqual(len(res.data['members']), 11)
+
+    def test_home_summary_without_home(self):
+        """Test users outside a household get a 404"""
+        self.user.home = None
+        self.user.save()
+
+        res = self.client.get(HOME_SUMMARY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
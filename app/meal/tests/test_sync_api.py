@@ -0,0 +1,226 @@
+"""
+Tests for the delta sync API
+"""
+import datetime
+import io
+import os
+import tempfile
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import MealQuestion, MealUser, MealVegetable, SyncTombstone
+
+from meal import catalog, sync
+
+MEAL_SYNC_URL = reverse('meal:sync')
+
+
+def ids(items):
+    """Return the ids of serialized rows"""
+    return [item['id'] for item in items]
+
+
+@override_settings(MEAL_SYNC_SETTLE_SECONDS=0)
+class MealSyncAPITests(TestCase):
+    """Test the delta sync endpoint"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        self.client.force_authenticate(self.user)
+        self.question = MealQuestion.objects.create(question='揚げ物？')
+        self.vegetable = MealVegetable.objects.create(
+            vegetable='トマト',
+            color='赤',
+            varieties='果菜類'
+        )
+        self.answer = self.create_answer(self.user)
+
+    def create_answer(self, user, **params):
+        return MealUser.objects.create(
+            user=user,
+            meal_question=self.question,
+            answer_type='int',
+            answer_int=1,
+            **params
+        )
+
+    def test_initial_sync_sends_everything(self):
+        """Test syncing without a token sends the catalog and history"""
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'Testpass123'
+        )
+        self.create_answer(other)
+
+        res = self.client.get(MEAL_SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ids(res.data['questions']), [self.question.id])
+        self.assertEqual(ids(res.data['vegetables']), [self.vegetable.id])
+        self.assertEqual(ids(res.data['answers']), [self.answer.id])
+        self.assertEqual(res.data['answers'][0]['answer_int'], 1)
+        self.assertEqual(
+            res.data['deleted'],
+            {'questions': [], 'vegetables': [], 'answers': []}
+        )
+        self.assertFalse(res.data['has_more'])
+
+    def test_sync_sends_changes_only(self):
+        """Test a token only brings the rows changed after it"""
+        token = self.client.get(MEAL_SYNC_URL).data['next']
+        self.answer.answer_int = 2
+        self.answer.save()
+        vegetable = MealVegetable.objects.create(
+            vegetable='ほうれん草',
+            color='緑',
+            varieties='葉菜類'
+        )
+        deleted = self.create_answer(self.user)
+        deleted_id = deleted.id
+        deleted.delete()
+
+        with self.assertNumQueries(5):
+            res = self.client.get(MEAL_SYNC_URL, {'since': token})
+
+        self.assertEqual(res.data['questions'], [])
+        self.assertEqual(ids(res.data['vegetables']), [vegetable.id])
+        self.assertEqual(ids(res.data['answers']), [self.answer.id])
+        self.assertEqual(res.data['answers'][0]['answer_int'], 2)
+        self.assertEqual(res.data['deleted']['answers'], [deleted_id])
+
+        res = self.client.get(MEAL_SYNC_URL, {'since': res.data['next']})
+
+        self.assertEqual(res.data['answers'], [])
+        self.assertEqual(res.data['deleted']['answers'], [])
+
+    def test_sync_excludes_other_users(self):
+        """Test the changes of other users are not sent"""
+        token = self.client.get(MEAL_SYNC_URL).data['next']
+        other = get_user_model().objects.create_user(
+            'other@example.com',
+            'Testpass123'
+        )
+        self.create_answer(other)
+        self.create_answer(other).delete()
+
+        res = self.client.get(MEAL_SYNC_URL, {'since': token})
+
+        self.assertEqual(res.data['answers'], [])
+        self.assertEqual(res.data['deleted']['answers'], [])
+
+    def test_catalog_deletions_are_synced(self):
+        """Test deleted catalog rows reach every user"""
+        token = self.client.get(MEAL_SYNC_URL).data['next']
+        question_id = self.question.id
+
+        self.question.delete()
+        res = self.client.get(MEAL_SYNC_URL, {'since': token})
+
+        self.assertEqual(res.data['deleted']['questions'], [question_id])
+        self.assertEqual(res.data['deleted']['answers'], [self.answer.id])
+
+    def test_sync_pages(self):
+        """Test changes beyond the limit are sent by the next requests"""
+        answers = [self.answer] + [
+            self.create_answer(self.user) for _ in range(4)
+        ]
+        synced = []
+        params = {'limit': 2}
+
+        for _ in range(5):
+            res = self.client.get(MEAL_SYNC_URL, params)
+            synced += ids(res.data['answers'])
+            params['since'] = res.data['next']
+            if not res.data['has_more']:
+                break
+
+        self.assertFalse(res.data['has_more'])
+        self.assertEqual(synced, [answer.id for answer in answers])
+
+    def test_invalid_token(self):
+        """Test a malformed token is rejected"""
+        res = self.client.get(MEAL_SYNC_URL, {'since': 'not-a-token'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_token(self):
+        """Test a token older than the tombstones must sync from scratch"""
+        moment = timezone.now() - datetime.timedelta(days=365)
+        token = sync.encode_token(
+            {stream.name: (moment, None) for stream in sync.STREAMS}
+        )
+
+        res = self.client.get(MEAL_SYNC_URL, {'since': token})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_purge_tombstones(self):
+        """Test old tombstones are deleted"""
+        self.create_answer(self.user).delete()
+        answer_id = self.answer.id
+        self.answer.delete()
+        SyncTombstone.objects.filter(object_id=answer_id).update(
+            deleted_at=timezone.now() - datetime.timedelta(days=365)
+        )
+
+        call_command('purge_sync_tombstones', stdout=io.StringIO())
+
+        self.assertEqual(SyncTombstone.objects.count(), 1)
+
+
+@override_settings(MEAL_SYNC_SETTLE_SECONDS=0)
+class MealSyncConcurrencyTests(TransactionTestCase):
+    """Test syncing while other transactions write"""
+
+    def test_sync_during_long_load(self):
+        """Test rows of a load still open are synced once it commits"""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'Testpass123'
+        )
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write('vegetable,color,varieties\nKale,green,1\n')
+        self.addCleanup(os.remove, path)
+        loaded = threading.Event()
+        synced = threading.Event()
+
+        def hold(*args):
+            loaded.set()
+            synced.wait(5)
+
+        def load():
+            try:
+                call_command('load_catalog', 'vegetables', path,
+                             stdout=io.StringIO())
+            finally:
+                connection.close()
+
+        with patch.object(catalog, 'invalidate_on_commit', side_effect=hold):
+            thread = threading.Thread(target=load)
+            thread.start()
+            self.assertTrue(loaded.wait(5))
+            token = sync.changes(user)['next']
+            synced.set()
+            thread.join(5)
+
+        data = sync.changes(user, token)
+
+        self.assertEqual(
+            [item['vegetable'] for item in data['vegetables']],
+            ['Kale']
+        )
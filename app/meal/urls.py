@@ -13,10 +13,29 @@ from meal import views
 
 router = DefaultRouter()
 router.register('meal-question', views.MealQuestionViewSet)
+router.register('meal-vegetable', views.MealVegetableViewSet)
 router.register('meal-user', views.MealUserViewSet)
 
 app_name = 'meal'
 
 urlpatterns = [
+    path('summary/', views.MealSummaryView.as_view(), name='summary'),
+    path(
+        'home-summary/',
+        views.MealHomeSummaryView.as_view(),
+        name='home-summary'
+    ),
+    path('sync/', views.MealSyncView.as_view(), name='sync'),
+    path('pending/', views.MealPendingView.as_view(), name='pending'),
+    path(
+        'current-answers/',
+        views.MealCurrentAnswersView.as_view(),
+        name='current-answers'
+    ),
+    path(
+        'recommendations/',
+        views.MealRecommendationView.as_view(),
+        name='recommendations'
+    ),
     path('', include(router.urls))
 ]
@@ -1,33 +1,338 @@
 """
 Views for the Meal APIs
 """
-from rest_framework import viewsets
-from rest_framework.authentication import TokenAuthentication
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext as _
+
+from rest_framework import generics, status, viewsets
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core import exports, summary
+from core.authentication import CachedTokenAuthentication
+from core.idempotency import IdempotentCreateMixin
+from core.models import (
+    MealAnswerState,
+    MealQuestion,
+    MealSummary,
+    MealUser,
+    MealVegetable
+)
+from core.renderers import CSVRenderer, NDJSONRenderer
+from meal import (
+    catalog,
+    fast_serializers,
+    pending,
+    recommendations,
+    serializers,
+    sync
+)
+from meal.pagination import MealUserCursorPagination
+
+
+class CatalogListMixin:
+    """List a part of the cached catalog with conditional GET support"""
+    catalog_key = None
+
+    def list(self, request, *args, **kwargs):
+        """Return the cached catalog or 304 when the client is up to date"""
+        return catalog.respond(request, self.catalog_key, Response)
+
+
+class FastReadMixin:
+    """List and retrieve from values_list() rows, without model instances
 
-from core.models import MealQuestion, MealUser
-from meal import serializers
+    fast_serializer returns the same output as serializer_class.
+    """
+    fast_serializer = None
 
+    def list(self, request, *args, **kwargs):
+        """Return the rows of the queryset, paginated when configured"""
+        queryset = self.filter_queryset(self.get_queryset())
+        extra_columns = []
+        if self.paginator is not None:
+            extra_columns = [
+                field.lstrip('-')
+                for field in getattr(self.paginator, 'ordering', ())
+            ]
+        rows = self.fast_serializer.values(queryset, *extra_columns)
 
-class MealQuestionViewSet(viewsets.ModelViewSet):
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(
+                self.fast_serializer.list_representation(page)
+            )
+        return Response(self.fast_serializer.list_representation(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return one row of the queryset"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            self.fast_serializer.values(
+                self.filter_queryset(self.get_queryset())
+            ),
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return Response(self.fast_serializer.to_representation(row))
+
+
+class MealQuestionViewSet(CatalogListMixin,
+                          FastReadMixin,
+                          viewsets.ModelViewSet):
     """View for manage meal question APIs"""
+    catalog_key = 'questions'
     serializer_class = serializers.MealQuestionSerializer
+    fast_serializer = fast_serializers.meal_question
     queryset = MealQuestion.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Retrieve meal questions"""
+        return self.queryset.order_by('-id')
+
+
+class MealVegetableViewSet(CatalogListMixin,
+                           FastReadMixin,
+                           viewsets.ReadOnlyModelViewSet):
+    """View for meal vegetable APIs"""
+    catalog_key = 'vegetables'
+    serializer_class = serializers.MealVegetableSerializer
+    fast_serializer = fast_serializers.meal_vegetable
+    queryset = MealVegetable.objects.all()
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        """Retrieve meal question for authenticated user"""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        """Retrieve meal vegetables"""
+        return self.queryset.order_by('-id')
 
 
-class MealUserViewSet(viewsets.ModelViewSet):
+class MealUserViewSet(IdempotentCreateMixin,
+                      FastReadMixin,
+                      viewsets.ModelViewSet):
     """View for manage meal user APIs"""
     serializer_class = serializers.MealUserSerializer
+    fast_serializer = fast_serializers.meal_user
     queryset = MealUser.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = MealUserCursorPagination
 
     def get_queryset(self):
         """Retrieve meal user for authenticated user"""
-        return self.queryset.fileter(user=self.request.user).order_by('-id')
+        return self.queryset.filter(
+            user=self.request.user
+        ).order_by('-created_at', '-id')
+
+    def perform_create(self, serializer):
+        """Create a new answer for the authenticated user"""
+        serializer.save(user=self.request.user)
+
+    @action(methods=['POST'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        """Create every answer of a questionnaire in one request"""
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['GET'],
+        detail=False,
+        url_path='export',
+        renderer_classes=[NDJSONRenderer, CSVRenderer]
+    )
+    def export(self, request):
+        """Stream the authenticated user's whole answer history
+
+        The format is chosen with ?format=ndjson (default) or ?format=csv.
+        """
+        queryset = MealUser.objects.filter(
+            user=request.user
+        ).order_by('created_at', 'id')
+
+        return exports.export_response(
+            queryset,
+            exports.ANSWER_FIELDS,
+            request.accepted_renderer.format,
+            'meal-answers'
+        )
+
+
+class SyncTokenExpired(APIException):
+    """The changes since the sync token are no longer known"""
+    status_code = status.HTTP_410_GONE
+    default_detail = _('The sync token expired, sync again without since.')
+    default_code = 'sync_token_expired'
+
+
+class MealSyncView(generics.GenericAPIView):
+    """Return the catalog and answer changes since a sync token"""
+    serializer_class = serializers.MealSyncSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    # A token must not pass rows a lagging replica has not replayed yet,
+    # whoever wrote them
+    primary_reads = True
+
+    def get(self, request):
+        """Return the changed rows, deleted ids and the next token"""
+        params = serializers.MealSyncQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+
+        try:
+            return Response(sync.changes(
+                request.user,
+                params.validated_data.get('since'),
+                params.validated_data.get('limit')
+            ))
+        except sync.InvalidToken:
+            raise ValidationError({'since': [_('Invalid sync token.')]})
+        except sync.ExpiredToken:
+            raise SyncTokenExpired()
+
+
+class MealPendingView(generics.GenericAPIView):
+    """Return what the authenticated user has not answered yet"""
+    serializer_class = serializers.MealPendingSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the questions and vegetables unanswered in the period"""
+        params = serializers.MealPendingQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+
+        serializer = self.get_serializer(
+            pending.pending(request.user, params.validated_data['period'])
+        )
+        return Response(serializer.data)
+
+
+class MealRecommendationView(generics.GenericAPIView):
+    """Recommend the vegetables the authenticated user eats too little"""
+    serializer_class = serializers.MealRecommendationSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the best scored vegetables of the catalog"""
+        params = serializers.MealRecommendationQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+
+        return Response(recommendations.recommend(
+            request.user.pk,
+            params.validated_data['limit']
+        ))
+
+
+class MealCurrentAnswersView(generics.ListAPIView):
+    """List the latest answer of the authenticated user to every question
+
+    Read from MealAnswerState, kept up to date on every write, with one
+    index lookup instead of a scan of the answer history.
+    """
+    serializer_class = serializers.MealAnswerStateSerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Return the state rows of the authenticated user"""
+        return MealAnswerState.objects.filter(
+            user=self.request.user
+        ).order_by('meal_question', 'vegetable_question')
+
+
+class MealSummaryView(generics.ListAPIView):
+    """Summarize the authenticated user's answers over a date range"""
+    serializer_class = serializers.MealSummarySerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Add up the daily rollup rows of the requested range"""
+        params = serializers.MealSummaryQuerySerializer(
+            data=self.request.query_params
+        )
+        params.is_valid(raise_exception=True)
+
+        return summary.totals(MealSummary.objects.filter(
+            user=self.request.user,
+            day__range=(
+                params.validated_data['start'],
+                params.validated_data['end']
+            )
+        ))
+
+
+class MealHomeSummaryView(generics.GenericAPIView):
+    """Summarize the answers of every member of the user's household"""
+    serializer_class = serializers.MealHomeSummarySerializer
+    authentication_classes = [CachedTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the members of the household with their summaries
+
+        Two queries whatever the size of the household: one for the
+        members and one adding up the rollup rows of all of them.
+        """
+        home_id = request.user.home_id
+        if home_id is None:
+            raise NotFound(_('You are not a member of a household.'))
+
+        params = serializers.MealSummaryQuerySerializer(
+            data=request.query_params
+        )
+        params.is_valid(raise_exception=True)
+        start = params.validated_data['start']
+        end = params.validated_data['end']
+
+        members = list(get_user_model().objects.filter(
+            home_id=home_id
+        ).select_related('home').only(
+            'first_name',
+            'last_name',
+            'home__name'
+        ).order_by('id'))
+        if not members:
+            raise NotFound(_('You are not a member of a household.'))
+
+        summaries = defaultdict(list)
+        rows = summary.totals(
+            MealSummary.objects.filter(
+                user__home_id=home_id,
+                day__range=(start, end)
+            ),
+            'user'
+        )
+        for row in rows:
+            summaries[row.pop('user')].append(row)
+
+        serializer = self.get_serializer({
+            'home': members[0].home,
+            'start': start,
+            'end': end,
+            'members': [
+                {'user': member, 'summary': summaries[member.id]}
+                for member in members
+            ],
+        })
+        return Response(serializer.data)
@@ -0,0 +1,14 @@
+"""
+Async views for the user API
+"""
+from django.http import JsonResponse
+
+from core.async_api import async_read_view
+from user import views
+from user.serializers import UserSerializer
+
+
+@async_read_view(views.ManagerUserView.as_view())
+async def me(request):
+    """Retrieve the authenticated user"""
+    return JsonResponse(UserSerializer(request.user).data)
@@ -31,15 +31,24 @@ class UserSerializer(serializers.ModelSerializer):
         return get_user_model().objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update and return user"""
+        """Update and return user
+
+        Only the given fields are written: the instance may be a copy
+        cached by the authentication, older than the stored user.
+        """
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        fields = list(validated_data)
 
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
+            fields.append('password')
+
+        if fields:
+            instance.save(update_fields=fields)
 
-        return user
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
@@ -280,3 +280,11 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.first_name, payload['first_name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_me_not_allowed(self):
+        """Test users cannot delete their account through the API"""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.is_active)